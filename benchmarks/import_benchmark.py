@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Benchmark the conversation import path
+
+Measures, on a synthetic or supplied export:
+- parse: streaming conversations.json out of the zip and building threads
+- traverse: ConversationThread.traverse_messages over every thread
+- units: semantic-unit extraction, including chunking
+- import: a full ConversationProcessor.process_import against the recording
+  in-memory Qdrant and Neo4j clients
+
+Embeddings come from a deterministic hashing encoder unless --encoder model
+is given, so the numbers describe this code rather than the embedding model.
+Results are written as JSON; pass --compare with an earlier result file to
+print throughput ratios.
+
+Run from the directory containing the checkout, linked as chat_analyzer (see README):
+    python -m chat_analyzer.benchmarks.import_benchmark --conversations 2000
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+from ..benchmarks.synthetic_export import ExportOptions, write_export
+from ..core.analysis.chunking import TextChunker
+from ..core.embeddings.encoder import EmbeddingEncoder
+from ..core.models.conversation import ConversationThread
+from ..core.processors.conversation_processor import ConversationProcessor
+from ..core.storage.recording import RecordingNeo4jDriver, RecordingQdrantClient
+from ..importers.common.base import OpenAIExportImporter
+
+RESULTS_VERSION = 1
+
+class HashingEncoder(EmbeddingEncoder):
+    """Model-free encoder returning a fixed random unit vector per distinct text"""
+    
+    def __init__(self, dim: int = 384, batch_size: int = 32):
+        super().__init__(model_name=f"hashing-{dim}", batch_size=batch_size)
+        self.dim = dim
+    
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+            seed = int.from_bytes(digest, 'little')
+            vectors[row] = np.random.default_rng(seed).standard_normal(self.dim)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors.tolist()
+
+def _timed(function: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Run function `repeat` times; returns timings and the last result"""
+    seconds = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        seconds.append(time.perf_counter() - start)
+    return {"seconds": seconds, "result": result}
+
+def _summary(timing: Dict[str, Any], counts: Dict[str, int]) -> Dict[str, Any]:
+    median = statistics.median(timing["seconds"])
+    best = min(timing["seconds"])
+    return {
+        "seconds": [round(value, 6) for value in timing["seconds"]],
+        "median_seconds": round(median, 6),
+        "best_seconds": round(best, 6),
+        "counts": counts,
+        "throughput_per_second": {
+            name: round(count / median, 1) if median else None for name, count in counts.items()
+        }
+    }
+
+def bench_parse(export_path: Path, repeat: int, uncompressed_bytes: int) -> Dict[str, Any]:
+    importer = OpenAIExportImporter()
+    
+    def run():
+        conversations = messages = 0
+        for conv_data in importer.extract_conversations(export_path):
+            thread = ConversationThread.from_export_mapping(conv_data)
+            conversations += 1
+            messages += len(thread.messages)
+        return conversations, messages
+    
+    timing = _timed(run, repeat)
+    conversations, messages = timing["result"]
+    return _summary(timing, {
+        "conversations": conversations,
+        "messages": messages,
+        "bytes": uncompressed_bytes
+    })
+
+def load_threads(export_path: Path) -> List[ConversationThread]:
+    importer = OpenAIExportImporter()
+    return [
+        ConversationThread.from_export_mapping(conv_data)
+        for conv_data in importer.extract_conversations(export_path)
+    ]
+
+def bench_traverse(threads: List[ConversationThread], repeat: int) -> Dict[str, Any]:
+    timing = _timed(lambda: sum(len(thread.traverse_messages()) for thread in threads), repeat)
+    return _summary(timing, {"conversations": len(threads), "messages": timing["result"]})
+
+def bench_units(
+    threads: List[ConversationThread],
+    repeat: int,
+    chunker: TextChunker
+) -> Dict[str, Any]:
+    timing = _timed(
+        lambda: sum(len(thread.extract_semantic_units(chunker=chunker)) for thread in threads),
+        repeat
+    )
+    return _summary(timing, {
+        "conversations": len(threads),
+        "messages": sum(len(thread.messages) for thread in threads),
+        "units": timing["result"]
+    })
+
+def bench_import(
+    export_path: Path,
+    repeat: int,
+    config: Dict[str, Any],
+    encoder: Optional[EmbeddingEncoder]
+) -> Dict[str, Any]:
+    importer = OpenAIExportImporter()
+    runs = []
+    
+    def run():
+        qdrant = RecordingQdrantClient()
+        neo4j = RecordingNeo4jDriver()
+        processor = ConversationProcessor(qdrant, neo4j, config)
+        if encoder is not None:
+            processor.encoder = encoder
+        stats = asyncio.run(processor.process_import(importer, export_path))
+        runs.append({
+            "qdrant_upserts": len(qdrant.upserts),
+            "neo4j_statements": len(neo4j.statements),
+            "neo4j_transactions": neo4j.transactions,
+            "stages": stats.get("stages", {})
+        })
+        return stats
+    
+    timing = _timed(run, repeat)
+    stats = timing["result"]
+    summary = _summary(timing, {
+        "conversations": stats["conversations_processed"],
+        "messages": stats["messages_processed"],
+        "vectors": stats["vectors_created"],
+        "relationships": stats["relationships_created"]
+    })
+    summary["last_run"] = runs[-1]
+    return summary
+
+def _environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    
+    environment = {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "git_commit": commit
+    }
+    try:
+        import resource
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        environment["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    except ImportError:
+        pass
+    return environment
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any]
+) -> Dict[str, Dict[str, Optional[float]]]:
+    """Ratio of current to baseline throughput per benchmark and counter (>1 is faster)"""
+    ratios = {}
+    for name, result in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        ratios[name] = {}
+        for counter, value in result["throughput_per_second"].items():
+            before = previous["throughput_per_second"].get(counter)
+            ratios[name][counter] = round(value / before, 3) if value and before else None
+    return ratios
+
+def run_benchmarks(args) -> Dict[str, Any]:
+    workdir = Path(tempfile.mkdtemp(prefix="import-benchmark-"))
+    
+    if args.export:
+        export_path = Path(args.export)
+        export = {"path": str(export_path), "zip_bytes": export_path.stat().st_size}
+        with zipfile.ZipFile(export_path) as archive:
+            member = archive.getinfo(OpenAIExportImporter.CONVERSATIONS_MEMBER)
+            export["conversations_json_bytes"] = member.file_size
+    else:
+        export_path = workdir / "export.zip"
+        export = write_export(export_path, ExportOptions(
+            conversations=args.conversations,
+            mean_turns=args.mean_turns,
+            branch_probability=args.branch_probability,
+            seed=args.seed
+        ))
+    
+    benchmarks = set(args.benchmarks)
+    results = {}
+    
+    if "parse" in benchmarks:
+        results["parse"] = bench_parse(export_path, args.repeat, export["conversations_json_bytes"])
+    
+    if benchmarks & {"traverse", "units"}:
+        threads = load_threads(export_path)
+        if "traverse" in benchmarks:
+            results["traverse"] = bench_traverse(threads, args.repeat)
+        if "units" in benchmarks:
+            chunker = TextChunker.from_config({
+                "chunk_size": args.chunk_size,
+                "overlap": args.overlap,
+                "tokenizer": args.tokenizer
+            }, None)
+            results["units"] = bench_units(threads, args.repeat, chunker)
+        del threads
+    
+    if "import" in benchmarks:
+        config = {
+            "qdrant": {"vector_size": args.dim},
+            "embeddings": {"cache_enabled": False, "batch_size": args.batch_size},
+            "analysis": {
+                "chunk_size": args.chunk_size,
+                "overlap": args.overlap,
+                "tokenizer": args.tokenizer,
+                "extract_concepts": args.concepts
+            },
+            "import": {
+                "incremental": False,
+                "parse_processes": args.parse_processes,
+                "threads": args.threads
+            },
+            "deduplication": {"enabled": args.dedup},
+            "storage": {"data_dir": str(workdir / "data"), "cache_dir": str(workdir / "cache")}
+        }
+        encoder = None if args.encoder == "model" else HashingEncoder(args.dim, args.batch_size)
+        results["import"] = bench_import(export_path, args.repeat, config, encoder)
+    
+    return {
+        "version": RESULTS_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": _environment(),
+        "arguments": {
+            key: value for key, value in vars(args).items() if key not in ("output", "compare")
+        },
+        "export": export,
+        "results": results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the conversation import path')
+    parser.add_argument('--export', help='Existing export zip (default: generate one)')
+    parser.add_argument('--conversations', type=int, default=500, help='Conversations to generate')
+    parser.add_argument('--mean-turns', type=float, default=ExportOptions.mean_turns)
+    parser.add_argument(
+        '--branch-probability', type=float, default=ExportOptions.branch_probability
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--benchmarks', nargs='+', default=["parse", "traverse", "units", "import"],
+                        choices=["parse", "traverse", "units", "import"])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--encoder', choices=["hashing", "model"], default="hashing")
+    parser.add_argument('--tokenizer', choices=["approximate", "model"], default="approximate")
+    parser.add_argument('--chunk-size', type=int, default=256)
+    parser.add_argument('--overlap', type=int, default=32)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=4, help='Import store workers')
+    parser.add_argument('--parse-processes', type=int, default=0)
+    parser.add_argument('--concepts', action='store_true', help='Include spaCy concept extraction')
+    parser.add_argument(
+        '--dedup', action='store_true', help='Skip near-duplicate units before embedding'
+    )
+    parser.add_argument(
+        '--output', help='Result file (default: benchmarks/results/import-<time>.json)'
+    )
+    parser.add_argument('--compare', help='Earlier result file to compare against')
+    args = parser.parse_args()
+    
+    results = run_benchmarks(args)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            results["comparison"] = compare(results, json.load(f))
+    
+    output = Path(args.output) if args.output else (
+        Path(__file__).resolve().parent / "results" / f"import-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    
+    for name, result in results["results"].items():
+        rates = ", ".join(
+            f"{value}/s {counter}" for counter, value in result["throughput_per_second"].items()
+        )
+        print(f"{name:>9}: {result['median_seconds']:.3f}s median ({rates})")
+    if "comparison" in results:
+        print(json.dumps(results["comparison"], indent=2))
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark MCP server cold start
+
+Each run starts a fresh interpreter, as an MCP client does when it spawns
+the server over stdio, and measures:
+- import: loading chat_analysis_server
+- construct: ChatAnalysisServer()
+- list_tools: answering the first list_tools request
+- total: wall time from spawning the process to the list_tools answer
+
+It also records which heavy modules (torch, sentence-transformers, spaCy,
+the store clients) were imported by then; any of them showing up means a
+lazy import regressed. With --max-ms the run fails when the median total
+exceeds the budget, so the benchmark can guard startup in CI.
+
+Run from the directory containing the checkout, linked as chat_analyzer (see README):
+    python -m chat_analyzer.benchmarks.startup_benchmark --max-ms 500
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules that must not be imported before a tool needs them
+HEAVY_MODULES = [
+    "torch",
+    "sentence_transformers",
+    "transformers",
+    "spacy",
+    "qdrant_client",
+    "neo4j",
+    "numpy"
+]
+
+_PACKAGE = __package__.rsplit(".", 1)[0] if __package__ else None
+_PACKAGE_DIR = Path(__file__).resolve().parents[1]
+SERVER_PATH = _PACKAGE_DIR / "mcp-modules" / "analysis" / "chat_analysis_server.py"
+
+# Runs in the child; `mcp-modules` is not an importable name, so the server is loaded from its path
+_CHILD = """
+import time
+start = time.perf_counter()
+import asyncio, importlib.util, json, sys
+sys.path.insert(0, {root!r})
+name = {package!r} + ".mcp_modules.analysis.chat_analysis_server"
+spec = importlib.util.spec_from_file_location(name, {server!r})
+module = importlib.util.module_from_spec(spec)
+sys.modules[name] = module
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+server = module.ChatAnalysisServer()
+constructed = time.perf_counter()
+tools = asyncio.run(server._handle_list_tools(None))["tools"]
+listed = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start,
+    "construct": constructed - imported,
+    "list_tools": listed - constructed,
+    "tools": len(tools),
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+def run_once(config: Optional[str] = None) -> Dict[str, Any]:
+    code = _CHILD.format(
+        root=str(_PACKAGE_DIR.parent),
+        package=_PACKAGE,
+        server=str(SERVER_PATH),
+        heavy=HEAVY_MODULES
+    )
+    env = dict(os.environ, CHAT_ANALYSIS_CONFIG=config) if config else None
+    
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, env=env
+    )
+    total = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Server start failed:\n{completed.stderr}")
+    
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["total"] = total
+    return result
+
+def run_benchmark(repeat: int, config: Optional[str] = None) -> Dict[str, Any]:
+    runs = [run_once(config) for _ in range(repeat)]
+    phases = {}
+    for phase in ("import", "construct", "list_tools", "total"):
+        seconds = [run[phase] for run in runs]
+        phases[phase] = {
+            "median_ms": round(statistics.median(seconds) * 1000, 1),
+            "best_ms": round(min(seconds) * 1000, 1),
+            "ms": [round(value * 1000, 1) for value in seconds]
+        }
+    
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "phases": phases,
+        "tools": runs[-1]["tools"],
+        "heavy_modules": sorted({name for run in runs for name in run["heavy_modules"]})
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark MCP server cold start')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--config', help='Config file for the server (default: its usual lookup)')
+    parser.add_argument('--max-ms', type=float, help='Fail when the median total exceeds this')
+    parser.add_argument(
+        '--output', help='Result file (default: benchmarks/results/startup-<time>.json)'
+    )
+    args = parser.parse_args()
+    
+    if _PACKAGE is None:
+        parser.error("run as a module: python -m chat_analyzer.benchmarks.startup_benchmark")
+    
+    results = run_benchmark(args.repeat, args.config)
+    
+    output = Path(args.output) if args.output else (
+        Path(__file__).resolve().parent / "results" / f"startup-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    
+    for phase, timing in results["phases"].items():
+        print(f"{phase:>10}: {timing['median_ms']:.1f} ms median ({timing['best_ms']:.1f} ms best)")
+    print(f"Heavy modules loaded: {', '.join(results['heavy_modules']) or 'none'}")
+    print(f"Results written to {output}")
+    
+    failures = []
+    if results["heavy_modules"]:
+        failures.append("heavy modules imported before the first tool call")
+    if args.max_ms is not None and results["phases"]["total"]["median_ms"] > args.max_ms:
+        median_ms = results["phases"]["total"]["median_ms"]
+        failures.append(f"median start {median_ms} ms exceeds {args.max_ms} ms")
+    if failures:
+        print("FAILED: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic ChatGPT export archives
+
+The archives mirror the layout of a real "Export data" download: a zip with
+conversations.json holding one mapping tree per conversation. Trees include
+the message-less client root, a hidden system message, alternating user and
+assistant turns and abandoned branches from edits and regenerations.
+Everything is derived from a seed, so the same options always produce the
+same archive.
+"""
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import argparse
+import io
+import itertools
+import json
+import math
+import random
+import uuid
+import zipfile
+
+@dataclass
+class ExportOptions:
+    """Shape of a generated export"""
+    conversations: int = 1000
+    mean_turns: float = 12.0  # Mean user/assistant exchanges on the main path
+    user_words_median: int = 25  # Message lengths are log-normal around these medians
+    assistant_words_median: int = 180
+    words_sigma: float = 0.9
+    max_words: int = 6000
+    branch_probability: float = 0.08  # Chance that a turn gets an abandoned sibling branch
+    max_branch_turns: int = 3
+    code_probability: float = 0.15  # Chance that an assistant message contains a code block
+    vocabulary_size: int = 8000
+    seed: int = 0
+    start_time: float = 1672531200.0  # 2023-01-01
+
+class ExportGenerator:
+    """Build export conversations from ExportOptions"""
+    
+    def __init__(self, options: ExportOptions):
+        self.options = options
+        self.rng = random.Random(options.seed)
+        self.vocabulary = self._make_vocabulary(options.vocabulary_size)
+        
+        # Zipf-like word frequencies, as in natural text
+        weights = [1.0 / (rank + 1) for rank in range(len(self.vocabulary))]
+        self.cum_weights = list(itertools.accumulate(weights))
+    
+    def _make_vocabulary(self, size: int) -> List[str]:
+        syllables = [c + v for c in "bcdfghjklmnprstvwz" for v in "aeiou"]
+        words = set()
+        while len(words) < size:
+            words.add("".join(self.rng.choice(syllables) for _ in range(self.rng.randint(1, 4))))
+        return sorted(words)
+    
+    def _uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+    
+    def _length(self, median: int) -> int:
+        words = int(median * math.exp(self.rng.gauss(0.0, self.options.words_sigma)))
+        return max(1, min(words, self.options.max_words))
+    
+    def _sentence(self, words: int) -> str:
+        tokens = self.rng.choices(self.vocabulary, cum_weights=self.cum_weights, k=words)
+        # Occasional proper nouns give entity recognizers something to find
+        for index in range(len(tokens)):
+            if self.rng.random() < 0.04:
+                tokens[index] = tokens[index].capitalize()
+        tokens[0] = tokens[0].capitalize()
+        return " ".join(tokens) + self.rng.choice(".....?!")
+    
+    def text(self, words: int, code: bool = False) -> str:
+        """Prose of roughly `words` words in paragraphs, optionally with a code block"""
+        paragraphs = []
+        sentences = []
+        remaining = words
+        while remaining > 0:
+            length = min(remaining, self.rng.randint(6, 24))
+            sentences.append(self._sentence(length))
+            remaining -= length
+            if len(sentences) >= self.rng.randint(3, 6):
+                paragraphs.append(" ".join(sentences))
+                sentences = []
+        if sentences:
+            paragraphs.append(" ".join(sentences))
+        
+        if code:
+            lines = []
+            for _ in range(self.rng.randint(3, 30)):
+                target = self.rng.choice(self.vocabulary)
+                function = self.rng.choice(self.vocabulary)
+                lines.append(f"    {target} = {function}({self.rng.randint(0, 99)})")
+            name = self.rng.choice(self.vocabulary)
+            block = "```python\ndef " + name + "():\n" + "\n".join(lines) + "\n```"
+            paragraphs.insert(self.rng.randint(0, len(paragraphs)), block)
+        
+        return "\n\n".join(paragraphs)
+    
+    def _message(self, node_id: str, role: str, create_time: float, text: str) -> Dict[str, Any]:
+        return {
+            "id": node_id,
+            "author": {"role": role, "name": None, "metadata": {}},
+            "create_time": create_time,
+            "update_time": None,
+            "content": {"content_type": "text", "parts": [text]},
+            "status": "finished_successfully",
+            "end_turn": True if role == "assistant" else None,
+            "weight": 1.0 if role != "system" else 0.0,
+            "metadata": {"is_visually_hidden_from_conversation": True} if role == "system" else {},
+            "recipient": "all"
+        }
+    
+    def _turns(self, mapping: Dict[str, Dict], parent_id: str, clock: List[float], count: int,
+               branching: bool) -> str:
+        """Append `count` user/assistant exchanges below parent_id and return the last node id"""
+        options = self.options
+        for _ in range(count):
+            for role in ("user", "assistant"):
+                if branching and self.rng.random() < options.branch_probability:
+                    # Edited prompt or regenerated answer: an abandoned sibling path
+                    self._turns(
+                        mapping, parent_id, [clock[0]],
+                        self.rng.randint(1, options.max_branch_turns), branching=False
+                    )
+                
+                if role == "assistant":
+                    clock[0] += self.rng.uniform(2, 30)
+                else:
+                    clock[0] += self.rng.uniform(10, 600)
+                if role == "user":
+                    text = self.text(self._length(options.user_words_median))
+                else:
+                    text = self.text(
+                        self._length(options.assistant_words_median),
+                        code=self.rng.random() < options.code_probability
+                    )
+                
+                node_id = self._uuid()
+                mapping[node_id] = {
+                    "id": node_id,
+                    "message": self._message(node_id, role, clock[0], text),
+                    "parent": parent_id,
+                    "children": []
+                }
+                mapping[parent_id]["children"].append(node_id)
+                parent_id = node_id
+        return parent_id
+    
+    def conversation(self, index: int) -> Dict[str, Any]:
+        """Generate the index-th conversation"""
+        options = self.options
+        create_time = options.start_time + index * 3600 * self.rng.uniform(0.5, 3)
+        clock = [create_time]
+        
+        root_id = self._uuid()
+        system_id = self._uuid()
+        mapping = {
+            root_id: {"id": root_id, "message": None, "parent": None, "children": [system_id]},
+            system_id: {
+                "id": system_id,
+                "message": self._message(system_id, "system", None, ""),
+                "parent": root_id,
+                "children": []
+            }
+        }
+        turns = max(1, int(self.rng.expovariate(1.0 / options.mean_turns)) + 1)
+        current_node = self._turns(mapping, system_id, clock, turns, branching=True)
+        
+        conversation_id = self._uuid()
+        return {
+            "title": self._sentence(self.rng.randint(2, 6)).rstrip(".?!"),
+            "create_time": create_time,
+            "update_time": clock[0],
+            "mapping": mapping,
+            "moderation_results": [],
+            "current_node": current_node,
+            "plugin_ids": None,
+            "conversation_id": conversation_id,
+            "conversation_template_id": None,
+            "id": conversation_id
+        }
+
+def write_export(path: Path, options: Optional[ExportOptions] = None) -> Dict[str, Any]:
+    """
+    Write a synthetic export zip
+    
+    Conversations are streamed into the archive one at a time, so large
+    exports can be generated without holding them in memory.
+    
+    Returns:
+        Summary with the options, conversation/message counts and sizes
+    """
+    options = options or ExportOptions()
+    generator = ExportGenerator(options)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    
+    messages = 0
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open("conversations.json", 'w') as raw:
+            out = io.TextIOWrapper(raw, encoding='utf-8')
+            out.write("[")
+            for index in range(options.conversations):
+                conversation = generator.conversation(index)
+                messages += sum(
+                    1 for node in conversation["mapping"].values() if node["message"] is not None
+                )
+                if index:
+                    out.write(", ")
+                json.dump(conversation, out)
+            out.write("]")
+            out.flush()
+            out.detach()
+        archive.writestr(
+            "user.json", json.dumps({"id": "user-synthetic", "email": "synthetic@example.com"})
+        )
+        archive.writestr("message_feedback.json", "[]")
+        uncompressed = archive.getinfo("conversations.json").file_size
+    
+    return {
+        "path": str(path),
+        "options": asdict(options),
+        "conversations": options.conversations,
+        "messages": messages,
+        "conversations_json_bytes": uncompressed,
+        "zip_bytes": path.stat().st_size
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic ChatGPT export zip')
+    parser.add_argument('output', help='Path of the zip to write')
+    parser.add_argument('--conversations', type=int, default=ExportOptions.conversations)
+    parser.add_argument('--mean-turns', type=float, default=ExportOptions.mean_turns)
+    parser.add_argument('--user-words', type=int, default=ExportOptions.user_words_median,
+                        help='Median words per user message')
+    parser.add_argument('--assistant-words', type=int, default=ExportOptions.assistant_words_median,
+                        help='Median words per assistant message')
+    parser.add_argument('--words-sigma', type=float, default=ExportOptions.words_sigma,
+                        help='Log-normal spread of message lengths')
+    parser.add_argument(
+        '--branch-probability', type=float, default=ExportOptions.branch_probability
+    )
+    parser.add_argument('--code-probability', type=float, default=ExportOptions.code_probability)
+    parser.add_argument('--seed', type=int, default=ExportOptions.seed)
+    args = parser.parse_args()
+    
+    summary = write_export(Path(args.output), ExportOptions(
+        conversations=args.conversations,
+        mean_turns=args.mean_turns,
+        user_words_median=args.user_words,
+        assistant_words_median=args.assistant_words,
+        words_sigma=args.words_sigma,
+        branch_probability=args.branch_probability,
+        code_probability=args.code_probability,
+        seed=args.seed
+    ))
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+from typing import List, Dict, Any, Optional, Tuple
+import re
+import threading
+
+# Fenced code blocks are kept together where possible; an unterminated fence runs to the end
+_CODE_BLOCK = re.compile(r'```.*?(?:```|\Z)', re.S)
+_PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n\s*')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=\S)')
+_LINE_BREAK = re.compile(r'\n')
+_APPROXIMATE_TOKEN = re.compile(r'\w+|[^\w\s]')
+
+# Tokenizers are loaded once per process and shared by every chunker
+_TOKENIZERS: Dict[str, Any] = {}
+_TOKENIZER_LOCK = threading.Lock()
+
+# (start, end, token count, token offsets relative to start)
+Segment = Tuple[int, int, int, List[Tuple[int, int]]]
+
+def _load_tokenizer(model_name: str):
+    if model_name not in _TOKENIZERS:
+        with _TOKENIZER_LOCK:
+            if model_name not in _TOKENIZERS:
+                from transformers import AutoTokenizer
+                
+                _TOKENIZERS[model_name] = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    return _TOKENIZERS[model_name]
+
+def _split_spans(text: str, start: int, end: int, pattern) -> List[Tuple[int, int]]:
+    """Split text[start:end] at pattern matches, trimming surrounding whitespace"""
+    spans = []
+    pos = start
+    for match in pattern.finditer(text, start, end):
+        spans.append((pos, match.start()))
+        pos = match.end()
+    spans.append((pos, end))
+    
+    trimmed = []
+    for span_start, span_end in spans:
+        while span_start < span_end and text[span_start].isspace():
+            span_start += 1
+        while span_end > span_start and text[span_end - 1].isspace():
+            span_end -= 1
+        if span_start < span_end:
+            trimmed.append((span_start, span_end))
+    return trimmed
+
+def segment_text(text: str) -> List[List[Tuple[int, int]]]:
+    """
+    Split text into blocks of segments
+    
+    Blocks are paragraphs or fenced code blocks; segments are sentences within
+    a paragraph or lines within a code block. Offsets index into `text`.
+    """
+    blocks = []
+    pos = 0
+    
+    def add_prose(start: int, end: int):
+        for para_start, para_end in _split_spans(text, start, end, _PARAGRAPH_BREAK):
+            blocks.append(_split_spans(text, para_start, para_end, _SENTENCE_END))
+    
+    for match in _CODE_BLOCK.finditer(text):
+        add_prose(pos, match.start())
+        lines = _split_spans(text, match.start(), match.end(), _LINE_BREAK)
+        if lines:
+            blocks.append(lines)
+        pos = match.end()
+    add_prose(pos, len(text))
+    
+    return blocks
+
+class TextChunker:
+    """
+    Token-aware splitter producing (start, end) character spans
+    
+    Text is segmented by paragraph, sentence and fenced code block, token
+    counts come from the embedding model's tokenizer in one batched call,
+    and segments are packed greedily into chunks of at most `chunk_size`
+    tokens with roughly `overlap` tokens repeated between neighbours. Whole
+    paragraphs and code blocks start a fresh chunk rather than being split
+    when they fit in one. Only offsets are returned; no chunk text is copied.
+    """
+    
+    def __init__(
+        self,
+        chunk_size: int = 512,
+        overlap: int = 128,
+        model_name: Optional[str] = None,
+        tokenizer: str = "model"
+    ):
+        """
+        Args:
+            chunk_size: Maximum tokens per chunk
+            overlap: Tokens shared between consecutive chunks
+            model_name: Model whose tokenizer counts tokens
+            tokenizer: "model" for the model's tokenizer, or "approximate" to
+                count words and punctuation without loading one
+        """
+        self.chunk_size = max(1, chunk_size)
+        self.overlap = max(0, min(overlap, self.chunk_size // 2))
+        self.model_name = model_name
+        self.tokenizer = tokenizer
+    
+    @classmethod
+    def from_config(cls, analysis_config: Optional[Dict[str, Any]], embeddings_config: Optional[Dict[str, Any]]) -> 'TextChunker':
+        """Create a chunker from the `analysis` and `embeddings` config sections"""
+        analysis_config = analysis_config or {}
+        embeddings_config = embeddings_config or {}
+        
+        # Leave room for the model's special tokens so chunks are never truncated
+        max_tokens = embeddings_config.get("max_length", 512) - 2
+        return cls(
+            chunk_size=min(analysis_config.get("chunk_size", 512), max_tokens),
+            overlap=analysis_config.get("overlap", 128),
+            model_name=embeddings_config.get("model_name", "sentence-transformers/all-MiniLM-L6-v2"),
+            tokenizer=analysis_config.get("tokenizer", "model")
+        )
+    
+    def load(self):
+        """Load the tokenizer now rather than on the first split"""
+        if self.tokenizer != "approximate":
+            _load_tokenizer(self.model_name)
+    
+    def _token_offsets(self, texts: List[str]) -> List[List[Tuple[int, int]]]:
+        """Token character offsets for each text, from a single batched tokenizer call"""
+        if not texts:
+            return []
+        
+        if self.tokenizer == "approximate":
+            return [[match.span() for match in _APPROXIMATE_TOKEN.finditer(text)] for text in texts]
+        
+        encoded = _load_tokenizer(self.model_name)(
+            texts,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False
+        )
+        return [[tuple(offset) for offset in offsets] for offsets in encoded["offset_mapping"]]
+    
+    def split(self, texts: List[str]) -> List[List[Tuple[int, int]]]:
+        """
+        Compute chunk spans for a batch of texts
+        
+        Args:
+            texts: Texts to split
+        
+        Returns:
+            For each text, the (start, end) character offsets of its chunks
+        """
+        results: List[Optional[List[Tuple[int, int]]]] = [None] * len(texts)
+        
+        # A token spans at least one character, so short texts always fit
+        long_texts = {}
+        for index, text in enumerate(texts):
+            if len(text) <= self.chunk_size:
+                results[index] = [(0, len(text))]
+            else:
+                long_texts[index] = segment_text(text)
+        
+        flat = [
+            (index, start, end)
+            for index, blocks in long_texts.items()
+            for block in blocks
+            for start, end in block
+        ]
+        offsets = iter(self._token_offsets([texts[index][start:end] for index, start, end in flat]))
+        
+        for index, blocks in long_texts.items():
+            segmented = [
+                [(start, end, None, None) for start, end in block]
+                for block in blocks
+            ]
+            for block in segmented:
+                for position, (start, end, _, _) in enumerate(block):
+                    token_offsets = next(offsets)
+                    block[position] = (start, end, len(token_offsets), token_offsets)
+            
+            results[index] = self._pack(segmented) or [(0, len(texts[index]))]
+        
+        return results
+    
+    def _fit(self, segment: Segment) -> List[Segment]:
+        """Split a segment longer than chunk_size into overlapping token windows"""
+        start, end, tokens, token_offsets = segment
+        if tokens <= self.chunk_size:
+            return [segment]
+        
+        windows = []
+        stride = self.chunk_size - self.overlap
+        for first in range(0, tokens, stride):
+            last = min(first + self.chunk_size, tokens)
+            windows.append((
+                start + token_offsets[first][0],
+                start + token_offsets[last - 1][1],
+                last - first,
+                None
+            ))
+            if last == tokens:
+                break
+        return windows
+    
+    def _pack(self, blocks: List[List[Segment]]) -> List[Tuple[int, int]]:
+        """Greedily pack segments into chunks, carrying overlap between them"""
+        chunks = []
+        current: List[Segment] = []
+        size = 0
+        fresh = False  # current holds content not yet emitted in a chunk
+        
+        def flush():
+            nonlocal current, size, fresh
+            chunks.append((current[0][0], current[-1][1]))
+            
+            carry = []
+            carried = 0
+            for segment in reversed(current):
+                if carried + segment[2] > self.overlap:
+                    break
+                carry.insert(0, segment)
+                carried += segment[2]
+            current, size, fresh = carry, carried, False
+        
+        def add(segment: Segment):
+            nonlocal size, fresh
+            if fresh and size + segment[2] > self.chunk_size:
+                flush()
+            while current and size + segment[2] > self.chunk_size:
+                size -= current.pop(0)[2]
+            current.append(segment)
+            size += segment[2]
+            fresh = True
+        
+        for block in blocks:
+            block_tokens = sum(segment[2] for segment in block)
+            if fresh and size + block_tokens > self.chunk_size and block_tokens <= self.chunk_size:
+                flush()
+            for segment in block:
+                for piece in self._fit(segment):
+                    add(piece)
+        
+        if fresh:
+            chunks.append((current[0][0], current[-1][1]))
+        return chunks
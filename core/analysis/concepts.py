@@ -0,0 +1,389 @@
+from typing import List, Dict, Any, Awaitable, Callable, Iterable, Optional, Sequence, Set, Tuple
+from pathlib import Path
+import asyncio
+import os
+import re
+import threading
+import uuid
+
+import numpy as np
+
+from ...core.models.conversation import ConversationThread, ID_NAMESPACE
+
+# Pipeline components concept extraction never reads; excluded ones are neither loaded nor run
+EXCLUDED_COMPONENTS = [
+    "lemmatizer", "textcat", "textcat_multilabel", "entity_linker", "senter", "spancat"
+]
+
+# Entity types naming amounts rather than concepts
+_IGNORED_ENTITY_LABELS = frozenset({
+    "CARDINAL", "ORDINAL", "QUANTITY", "PERCENT", "MONEY", "DATE", "TIME"
+})
+
+# Parts of speech trimmed from the edges of a candidate ("the", "my", ",")
+_EDGE_POS = frozenset({"DET", "PRON", "PUNCT", "ADP", "CCONJ", "PART", "SPACE"})
+
+_WHITESPACE = re.compile(r'\s+')
+
+# Format of a saved concept registry; other versions are discarded on load
+REGISTRY_VERSION = 1
+
+# Pipelines are loaded once per process and shared by every extractor
+_PIPELINES: Dict[str, Any] = {}
+_PIPELINE_LOCK = threading.Lock()
+
+# (concept key, surface form, entity label or None, occurrences in the message)
+Mention = Tuple[str, str, Optional[str], int]
+
+# (message id, mentions found in its content)
+MessageMentions = Tuple[str, List[Mention]]
+
+# (message id, concept key, surface form, entity label, relevance, occurrences)
+ScoredMention = Tuple[str, str, str, Optional[str], float, int]
+
+def _load_pipeline(model_name: str):
+    if model_name not in _PIPELINES:
+        with _PIPELINE_LOCK:
+            if model_name not in _PIPELINES:
+                import spacy
+                
+                _PIPELINES[model_name] = spacy.load(model_name, exclude=EXCLUDED_COMPONENTS)
+    return _PIPELINES[model_name]
+
+def concept_key(text: str) -> str:
+    """Normalized form under which surface forms are counted and merged exactly"""
+    return _WHITESPACE.sub(' ', text).strip().lower()
+
+class ConceptExtractor:
+    """
+    Extract concept mentions from messages with spaCy
+    
+    Candidates are named entities and noun chunks, trimmed of determiners and
+    punctuation. Whole batches go through a single `nlp.pipe` call with the
+    unused pipeline components excluded. Relevance is scored per batch, so
+    concepts common to every message rank below distinctive ones.
+    """
+    
+    def __init__(
+        self,
+        model_name: str = "en_core_web_sm",
+        batch_size: int = 64,
+        n_process: int = 1,
+        min_relevance: float = 0.5,
+        max_concepts_per_message: int = 10,
+        max_chars: int = 20000
+    ):
+        """
+        Args:
+            model_name: spaCy pipeline to load
+            batch_size: Texts per `nlp.pipe` batch
+            n_process: Processes used by `nlp.pipe` when extracting in the
+                main process; parse workers always use their own process
+            min_relevance: Mentions scoring below this are dropped
+            max_concepts_per_message: Mentions kept per message
+            max_chars: Characters of each message that are analyzed
+        """
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.n_process = max(1, n_process)
+        self.min_relevance = min_relevance
+        self.max_concepts_per_message = max(1, max_concepts_per_message)
+        self.max_chars = max_chars
+    
+    @classmethod
+    def from_config(cls, analysis_config: Optional[Dict[str, Any]]) -> Optional['ConceptExtractor']:
+        """Create an extractor from the `analysis` config section, or None when disabled"""
+        analysis_config = analysis_config or {}
+        if not analysis_config.get("extract_concepts", True):
+            return None
+        
+        return cls(
+            model_name=analysis_config.get("concept_model", "en_core_web_sm"),
+            batch_size=analysis_config.get("concept_batch_size", 64),
+            n_process=analysis_config.get("concept_processes", 1),
+            min_relevance=analysis_config.get("min_concept_relevance", 0.5),
+            max_concepts_per_message=analysis_config.get("max_concepts_per_message", 10)
+        )
+    
+    @property
+    def nlp(self):
+        return _load_pipeline(self.model_name)
+    
+    def extract(
+        self,
+        threads: Iterable[ConversationThread],
+        message_filter: Optional[Dict[str, Set[str]]] = None,
+        n_process: Optional[int] = None
+    ) -> List[MessageMentions]:
+        """
+        Find concept mentions in every message of a group of threads
+        
+        Args:
+            threads: Threads to analyze
+            message_filter: Optional thread id -> subset of messages to analyze
+            n_process: Override for the number of `nlp.pipe` processes
+        
+        Returns:
+            One entry per analyzed message, including messages without mentions
+        """
+        message_filter = message_filter or {}
+        messages = []
+        for thread in threads:
+            message_ids = message_filter.get(thread.id)
+            for msg in thread.iter_messages():
+                if message_ids is not None and msg.id not in message_ids:
+                    continue
+                if msg.content.strip():
+                    messages.append(msg)
+        
+        if not messages:
+            return []
+        
+        docs = self.nlp.pipe(
+            (msg.content[:self.max_chars] for msg in messages),
+            batch_size=self.batch_size,
+            n_process=n_process or self.n_process
+        )
+        return [(msg.id, self._mentions(doc)) for msg, doc in zip(messages, docs)]
+    
+    def _mentions(self, doc) -> List[Mention]:
+        """Count the trimmed entity and noun chunk candidates in one document"""
+        counts: Dict[str, int] = {}
+        forms: Dict[str, Tuple[str, Optional[str]]] = {}
+        seen_spans = set()
+        
+        def add(span, label: Optional[str]):
+            start, end = span.start, span.end
+            while start < end and (doc[start].pos_ in _EDGE_POS or doc[start].is_stop):
+                start += 1
+            while end > start and (doc[end - 1].pos_ in _EDGE_POS or doc[end - 1].is_stop):
+                end -= 1
+            if (start, end) in seen_spans or all(token.like_num for token in doc[start:end]):
+                return
+            seen_spans.add((start, end))
+            
+            text = doc[start:end].text
+            key = concept_key(text)
+            if len(key) < 3:
+                return
+            counts[key] = counts.get(key, 0) + 1
+            if key not in forms or (label and not forms[key][1]):
+                forms[key] = (text, label)
+        
+        for entity in doc.ents:
+            if entity.label_ not in _IGNORED_ENTITY_LABELS:
+                add(entity, entity.label_)
+        
+        # noun_chunks needs the dependency parse
+        if doc.has_annotation("DEP"):
+            for chunk in doc.noun_chunks:
+                if chunk.root.pos_ != "PRON":
+                    add(chunk, None)
+        
+        return [(key, forms[key][0], forms[key][1], count) for key, count in counts.items()]
+    
+    def select(self, mentions: Sequence[MessageMentions]) -> List[ScoredMention]:
+        """
+        Score a batch of mentions and keep the most relevant ones per message
+        
+        Relevance is a smoothed TF-IDF over the batch, normalized to (0, 1]:
+        (0.5 + 0.5 * count / max count in the message) * idf / max idf.
+        
+        Returns:
+            Kept mentions grouped by message, most relevant first
+        """
+        flat = [
+            (index, message_id, mention)
+            for index, (message_id, message_mentions) in enumerate(mentions)
+            for mention in message_mentions
+        ]
+        if not flat:
+            return []
+        
+        key_index: Dict[str, int] = {}
+        message_idx = np.fromiter((index for index, _, _ in flat), dtype=np.int64, count=len(flat))
+        key_idx = np.fromiter(
+            (key_index.setdefault(mention[0], len(key_index)) for _, _, mention in flat),
+            dtype=np.int64,
+            count=len(flat)
+        )
+        counts = np.fromiter((mention[3] for _, _, mention in flat), dtype=np.float64, count=len(flat))
+        
+        n_messages = len(mentions)
+        df = np.bincount(key_idx, minlength=len(key_index))
+        idf = (np.log((1 + n_messages) / (1 + df)) + 1) / (np.log(1 + n_messages) + 1)
+        max_count = np.zeros(n_messages)
+        np.maximum.at(max_count, message_idx, counts)
+        relevance = (0.5 + 0.5 * counts / max_count[message_idx]) * idf[key_idx]
+        
+        # Rank within each message by descending relevance
+        order = np.lexsort((-relevance, message_idx))
+        grouped = message_idx[order]
+        rank = np.arange(len(order)) - np.searchsorted(grouped, grouped, side="left")
+        keep = order[(rank < self.max_concepts_per_message) & (relevance[order] >= self.min_relevance)]
+        
+        selected = []
+        for row in keep.tolist():
+            _, message_id, (key, name, label, count) = flat[row]
+            selected.append((message_id, key, name, label, float(relevance[row]), count))
+        return selected
+
+class ConceptRegistry:
+    """
+    Canonical concepts seen so far, merged by embedding similarity
+    
+    Surface forms with the same key always map to the same concept. A new key
+    joins the most similar known concept when their cosine similarity reaches
+    `similarity_threshold`; otherwise it becomes a concept itself and absorbs
+    similar keys from the same batch. All comparisons are matrix products.
+    
+    Which concept a key joins depends on the concepts created before it, so
+    the registry is saved next to the import manifest and reloaded by the next
+    import; otherwise an incremental import would start empty and create
+    concepts that earlier keys already merged into.
+    """
+    
+    def __init__(self, similarity_threshold: float = 0.9, path: Optional[Path] = None):
+        """
+        Args:
+            similarity_threshold: Cosine similarity at which a key joins a concept
+            path: File the registry is saved to and loaded from; None keeps it in memory
+        """
+        self.similarity_threshold = similarity_threshold
+        self.path = None if path is None else Path(path)
+        self._loaded = False
+        self._ids: Dict[str, str] = {}  # key -> concept id
+        self._concepts: Dict[str, Tuple[str, Optional[str]]] = {}  # concept id -> (name, label)
+        self._canonical_ids: List[str] = []
+        self._matrix: Optional[np.ndarray] = None  # rows of unit-length canonical vectors
+        self._lock: Optional[asyncio.Lock] = None
+    
+    def __len__(self) -> int:
+        return len(self._canonical_ids)
+    
+    def load(self):
+        """Read the saved registry unless it is already loaded; blocks on file I/O"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path is None or not self.path.is_file():
+            return
+        
+        with np.load(self.path, allow_pickle=False) as data:
+            if int(data["version"]) != REGISTRY_VERSION:
+                return
+            concept_ids = data["concept_ids"].tolist()
+            labels = data["labels"].tolist()
+            self._concepts = {
+                concept_id: (name, label or None)
+                for concept_id, name, label in zip(concept_ids, data["names"].tolist(), labels)
+            }
+            key_concepts = data["key_concepts"].tolist()
+            self._ids = {key: concept_ids[row] for key, row in zip(data["keys"].tolist(), key_concepts)}
+            self._canonical_ids = concept_ids
+            self._matrix = None
+            if concept_ids:
+                self._append_rows(data["matrix"])
+    
+    def save(self):
+        """Atomically write the registry to `path`; blocks on file I/O"""
+        if self.path is None or not self._ids:
+            return
+        
+        rows = {concept_id: row for row, concept_id in enumerate(self._canonical_ids)}
+        names, labels = zip(*(self._concepts[concept_id] for concept_id in self._canonical_ids))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                version=np.int64(REGISTRY_VERSION),
+                keys=np.array(list(self._ids), dtype=str),
+                key_concepts=np.fromiter((rows[concept_id] for concept_id in self._ids.values()), dtype=np.int64),
+                concept_ids=np.array(self._canonical_ids, dtype=str),
+                names=np.array(names, dtype=str),
+                labels=np.array([label or "" for label in labels], dtype=str),
+                matrix=self._matrix[:len(self._canonical_ids)]
+            )
+        os.replace(tmp_path, self.path)
+    
+    def describe(self, concept_id: str) -> Tuple[str, Optional[str]]:
+        """Canonical name and entity label of a concept"""
+        return self._concepts[concept_id]
+    
+    async def resolve(
+        self,
+        forms: Dict[str, Tuple[str, Optional[str]]],
+        embed: Callable[[List[str]], Awaitable[List[List[float]]]]
+    ) -> Dict[str, str]:
+        """
+        Map concept keys to concept ids
+        
+        Args:
+            forms: key -> (surface form, entity label), most prominent first;
+                earlier forms become the canonical names of new concepts
+            embed: Coroutine embedding a batch of texts
+        
+        Returns:
+            key -> concept id for every key in `forms`
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        # Store workers resolve concurrently; serialize so a concept is created once
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            if not self._loaded:
+                await loop.run_in_executor(None, self.load)
+            
+            unknown = [key for key in forms if key not in self._ids]
+            if unknown:
+                vectors = np.asarray(await embed([forms[key][0] for key in unknown]), dtype=np.float32)
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+                
+                # Similarity matrices grow with the registry; keep them off the event loop
+                await loop.run_in_executor(None, self._assign, unknown, vectors, forms)
+            
+            return {key: self._ids[key] for key in forms}
+    
+    def _assign(self, keys: List[str], vectors: np.ndarray, forms: Dict[str, Tuple[str, Optional[str]]]):
+        assigned: List[Optional[str]] = [None] * len(keys)
+        
+        if self._canonical_ids:
+            similarity = vectors @ self._matrix[:len(self._canonical_ids)].T
+            best = similarity.argmax(axis=1)
+            best_similarity = similarity[np.arange(len(keys)), best]
+            for index in np.flatnonzero(best_similarity >= self.similarity_threshold).tolist():
+                assigned[index] = self._canonical_ids[best[index]]
+        
+        remaining = [index for index, concept_id in enumerate(assigned) if concept_id is None]
+        if remaining:
+            similarity = vectors[remaining] @ vectors[remaining].T
+            new_rows = []
+            for position, index in enumerate(remaining):
+                if assigned[index] is not None:
+                    continue
+                
+                concept_id = str(uuid.uuid5(ID_NAMESPACE, f"concept:{keys[index]}"))
+                self._concepts[concept_id] = forms[keys[index]]
+                self._canonical_ids.append(concept_id)
+                new_rows.append(index)
+                for member in np.flatnonzero(similarity[position] >= self.similarity_threshold).tolist():
+                    if assigned[remaining[member]] is None:
+                        assigned[remaining[member]] = concept_id
+            
+            self._append_rows(vectors[new_rows])
+        
+        for key, concept_id in zip(keys, assigned):
+            self._ids[key] = concept_id
+    
+    def _append_rows(self, rows: np.ndarray):
+        """Append canonical vectors, doubling the backing matrix when it is full"""
+        start = len(self._canonical_ids) - len(rows)
+        if self._matrix is None:
+            self._matrix = np.empty((max(1024, len(rows)), rows.shape[1]), dtype=np.float32)
+        elif start + len(rows) > len(self._matrix):
+            grown = np.empty((max(2 * len(self._matrix), start + len(rows)), rows.shape[1]), dtype=np.float32)
+            grown[:start] = self._matrix[:start]
+            self._matrix = grown
+        self._matrix[start:start + len(rows)] = rows
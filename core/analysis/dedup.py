@@ -0,0 +1,317 @@
+from typing import List, Dict, Any, Hashable, Optional, Sequence, Tuple
+from pathlib import Path
+import json
+import re
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+
+_WORD = re.compile(r'\w+')
+
+# Initial capacity of the signature matrix, which doubles when full
+_INITIAL_ROWS = 1024
+
+DEFAULT_MAX_SIGNATURES = 500000
+
+class NearDuplicateIndex:
+    """
+    Find near-identical texts with MinHash signatures and LSH banding
+    
+    A text is reduced to the set of its word n-grams (shingles); the fraction
+    of equal signature positions of two texts estimates the Jaccard similarity
+    of their shingle sets. Signatures are split into `bands` bands of
+    `num_perm / bands` rows, and texts sharing any whole band are candidates,
+    so lookups never compare against every indexed text.
+    
+    The index keeps one representative per group of near duplicates: the
+    first text seen. Later texts whose estimated similarity to a candidate
+    reaches `threshold` map to that representative; others become
+    representatives themselves. Texts are only compared within the same
+    `group` (e.g. the message role).
+    
+    Representatives added for a `batch` stay pending until commit(batch):
+    other batches do not match them, so a duplicate is only ever linked to a
+    text that was stored; discard(batch) drops them when the batch fails.
+    Buckets keep every representative hashed to them, so a pending
+    representative never hides one of the same batch. With a `path`, committed representatives are kept
+    in a SQLite file and loaded by the next import; beyond `max_signatures`
+    the oldest are dropped. Values must be JSON-serializable; lists come
+    back as tuples.
+    """
+    
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        num_perm: int = 64,
+        bands: int = 8,
+        shingle_size: int = 3,
+        seed: int = 1,
+        path: Optional[Path] = None,
+        max_signatures: int = DEFAULT_MAX_SIGNATURES
+    ):
+        """
+        Args:
+            threshold: Estimated Jaccard similarity at which a text is a duplicate
+            num_perm: Hash functions per signature
+            bands: LSH bands; must divide num_perm. More bands find less
+                similar candidates at the cost of more lookups
+            shingle_size: Words per shingle
+            seed: Seed of the hash functions
+            path: SQLite file keeping committed representatives; None keeps them in memory
+            max_signatures: Representatives kept in the file, newest first
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = max(1, shingle_size)
+        self.path = None if path is None else Path(path)
+        self.max_signatures = max_signatures
+        
+        # Multiply-add-shift hashing of 32-bit shingle hashes; arithmetic wraps modulo 2**64
+        self._params = json.dumps({"num_perm": num_perm, "shingle_size": self.shingle_size, "seed": seed})
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 63, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+        
+        self._buckets: Dict[str, List[Dict[int, List[int]]]] = {}  # group -> per-band bucket -> representatives
+        self._signatures: Optional[np.ndarray] = None  # rows of representative signatures
+        self._values: List[Any] = []
+        self._groups: List[str] = []
+        self._pending: Dict[Hashable, List[int]] = {}  # batch -> representatives not yet stored
+        self._pending_batch: Dict[int, Hashable] = {}  # representative -> its pending batch
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._loaded = self.path is None
+    
+    @classmethod
+    def from_config(
+        cls,
+        dedup_config: Optional[Dict[str, Any]],
+        storage_config: Optional[Dict[str, Any]] = None
+    ) -> Optional['NearDuplicateIndex']:
+        """
+        Create an index from the `deduplication` section of the config, or None when disabled
+        
+        Representatives are kept under `storage.cache_dir` when a storage section is given.
+        """
+        config = dedup_config or {}
+        if not config.get("enabled", False):
+            return None
+        path = None
+        if storage_config is not None:
+            path = Path(storage_config.get("cache_dir", "cache")) / "near_duplicates.sqlite3"
+        return cls(
+            threshold=config.get("threshold", 0.85),
+            num_perm=config.get("num_perm", 64),
+            bands=config.get("bands", 8),
+            shingle_size=config.get("shingle_size", 3),
+            path=path,
+            max_signatures=config.get("max_signatures", DEFAULT_MAX_SIGNATURES)
+        )
+    
+    def __len__(self) -> int:
+        return len(self._values)
+    
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of a text, or None when it has no words"""
+        words = _WORD.findall(text.lower())
+        if not words:
+            return None
+        
+        size = min(self.shingle_size, len(words))
+        shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        return ((self._a * hashes + self._b) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+    
+    def find_or_add(
+        self,
+        texts: Sequence[str],
+        groups: Sequence[str],
+        values: Sequence[Any],
+        batch: Optional[Hashable] = None
+    ) -> List[Optional[Tuple[Any, float]]]:
+        """
+        Match texts against the representatives indexed so far
+        
+        Texts are handled in order, so a text can also match one added earlier
+        in the same call or batch.
+        
+        Args:
+            texts: Texts to look up
+            groups: Group of each text; only texts of the same group match
+            values: Value stored for each text that becomes a representative
+            batch: Key under which new representatives stay pending until
+                commit(batch); None commits them right away
+        
+        Returns:
+            For each text, the representative's value and the estimated
+            similarity, or None when the text was added as a representative
+            (texts without words are neither matched nor added)
+        """
+        matches: List[Optional[Tuple[Any, float]]] = []
+        added = []
+        with self._lock:
+            self._load()
+            for text, group, value in zip(texts, groups, values):
+                signature = self.signature(text)
+                if signature is None:
+                    matches.append(None)
+                    continue
+                
+                buckets = self._buckets.get(group)
+                if buckets is None:
+                    buckets = self._buckets[group] = [{} for _ in range(self.bands)]
+                keys = [hash(band.tobytes()) for band in signature.reshape(self.bands, self.rows_per_band)]
+                
+                match = self._best_candidate(signature, buckets, keys, batch)
+                if match is not None:
+                    matches.append((self._values[match[0]], match[1]))
+                    continue
+                
+                index = self._append(signature, value, group)
+                for band, key in zip(buckets, keys):
+                    band.setdefault(key, []).append(index)
+                added.append(index)
+                matches.append(None)
+            
+            if batch is None:
+                self._save(added)
+            elif added:
+                self._pending.setdefault(batch, []).extend(added)
+                for index in added:
+                    self._pending_batch[index] = batch
+        return matches
+    
+    def commit(self, batch: Hashable):
+        """Make a batch's representatives matchable by every batch once its units are stored"""
+        with self._lock:
+            added = self._pending.pop(batch, [])
+            for index in added:
+                del self._pending_batch[index]
+            self._save(added)
+    
+    def discard(self, batch: Hashable):
+        """Forget a batch's pending representatives when its units were not stored; no-op after commit"""
+        with self._lock:
+            added = self._pending.pop(batch, [])
+            for index in added:
+                del self._pending_batch[index]
+                buckets = self._buckets[self._groups[index]]
+                for band, key in zip(buckets, self._signatures[index].reshape(self.bands, self.rows_per_band)):
+                    key = hash(key.tobytes())
+                    band[key].remove(index)
+                    if not band[key]:
+                        del band[key]
+    
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS signatures ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, grp TEXT NOT NULL, "
+                "value TEXT NOT NULL, signature BLOB NOT NULL)"
+            )
+            
+            # Signatures from other hash parameters are not comparable
+            row = conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+            if row is None or row[0] != self._params:
+                conn.execute("DELETE FROM signatures")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('params', ?)", (self._params,))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def _load(self):
+        """Index the newest stored representatives once; called with the lock held"""
+        if self._loaded:
+            return
+        self._loaded = True
+        
+        rows = self._connect().execute(
+            "SELECT grp, value, signature FROM signatures ORDER BY id DESC LIMIT ?", (self.max_signatures,)
+        ).fetchall()
+        for group, value, blob in reversed(rows):
+            signature = np.frombuffer(blob, dtype='<u4').astype(np.uint32)
+            value = json.loads(value)
+            index = self._append(signature, tuple(value) if isinstance(value, list) else value, group)
+            buckets = self._buckets.get(group)
+            if buckets is None:
+                buckets = self._buckets[group] = [{} for _ in range(self.bands)]
+            for band, key in zip(buckets, signature.reshape(self.bands, self.rows_per_band)):
+                band.setdefault(hash(key.tobytes()), []).append(index)
+    
+    def _save(self, indexes: List[int]):
+        """Append representatives to the file, dropping the oldest beyond max_signatures"""
+        if self.path is None or not indexes:
+            return
+        
+        conn = self._connect()
+        conn.executemany(
+            "INSERT INTO signatures (grp, value, signature) VALUES (?, ?, ?)",
+            [
+                (self._groups[index], json.dumps(self._values[index]),
+                 self._signatures[index].astype('<u4').tobytes())
+                for index in indexes
+            ]
+        )
+        conn.execute(
+            "DELETE FROM signatures WHERE id <= (SELECT MAX(id) FROM signatures) - ?", (self.max_signatures,)
+        )
+        conn.commit()
+    
+    def _best_candidate(
+        self,
+        signature: np.ndarray,
+        buckets: List[Dict[int, List[int]]],
+        keys: List[int],
+        batch: Optional[Hashable]
+    ) -> Optional[Tuple[int, float]]:
+        # Representatives of other batches may not be stored yet
+        candidates = {
+            index for band, key in zip(buckets, keys) for index in band.get(key, ())
+            if self._pending_batch.get(index, batch) == batch
+        }
+        if not candidates:
+            return None
+        
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self._signatures[rows] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        if similarity[best] < self.threshold:
+            return None
+        return int(rows[best]), float(similarity[best])
+    
+    def _append(self, signature: np.ndarray, value: Any, group: str) -> int:
+        """Add a representative, doubling the signature matrix when it is full"""
+        index = len(self._values)
+        if self._signatures is None:
+            self._signatures = np.empty((_INITIAL_ROWS, self.num_perm), dtype=np.uint32)
+        elif index >= len(self._signatures):
+            grown = np.empty((2 * len(self._signatures), self.num_perm), dtype=np.uint32)
+            grown[:index] = self._signatures
+            self._signatures = grown
+        self._signatures[index] = signature
+        self._values.append(value)
+        self._groups.append(group)
+        return index
@@ -0,0 +1,574 @@
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
+from pathlib import Path
+import math
+import os
+import threading
+
+import numpy as np
+
+from ...core.models.conversation import ConversationThread
+
+# Role codes stored in the message table; anything else is ROLE_OTHER
+ROLE_CODES = {"user": 0, "assistant": 1, "system": 2, "tool": 3}
+ROLE_OTHER = len(ROLE_CODES)
+ROLE_NAMES = list(ROLE_CODES) + ["other"]
+
+# Format of a saved message table; other versions are discarded on load
+TABLE_VERSION = 2
+
+METRICS = [
+    "message_frequency",
+    "response_times",
+    "topic_diversity",
+    "conversation_depth",
+    "interaction_patterns"
+]
+
+class MessageTable:
+    """
+    Columnar table of every imported message
+    
+    Rows of one conversation are contiguous, in breadth-first order from its
+    root, and `offsets[c]:offsets[c + 1]` selects conversation `c`. Parent
+    indexes are global row numbers, or -1 for roots. Timestamps are epoch
+    seconds, NaN when the export has none. A message's topic is the code in
+    `topics` of its most relevant concept, or -1 when it has none.
+    """
+    
+    def __init__(
+        self,
+        conversation_ids: List[str],
+        offsets: np.ndarray,
+        message_ids: List[str],
+        parent: np.ndarray,
+        role: np.ndarray,
+        timestamp: np.ndarray,
+        depth: np.ndarray,
+        length: np.ndarray,
+        topic: np.ndarray,
+        topics: List[str]
+    ):
+        self.conversation_ids = conversation_ids
+        self.offsets = offsets
+        self.message_ids = message_ids
+        self.parent = parent
+        self.role = role
+        self.timestamp = timestamp
+        self.depth = depth
+        self.length = length
+        self.topic = topic
+        self.topics = topics
+        self._index = {conversation_id: code for code, conversation_id in enumerate(conversation_ids)}
+        self._conversation = None
+    
+    def __len__(self) -> int:
+        return len(self.message_ids)
+    
+    @property
+    def conversation(self) -> np.ndarray:
+        """Conversation code of every row"""
+        if self._conversation is None:
+            self._conversation = np.repeat(
+                np.arange(len(self.conversation_ids), dtype=np.int32), np.diff(self.offsets)
+            )
+        return self._conversation
+    
+    def code(self, conversation_id: str) -> Optional[int]:
+        """Row-group code of a conversation, or None if it is not in the table"""
+        return self._index.get(conversation_id)
+    
+    @classmethod
+    def from_threads(
+        cls,
+        threads: Iterable[ConversationThread],
+        topics: Optional[Dict[str, Optional[str]]] = None
+    ) -> 'MessageTable':
+        builder = MessageTableBuilder()
+        builder.add_many(threads, topics)
+        return builder.build()
+    
+    @classmethod
+    def empty(cls) -> 'MessageTable':
+        return cls(
+            conversation_ids=[],
+            offsets=np.zeros(1, dtype=np.int64),
+            message_ids=[],
+            parent=np.empty(0, dtype=np.int64),
+            role=np.empty(0, dtype=np.int8),
+            timestamp=np.empty(0, dtype=np.float64),
+            depth=np.empty(0, dtype=np.int32),
+            length=np.empty(0, dtype=np.int32),
+            topic=np.empty(0, dtype=np.int32),
+            topics=[]
+        )
+    
+    def save(self, path: Path):
+        """Atomically write the table to an .npz file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                version=np.int64(TABLE_VERSION),
+                conversation_ids=np.array(self.conversation_ids, dtype=str),
+                offsets=self.offsets,
+                message_ids=np.array(self.message_ids, dtype=str),
+                parent=self.parent,
+                role=self.role,
+                timestamp=self.timestamp,
+                depth=self.depth,
+                length=self.length,
+                topic=self.topic,
+                topics=np.array(self.topics, dtype=str)
+            )
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path: Path) -> Optional['MessageTable']:
+        """Read a table written by save(), or None if it is missing or from another version"""
+        path = Path(path)
+        if not path.is_file():
+            return None
+        
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != TABLE_VERSION:
+                return None
+            return cls(
+                conversation_ids=data["conversation_ids"].tolist(),
+                offsets=data["offsets"],
+                message_ids=data["message_ids"].tolist(),
+                parent=data["parent"],
+                role=data["role"],
+                timestamp=data["timestamp"],
+                depth=data["depth"],
+                length=data["length"],
+                topic=data["topic"],
+                topics=data["topics"].tolist()
+            )
+
+# Column arrays of one conversation, parents as indexes into the block:
+# (message ids, parent, role, timestamp, depth, length, message id -> concept
+# id or None for the messages whose concepts were analyzed; the others keep
+# the topic of their previous row)
+_Block = Tuple[
+    List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict[str, Optional[str]]
+]
+
+class MessageTableBuilder:
+    """
+    Accumulate per-conversation column blocks during an import
+    
+    Adding a conversation again replaces its rows, so re-imported and
+    updated conversations are never counted twice. Blocks added since the
+    last build() are merged into the previous table with vectorized copies,
+    so building after every batch does not rebuild the table from blocks.
+    Store workers add from several threads while build() may run on another.
+    
+    With a `path`, the table is saved next to the import manifest: an
+    incremental import skips unchanged conversations, so their rows have to
+    come from the previous import.
+    """
+    
+    def __init__(self, table: Optional[MessageTable] = None, path: Optional[Path] = None):
+        """
+        Args:
+            table: Optional existing table whose conversations are kept unless replaced
+            path: File the table is saved to and loaded from; None keeps it in memory
+        """
+        self.path = None if path is None else Path(path)
+        self._table = table if table is not None else MessageTable.empty()
+        self._pending: Dict[str, Optional[_Block]] = {}  # None removes the conversation
+        self._loaded = self.path is None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+    
+    @property
+    def dirty(self) -> bool:
+        """Whether conversations were added since the last build()"""
+        return bool(self._pending) or not self._loaded
+    
+    def load(self):
+        """Read the saved table unless it is already loaded; conversations added before are kept"""
+        if self._loaded:
+            return
+        
+        with self._build_lock:
+            if self._loaded:
+                return
+            saved = MessageTable.load(self.path)
+            if saved is not None:
+                with self._lock:
+                    self._pending = {**_blocks(self._table), **self._pending}
+                self._table = saved
+            self._loaded = True
+    
+    def save(self):
+        """Atomically write the current table to `path`; blocks on file I/O"""
+        if self.path is not None:
+            self.build().save(self.path)
+    
+    def add(self, thread: ConversationThread, topics: Optional[Dict[str, Optional[str]]] = None):
+        """
+        Add or replace the rows of one conversation
+        
+        Args:
+            thread: Conversation to add
+            topics: Optional message id -> most relevant concept id (None for
+                none) of the messages analyzed for concepts; other messages
+                keep the topic they had
+        """
+        messages = thread.traverse_messages()
+        if not messages:
+            with self._lock:
+                self._pending[thread.id] = None
+            return
+        
+        local = {msg.id: index for index, msg in enumerate(messages)}
+        parent = np.fromiter(
+            (local.get(msg.parent_id, -1) for msg in messages), dtype=np.int64, count=len(messages)
+        )
+        
+        # Breadth-first order puts every parent before its children
+        depth = np.zeros(len(messages), dtype=np.int32)
+        for index in range(1, len(messages)):
+            if parent[index] >= 0:
+                depth[index] = depth[parent[index]] + 1
+        
+        topics = topics or {}
+        block = (
+            [msg.id for msg in messages],
+            parent,
+            np.fromiter((ROLE_CODES.get(msg.role, ROLE_OTHER) for msg in messages), dtype=np.int8, count=len(messages)),
+            np.fromiter(
+                (math.nan if msg.create_time is None else msg.create_time for msg in messages),
+                dtype=np.float64,
+                count=len(messages)
+            ),
+            depth,
+            np.fromiter((len(msg.content) for msg in messages), dtype=np.int32, count=len(messages)),
+            {msg.id: topics[msg.id] for msg in messages if msg.id in topics}
+        )
+        with self._lock:
+            # Topics of a pending block not merged yet are kept the same way
+            previous = self._pending.get(thread.id)
+            if previous is not None:
+                block[6].update(
+                    (message_id, topic) for message_id, topic in previous[6].items()
+                    if message_id in local and message_id not in block[6]
+                )
+            self._pending[thread.id] = block
+    
+    def add_many(self, threads: Iterable[ConversationThread], topics: Optional[Dict[str, Optional[str]]] = None):
+        """Add or replace the rows of several conversations; CPU-bound, so run it off the event loop"""
+        for thread in threads:
+            self.add(thread, topics)
+    
+    def build(self) -> MessageTable:
+        """
+        Table of every conversation added so far
+        
+        Returns the previous table unchanged when nothing was added since;
+        loads the saved table first. CPU-bound, so run it off the event loop.
+        """
+        self.load()
+        with self._build_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if pending:
+                self._table = _merge(self._table, pending)
+            return self._table
+
+def _blocks(table: MessageTable) -> Dict[str, _Block]:
+    """Split a table into per-conversation blocks"""
+    blocks = {}
+    for code, conversation_id in enumerate(table.conversation_ids):
+        start, end = table.offsets[code], table.offsets[code + 1]
+        blocks[conversation_id] = (
+            table.message_ids[start:end],
+            np.where(table.parent[start:end] >= 0, table.parent[start:end] - start, -1),
+            table.role[start:end],
+            table.timestamp[start:end],
+            table.depth[start:end],
+            table.length[start:end],
+            {
+                message_id: table.topics[code] if code >= 0 else None
+                for message_id, code in zip(table.message_ids[start:end], table.topic[start:end].tolist())
+            }
+        )
+    return blocks
+
+def _merge(table: MessageTable, pending: Dict[str, Optional[_Block]]) -> MessageTable:
+    """
+    Drop the replaced conversations of a table and append the new blocks
+    
+    Kept rows are copied with boolean masks; only the new blocks are
+    concatenated one by one.
+    """
+    keep = np.ones(len(table.conversation_ids), dtype=bool)
+    for conversation_id in pending:
+        code = table.code(conversation_id)
+        if code is not None:
+            keep[code] = False
+    
+    old_sizes = np.diff(table.offsets)
+    rows = np.repeat(keep, old_sizes)
+    local_parent = np.where(table.parent >= 0, table.parent - np.repeat(table.offsets[:-1], old_sizes), -1)
+    
+    blocks = [(conversation_id, block) for conversation_id, block in pending.items() if block is not None]
+    conversation_ids = [
+        conversation_id for conversation_id, kept in zip(table.conversation_ids, keep.tolist()) if kept
+    ] + [conversation_id for conversation_id, _ in blocks]
+    message_ids = (table.message_ids if keep.all() else
+                   [message_id for message_id, kept in zip(table.message_ids, rows.tolist()) if kept])
+    message_ids = message_ids + [message_id for _, block in blocks for message_id in block[0]]
+    
+    sizes = np.concatenate([old_sizes[keep], [len(block[0]) for _, block in blocks]]).astype(np.int64)
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    
+    def column(kept: np.ndarray, position: int, dtype) -> np.ndarray:
+        return np.concatenate([kept[rows]] + [block[position] for _, block in blocks]).astype(dtype, copy=False)
+    
+    parent = column(local_parent, 1, np.int64)
+    parent = np.where(parent >= 0, parent + np.repeat(offsets[:-1], sizes), -1)
+    
+    # Concept codes only grow, so kept rows keep theirs
+    topics = list(table.topics)
+    topic_codes = {concept_id: code for code, concept_id in enumerate(topics)}
+    new_topics = []
+    for conversation_id, block in blocks:
+        code = table.code(conversation_id)
+        previous = {}
+        if code is not None and len(block[6]) < len(block[0]):
+            start, end = table.offsets[code], table.offsets[code + 1]
+            previous = dict(zip(table.message_ids[start:end], table.topic[start:end].tolist()))
+        for message_id in block[0]:
+            if message_id not in block[6]:
+                new_topics.append(previous.get(message_id, -1))
+                continue
+            concept_id = block[6][message_id]
+            if concept_id is None:
+                new_topics.append(-1)
+                continue
+            if concept_id not in topic_codes:
+                topic_codes[concept_id] = len(topics)
+                topics.append(concept_id)
+            new_topics.append(topic_codes[concept_id])
+    
+    return MessageTable(
+        conversation_ids=conversation_ids,
+        offsets=offsets,
+        message_ids=message_ids,
+        parent=parent,
+        role=column(table.role, 2, np.int8),
+        timestamp=column(table.timestamp, 3, np.float64),
+        depth=column(table.depth, 4, np.int32),
+        length=column(table.length, 5, np.int32),
+        topic=np.concatenate([table.topic[rows], np.array(new_topics, dtype=np.int32)]),
+        topics=topics
+    )
+
+def _grouped_stats(groups: np.ndarray, values: np.ndarray, n_groups: int) -> Dict[str, np.ndarray]:
+    """Count, mean, median and max of values per group code, NaN for empty groups"""
+    count = np.bincount(groups, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(groups, weights=values, minlength=n_groups) / count
+    
+    maximum = np.full(n_groups, np.nan)
+    median = np.full(n_groups, np.nan)
+    if len(values):
+        order = np.lexsort((values, groups))
+        sorted_values = values[order]
+        starts = np.zeros(n_groups, dtype=np.int64)
+        np.cumsum(count[:-1], out=starts[1:])
+        
+        present = count > 0
+        lower = starts[present] + (count[present] - 1) // 2
+        upper = starts[present] + count[present] // 2
+        median[present] = (sorted_values[lower] + sorted_values[upper]) / 2
+        maximum[present] = sorted_values[starts[present] + count[present] - 1]
+    
+    return {"count": count, "mean": mean, "median": median, "max": maximum}
+
+def _value(value) -> Any:
+    """Plain Python value for JSON output, None for NaN"""
+    value = value.item() if isinstance(value, np.generic) else value
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+class MetricsEngine:
+    """
+    Conversation metrics computed for the whole corpus at once
+    
+    Every metric is a set of NumPy group-by reductions over a MessageTable,
+    evaluated on first use and kept. Per-conversation results index into
+    those arrays, so they never walk a conversation tree.
+    """
+    
+    def __init__(self, table: MessageTable):
+        self.table = table
+        self._results: Dict[str, Dict[str, np.ndarray]] = {}
+    
+    def compute(self, metric: str) -> Dict[str, np.ndarray]:
+        """Per-conversation arrays for one metric"""
+        if metric not in self._results:
+            method = getattr(self, f"_{metric}", None)
+            if method is None or metric not in METRICS:
+                raise ValueError(f"Unknown metric: {metric}")
+            self._results[metric] = method()
+        return self._results[metric]
+    
+    def conversation_metrics(self, conversation_id: str, metrics: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Metrics for one conversation, sliced from the corpus-wide arrays
+        
+        Args:
+            conversation_id: Conversation to report on
+            metrics: Metric names (default: every available metric)
+        
+        Returns:
+            Metric name -> dict of values; metrics that cannot be computed from
+            the message table map to None
+        
+        Raises:
+            KeyError: If the conversation is not in the table
+        """
+        code = self.table.code(conversation_id)
+        if code is None:
+            raise KeyError(conversation_id)
+        
+        results = {}
+        for metric in metrics or METRICS:
+            arrays = self.compute(metric)
+            results[metric] = {name: _value(values[code]) for name, values in arrays.items()} if arrays else None
+        return results
+    
+    def _message_frequency(self) -> Dict[str, np.ndarray]:
+        table = self.table
+        n = len(table.conversation_ids)
+        counts = np.diff(table.offsets)
+        starts = table.offsets[:-1]
+        
+        first = np.fmin.reduceat(table.timestamp, starts) if n else np.empty(0)
+        last = np.fmax.reduceat(table.timestamp, starts) if n else np.empty(0)
+        duration = last - first
+        with np.errstate(invalid="ignore", divide="ignore"):
+            per_hour = np.where(duration > 0, counts * 3600.0 / duration, np.nan)
+        
+        return {
+            "messages": counts,
+            "first_message_time": first,
+            "last_message_time": last,
+            "duration_seconds": duration,
+            "messages_per_hour": per_hour
+        }
+    
+    def _response_times(self) -> Dict[str, np.ndarray]:
+        """Delay between a message and a reply from the other party"""
+        table = self.table
+        n = len(table.conversation_ids)
+        rows = np.flatnonzero(table.parent >= 0)
+        parents = table.parent[rows]
+        
+        delay = table.timestamp[rows] - table.timestamp[parents]
+        replies = (
+            (table.role[rows] != table.role[parents])
+            & np.isin(table.role[rows], (ROLE_CODES["user"], ROLE_CODES["assistant"]))
+            & (delay >= 0)
+        )
+        rows, delay = rows[replies], delay[replies]
+        
+        results = {}
+        for role in ("assistant", "user"):
+            of_role = table.role[rows] == ROLE_CODES[role]
+            stats = _grouped_stats(table.conversation[rows[of_role]], delay[of_role], n)
+            for name, values in stats.items():
+                results[f"{role}_{name}_seconds" if name != "count" else f"{role}_replies"] = values
+        return results
+    
+    def _topic_diversity(self) -> Dict[str, np.ndarray]:
+        """Spread of the messages' main concepts and how often replies change them"""
+        table = self.table
+        if not table.topics:
+            # No concepts were extracted
+            return {}
+        
+        n = len(table.conversation_ids)
+        conversation = table.conversation
+        tagged = np.flatnonzero(table.topic >= 0)
+        tagged_counts = np.bincount(conversation[tagged], minlength=n)
+        
+        # Messages per (conversation, topic) pair
+        pairs, pair_counts = np.unique(
+            conversation[tagged].astype(np.int64) * len(table.topics) + table.topic[tagged], return_counts=True
+        )
+        pair_conversation = pairs // len(table.topics)
+        share = pair_counts / tagged_counts[pair_conversation]
+        entropy = np.bincount(pair_conversation, weights=-share * np.log2(share), minlength=n)
+        
+        # Replies to a message with a topic, when the reply has one too
+        rows = np.flatnonzero(table.parent >= 0)
+        rows = rows[(table.topic[rows] >= 0) & (table.topic[table.parent[rows]] >= 0)]
+        shifts = table.topic[rows] != table.topic[table.parent[rows]]
+        compared = np.bincount(conversation[rows], minlength=n)
+        shift_counts = np.bincount(conversation[rows], weights=shifts, minlength=n)
+        
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "messages_with_topic": tagged_counts,
+                "distinct_topics": np.bincount(pair_conversation, minlength=n),
+                "topic_entropy_bits": np.where(tagged_counts > 0, entropy, np.nan),
+                "topic_shifts": shift_counts.astype(np.int64),
+                "topic_shift_rate": np.where(compared > 0, shift_counts / compared, np.nan)
+            }
+    
+    def _conversation_depth(self) -> Dict[str, np.ndarray]:
+        table = self.table
+        n = len(table.conversation_ids)
+        counts = np.diff(table.offsets)
+        conversation = table.conversation
+        
+        child_counts = np.bincount(table.parent[table.parent >= 0], minlength=len(table))
+        branch_points = np.bincount(conversation, weights=child_counts > 1, minlength=n)
+        leaves = np.bincount(conversation, weights=child_counts == 0, minlength=n)
+        
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_depth = np.bincount(conversation, weights=table.depth, minlength=n) / counts
+        
+        return {
+            "max_depth": np.maximum.reduceat(table.depth, table.offsets[:-1]) if n else np.empty(0, dtype=np.int32),
+            "mean_depth": mean_depth,
+            "branch_points": branch_points.astype(np.int64),
+            "leaves": leaves.astype(np.int64)
+        }
+    
+    def _interaction_patterns(self) -> Dict[str, np.ndarray]:
+        table = self.table
+        n = len(table.conversation_ids)
+        conversation = table.conversation
+        
+        # Message counts and mean lengths per (conversation, role)
+        keys = conversation.astype(np.int64) * len(ROLE_NAMES) + table.role
+        role_counts = np.bincount(keys, minlength=n * len(ROLE_NAMES)).reshape(n, len(ROLE_NAMES))
+        role_lengths = np.bincount(keys, weights=table.length, minlength=n * len(ROLE_NAMES)).reshape(n, len(ROLE_NAMES))
+        
+        rows = np.flatnonzero(table.parent >= 0)
+        switches = table.role[rows] != table.role[table.parent[rows]]
+        turn_switches = np.bincount(conversation[rows], weights=switches, minlength=n)
+        same_role_followups = np.bincount(conversation[rows], weights=~switches, minlength=n)
+        
+        user = role_counts[:, ROLE_CODES["user"]]
+        assistant = role_counts[:, ROLE_CODES["assistant"]]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            results = {
+                "user_messages": user,
+                "assistant_messages": assistant,
+                "assistant_per_user_message": np.where(user > 0, assistant / user, np.nan),
+                "mean_user_length": role_lengths[:, ROLE_CODES["user"]] / user,
+                "mean_assistant_length": role_lengths[:, ROLE_CODES["assistant"]] / assistant,
+                "turn_switches": turn_switches.astype(np.int64),
+                "same_role_followups": same_role_followups.astype(np.int64)
+            }
+        return results
@@ -0,0 +1,235 @@
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+import json
+
+from ...core.embeddings.cache import normalize_text
+
+class LRUCache:
+    """Small in-memory least-recently-used mapping"""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, max_entries)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def put(self, key, value):
+        if self.max_entries == 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class HybridSearcher:
+    """
+    Semantic search that combines vector hits with their conversation graph
+    
+    Top-k vector hits are expanded through BELONGS_TO and REPLIES_TO in a single
+    Cypher read, which supplies the matched text, the conversation title and the
+    surrounding turns. Hits are then re-ranked so that threads with several
+    relevant messages rank above isolated matches. Without a graph, the text
+    comes from the hit's payload where the local index stores it.
+    
+    Query embeddings and result sets are kept in memory. Result sets describe
+    the stored data and are dropped by invalidate() after every import; query
+    embeddings only depend on the model and survive it.
+    """
+    
+    EXPAND_HITS = """
+        UNWIND $message_ids AS message_id
+        MATCH (m:Message {id: message_id})
+        OPTIONAL MATCH (m)-[:BELONGS_TO]->(c:Conversation)
+        OPTIONAL MATCH (m)-[:REPLIES_TO]->(parent:Message)
+        OPTIONAL MATCH (child:Message)-[:REPLIES_TO]->(m)
+        WITH m, c, parent, collect(child {.id, .role, .content})[..$max_replies] AS replies
+        RETURN m.id AS message_id, m.content AS content, m.timestamp AS timestamp,
+               c {.id, .title} AS conversation,
+               parent {.id, .role, .content} AS parent,
+               replies
+    """
+    
+    def __init__(
+        self,
+        processor,
+        driver,
+        database: Optional[str] = None,
+        candidate_factor: int = 3,
+        graph_weight: float = 0.1,
+        max_replies: int = 3,
+        query_cache_size: int = 1024,
+        result_cache_size: int = 256
+    ):
+        """
+        Args:
+            processor: ConversationProcessor used to embed queries and search vectors
+            driver: Async Neo4j driver, or None to return vector hits without context
+            database: Neo4j database name, or None for the server default
+            candidate_factor: Vector hits fetched per requested result before re-ranking
+            graph_weight: Weight of the best other hit in the same conversation
+            max_replies: Replies to each hit returned as context
+            query_cache_size: Query embeddings kept in memory
+            result_cache_size: Result sets kept in memory
+        """
+        self.processor = processor
+        self.driver = driver
+        self.database = database
+        self.candidate_factor = max(1, candidate_factor)
+        self.graph_weight = graph_weight
+        self.max_replies = max_replies
+        self.query_cache = LRUCache(query_cache_size)
+        self.result_cache = LRUCache(result_cache_size)
+        self._generation = 0
+    
+    @classmethod
+    def from_config(cls, processor, driver, search_config: Optional[Dict[str, Any]] = None,
+                    database: Optional[str] = None) -> 'HybridSearcher':
+        """Create a searcher from the `search` section of the configuration"""
+        search_config = search_config or {}
+        return cls(
+            processor,
+            driver,
+            database=database,
+            candidate_factor=search_config.get("candidate_factor", 3),
+            graph_weight=search_config.get("graph_weight", 0.1),
+            max_replies=search_config.get("max_replies", 3),
+            query_cache_size=search_config.get("query_cache_size", 1024),
+            result_cache_size=search_config.get("result_cache_size", 256)
+        )
+    
+    def invalidate(self):
+        """Drop cached result sets after the stored data changed"""
+        self._generation += 1
+        self.result_cache.clear()
+    
+    async def search(
+        self,
+        query: str,
+        limit: int = 10,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search messages by meaning and return them with their thread context
+        
+        Args:
+            query: Query text
+            limit: Maximum number of results
+            filters: Optional exact-match payload filters
+        
+        Returns:
+            Results ordered by re-ranked score
+        """
+        query = normalize_text(query)
+        generation = self._generation
+        key = (query, limit, json.dumps(filters, sort_keys=True, default=str))
+        results = self.result_cache.get(key)
+        if results is not None:
+            return results
+        
+        vector = self.query_cache.get(query)
+        if vector is None:
+            vector = await self.processor._generate_embedding(query)
+            self.query_cache.put(query, vector)
+        
+        hits = await self.processor.search_vectors(
+            query, limit=limit * self.candidate_factor, filters=filters, vector=vector
+        )
+        hits = self._best_hit_per_message(hits)
+        context = await self._expand(hits)
+        results = self._rerank(hits, context)[:limit]
+        
+        # An import that finished meanwhile makes these results stale
+        if generation == self._generation:
+            self.result_cache.put(key, results)
+        return results
+    
+    @staticmethod
+    def _best_hit_per_message(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep the best scoring chunk of every message; hits arrive best first"""
+        seen = set()
+        best = []
+        for hit in hits:
+            message_id = hit["payload"].get("message_id")
+            if message_id in seen:
+                continue
+            seen.add(message_id)
+            best.append(hit)
+        return best
+    
+    async def _expand(self, hits: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Fetch graph neighborhoods for all hits in one read transaction"""
+        if self.driver is None or not hits:
+            return {}
+        
+        message_ids = [hit["payload"]["message_id"] for hit in hits]
+        async with self.driver.session(database=self.database) as session:
+            records = await session.execute_read(self._read_context, message_ids)
+        return {record["message_id"]: record for record in records}
+    
+    async def _read_context(self, tx, message_ids: List[str]) -> List[Dict[str, Any]]:
+        result = await tx.run(self.EXPAND_HITS, message_ids=message_ids, max_replies=self.max_replies)
+        return await result.data()
+    
+    def _rerank(self, hits: List[Dict[str, Any]], context: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Boost each hit by the best other hit in its conversation"""
+        by_conversation: Dict[Any, List[float]] = {}
+        for hit in hits:
+            by_conversation.setdefault(hit["payload"].get("conversation_id"), []).append(hit["score"])
+        
+        results = []
+        for hit in hits:
+            payload = hit["payload"]
+            scores = by_conversation[payload.get("conversation_id")]
+            support = self._best_other(scores, hit["score"])
+            record = context.get(payload.get("message_id"), {})
+            text = payload.get("text")
+            if record.get("content") is not None:
+                text = self._chunk_text(record["content"], payload.get("chunk"))
+            
+            results.append({
+                "id": hit["id"],
+                "score": hit["score"] + self.graph_weight * support,
+                "vector_score": hit["score"],
+                "message_id": payload.get("message_id"),
+                "conversation_id": payload.get("conversation_id"),
+                "title": (record.get("conversation") or {}).get("title", payload.get("context", {}).get("title")),
+                "role": payload.get("role"),
+                "text": text,
+                "timestamp": record.get("timestamp"),
+                "context": {
+                    "parent": record.get("parent"),
+                    "replies": record.get("replies", [])
+                }
+            })
+        
+        results.sort(key=lambda result: result["score"], reverse=True)
+        return results
+    
+    @staticmethod
+    def _best_other(scores: List[float], own: float) -> float:
+        """Highest score in a conversation excluding one occurrence of the hit's own"""
+        ranked = sorted(scores, reverse=True)
+        ranked.remove(own)
+        return ranked[0] if ranked else 0.0
+    
+    @staticmethod
+    def _chunk_text(content: Optional[str], chunk: Optional[Dict[str, int]]) -> Optional[str]:
+        if content is None or chunk is None:
+            return content
+        return content[chunk["start"]:chunk["end"]]
@@ -0,0 +1,472 @@
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import asyncio
+import itertools
+
+import numpy as np
+
+from ...core.storage.local_index import LocalVectorIndex, merge_top_k
+from ...core.storage.snapshot import ImportSnapshot
+
+DEFAULT_MEMORY_BUDGET = 256 << 20
+
+# Temporary bytes per cell of a query x corpus score block: the float32 scores,
+# the same-conversation mask and merge_top_k's concatenated scores, rows and partition
+_BYTES_PER_CELL = 32
+
+# Topic-shift rows written per transaction
+TOPIC_SHIFT_ROWS_PER_TRANSACTION = 50000
+
+# Ancestors walked to find the nearest one with a vector
+_MAX_ANCESTOR_HOPS = 64
+
+# (first message of the block, neighbor messages, scores), one row per message, best first
+KnnBlock = Tuple[int, np.ndarray, np.ndarray]
+
+# Payload fields read when message vectors come from Qdrant
+_QDRANT_PAYLOAD_FIELDS = ["message_id", "conversation_id", "chunk", "context"]
+
+class MessageVectors:
+    """
+    One stored embedding per message, read from memory-mapped storage
+    
+    A message is represented by its first chunk's vector, the one its graph
+    node links to. Messages are ordered by storage row so that blocks read
+    the underlying file sequentially. Ids are kept as one fixed-width bytes
+    array and parents as positions, so the per-message overhead is a few
+    NumPy bytes (see `nbytes`) rather than Python strings and dicts.
+    """
+    
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        rows: np.ndarray,
+        message_ids: np.ndarray,
+        conversations: np.ndarray,
+        parents: np.ndarray
+    ):
+        """
+        Args:
+            matrix: Embedding rows, usually a memory map
+            rows: Matrix row of each message's vector
+            message_ids: UTF-8 message id of each position, as fixed-width bytes
+            conversations: Integer conversation code of each position
+            parents: Position of each message's nearest ancestor with a vector, or -1
+        """
+        self.matrix = matrix
+        self.rows = rows
+        self.message_ids = message_ids
+        self.conversations = conversations
+        self.parents = parents
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+    
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the per-message arrays; the matrix is not counted"""
+        return sum(array.nbytes for array in (self.rows, self.message_ids, self.conversations, self.parents))
+    
+    def message_id(self, position: int) -> str:
+        return self.message_ids[position].decode('utf-8')
+    
+    def block(self, start: int, stop: int) -> np.ndarray:
+        """Vectors of messages [start, stop) as an in-memory float32 array"""
+        rows = self.rows[start:stop]
+        if len(rows) and rows[-1] - rows[0] == len(rows) - 1:
+            return np.array(self.matrix[rows[0]:rows[-1] + 1], dtype=np.float32)
+        return np.asarray(self.matrix[rows], dtype=np.float32)
+    
+    @classmethod
+    def from_arrays(
+        cls,
+        matrix: np.ndarray,
+        unit_rows: np.ndarray,
+        unit_messages: np.ndarray,
+        unit_conversations: np.ndarray,
+        message_ids: np.ndarray,
+        parent_ids: np.ndarray
+    ) -> 'MessageVectors':
+        """
+        Args:
+            matrix: Embedding rows
+            unit_rows: Matrix row of each first-chunk vector
+            unit_messages: Message id of each entry of unit_rows; the last entry of a message wins
+            unit_conversations: Conversation id of each entry of unit_rows
+            message_ids: Id of every known message; the last entry of a message wins
+            parent_ids: Parent id of each entry of message_ids, b"" for roots
+        
+        Ids are fixed-width bytes arrays. Lookups are sorted-array searches, so
+        temporaries stay a small multiple of the id arrays.
+        """
+        latest = _last_occurrences(unit_messages)
+        latest = latest[np.argsort(unit_rows[latest], kind='stable')]
+        rows = np.asarray(unit_rows[latest], dtype=np.int64)
+        ids = unit_messages[latest]
+        _, conversations = np.unique(unit_conversations[latest], return_inverse=True)
+        conversations = conversations.astype(np.int32).ravel()
+        
+        known_latest = _last_occurrences(message_ids)
+        known, known_parents = message_ids[known_latest], parent_ids[known_latest]
+        by_id = np.argsort(ids, kind='stable')
+        sorted_ids = ids[by_id]
+        
+        # Hidden and empty messages have no vector; replies to them are compared
+        # with the nearest ancestor that has one
+        parents = np.full(len(ids), -1, dtype=np.int64)
+        pending = np.arange(len(ids), dtype=np.int64)
+        current = _parents_of(ids, known, known_parents)
+        for _ in range(_MAX_ANCESTOR_HOPS):
+            has_parent = current != b""
+            pending, current = pending[has_parent], current[has_parent]
+            if not len(pending):
+                break
+            found, where = _find_sorted(sorted_ids, current)
+            parents[pending[found]] = by_id[where[found]]
+            pending, current = pending[~found], _parents_of(current[~found], known, known_parents)
+        
+        return cls(matrix, rows, ids, conversations, parents)
+    
+    @classmethod
+    def from_snapshot(cls, snapshot: ImportSnapshot) -> 'MessageVectors':
+        """Message vectors from the committed rows of an import snapshot; later rows win"""
+        counts = snapshot.counts
+        chunk_indexes = snapshot.units["chunk"].load(counts["units"])
+        unit_rows = np.flatnonzero(np.asarray(chunk_indexes[:, 0]) == 0)
+        
+        messages = snapshot.messages
+        return cls.from_arrays(
+            snapshot.embeddings.load(counts["units"]),
+            unit_rows,
+            snapshot.units["message_id"].load(counts["units"]).fixed_width(unit_rows),
+            snapshot.units["conversation_id"].load(counts["units"]).fixed_width(unit_rows),
+            messages["id"].load(counts["messages"]).fixed_width(),
+            messages["parent_id"].load(counts["messages"]).fixed_width()
+        )
+    
+    @classmethod
+    def from_local_index(cls, index: LocalVectorIndex, batch_size: int = 10000) -> 'MessageVectors':
+        """Message vectors from the local index, using the payloads stored with each point"""
+        units: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        messages: List[Tuple[np.ndarray, np.ndarray]] = []
+        payloads = index.iter_payloads(batch_size)
+        while True:
+            # Payloads are decoded a batch at a time and kept as arrays
+            batch = [(row, payload) for row, payload in itertools.islice(payloads, batch_size) if payload]
+            if not batch:
+                break
+            first_chunks = [(row, payload) for row, payload in batch if payload["chunk"]["index"] == 0]
+            units.append((
+                np.fromiter((row for row, _ in first_chunks), dtype=np.int64, count=len(first_chunks)),
+                _encoded(payload["message_id"] for _, payload in first_chunks),
+                _encoded(payload["conversation_id"] for _, payload in first_chunks)
+            ))
+            messages.append((
+                _encoded(payload["message_id"] for _, payload in batch),
+                _encoded(payload.get("context", {}).get("parent_id") for _, payload in batch)
+            ))
+        
+        empty = np.empty(0, dtype="S1")
+        unit_rows, unit_messages, unit_conversations = (
+            [np.concatenate(column) for column in zip(*units)] if units
+            else [np.empty(0, dtype=np.int64), empty, empty]
+        )
+        message_ids, parent_ids = (
+            [np.concatenate(column) for column in zip(*messages)] if messages else [empty, empty]
+        )
+        return cls.from_arrays(
+            index.vectors, unit_rows, unit_messages, unit_conversations, message_ids, parent_ids
+        )
+    
+    @classmethod
+    async def from_qdrant(cls, client, collection_name: str, batch_size: int = 1000) -> 'MessageVectors':
+        """
+        Message vectors from a Qdrant collection, using the payloads stored with each point
+        
+        Points are scrolled `batch_size` at a time with their vectors, so the
+        collection is read in a few large requests rather than one query per
+        message. Unlike the local sources the vectors are not memory-mapped:
+        first-chunk vectors are kept in memory as float32.
+        """
+        vectors: List[np.ndarray] = []
+        units: List[Tuple[np.ndarray, np.ndarray]] = []
+        messages: List[Tuple[np.ndarray, np.ndarray]] = []
+        offset = None
+        while True:
+            points, offset = await client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=_QDRANT_PAYLOAD_FIELDS,
+                with_vectors=True
+            )
+            batch = [point.payload for point in points if point.payload]
+            first_chunks = [point for point in points if point.payload and point.payload["chunk"]["index"] == 0]
+            if first_chunks:
+                vectors.append(np.array([point.vector for point in first_chunks], dtype=np.float32))
+                units.append((
+                    _encoded(point.payload["message_id"] for point in first_chunks),
+                    _encoded(point.payload["conversation_id"] for point in first_chunks)
+                ))
+            if batch:
+                messages.append((
+                    _encoded(payload["message_id"] for payload in batch),
+                    _encoded(payload.get("context", {}).get("parent_id") for payload in batch)
+                ))
+            if offset is None:
+                break
+        
+        empty = np.empty(0, dtype="S1")
+        matrix = np.concatenate(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        unit_messages, unit_conversations = (
+            [np.concatenate(column) for column in zip(*units)] if units else [empty, empty]
+        )
+        message_ids, parent_ids = (
+            [np.concatenate(column) for column in zip(*messages)] if messages else [empty, empty]
+        )
+        return cls.from_arrays(
+            matrix, np.arange(len(matrix), dtype=np.int64), unit_messages, unit_conversations, message_ids, parent_ids
+        )
+
+def _encoded(values: Iterable[Optional[str]]) -> np.ndarray:
+    """Fixed-width UTF-8 bytes array; None becomes b"""""
+    return np.array([b"" if value is None else value.encode('utf-8') for value in values], dtype=bytes)
+
+def _last_occurrences(keys: np.ndarray) -> np.ndarray:
+    """Index of the last occurrence of each distinct key, in key order"""
+    _, reversed_index = np.unique(keys[::-1], return_index=True)
+    return len(keys) - 1 - reversed_index
+
+def _find_sorted(sorted_keys: np.ndarray, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(found mask, index into sorted_keys) of each key"""
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool), np.zeros(len(keys), dtype=np.int64)
+    where = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[where] == keys, where
+
+def _parents_of(keys: np.ndarray, known: np.ndarray, known_parents: np.ndarray) -> np.ndarray:
+    """Parent id of each key, b"" for roots and unknown messages; `known` is sorted"""
+    found, where = _find_sorted(known, keys)
+    parents = np.zeros(len(keys), dtype=known_parents.dtype)
+    parents[found] = known_parents[where[found]]
+    return parents
+
+def block_shape(count: int, dim: int, memory_budget: int, query_rows: int = 1024) -> Tuple[int, int]:
+    """
+    Query and corpus block sizes whose vectors and score temporaries fit the budget
+    
+    Returns:
+        (query rows, corpus rows)
+    """
+    query_rows = max(1, min(count, query_rows))
+    corpus_rows = (memory_budget - query_rows * dim * 4) // (query_rows * _BYTES_PER_CELL + dim * 4)
+    return query_rows, int(max(1, min(count, corpus_rows)))
+
+def knn_blocks(
+    vectors: MessageVectors,
+    k: int,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    query_rows: int = 1024,
+    exclude_same_conversation: bool = True
+) -> Iterator[KnnBlock]:
+    """
+    Exact top-k neighbors of every message by cosine similarity
+    
+    Each block of query vectors is multiplied with successive corpus blocks
+    and only the running top-k per query is kept, so the N x N similarity
+    matrix is never materialized and peak memory is set by `memory_budget`
+    rather than by the corpus size. The per-message arrays of `vectors` count
+    against the budget. Vectors are expected to be L2-normalized.
+    
+    Yields:
+        (start, neighbors, scores) for consecutive query blocks; row i holds
+        up to k neighbors of message start + i, best first, with -1 where a
+        candidate was excluded
+    """
+    count = len(vectors)
+    if count == 0 or k <= 0:
+        return
+    query_rows, corpus_rows = block_shape(count, vectors.dim, memory_budget - vectors.nbytes, query_rows)
+    
+    for start in range(0, count, query_rows):
+        stop = min(start + query_rows, count)
+        queries = vectors.block(start, stop)
+        query_conversations = vectors.conversations[start:stop]
+        best_scores = np.empty((stop - start, 0), dtype=np.float32)
+        best_rows = np.empty((stop - start, 0), dtype=np.int64)
+        
+        for corpus_start in range(0, count, corpus_rows):
+            corpus_stop = min(corpus_start + corpus_rows, count)
+            scores = queries @ vectors.block(corpus_start, corpus_stop).T
+            
+            if exclude_same_conversation:
+                scores[query_conversations[:, None] == vectors.conversations[None, corpus_start:corpus_stop]] = -np.inf
+            else:
+                # A message is always its own nearest neighbor
+                overlap = np.arange(max(start, corpus_start), min(stop, corpus_stop))
+                scores[overlap - start, overlap - corpus_start] = -np.inf
+            
+            best_scores, best_rows = merge_top_k(
+                best_scores, best_rows, scores, np.arange(corpus_start, corpus_stop, dtype=np.int64), k
+            )
+        
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        best_rows[~np.isfinite(best_scores)] = -1
+        yield start, best_rows, best_scores
+
+def parent_similarities(vectors: MessageVectors, block_rows: int = 65536) -> np.ndarray:
+    """
+    Cosine similarity of each message to its nearest ancestor with a vector
+    
+    Every branch of every thread is covered, since each message is compared
+    with its own parent. Messages without one get NaN.
+    """
+    similarities = np.full(len(vectors), np.nan, dtype=np.float32)
+    for start in range(0, len(vectors), block_rows):
+        stop = min(start + block_rows, len(vectors))
+        parents = vectors.parents[start:stop]
+        has_parent = np.flatnonzero(parents >= 0)
+        if not len(has_parent):
+            continue
+        children = vectors.block(start, stop)[has_parent]
+        parent_rows = vectors.rows[parents[has_parent]]
+        order = np.argsort(parent_rows)
+        parent_vectors = np.empty_like(children)
+        parent_vectors[order] = vectors.matrix[parent_rows[order]]
+        similarities[start + has_parent] = np.einsum('ij,ij->i', children, parent_vectors)
+    return similarities
+
+class SimilarityGraphBuilder:
+    """
+    Corpus-wide SIMILAR_TO edges and topic-shift scores, written to Neo4j in bulk
+    
+    Neighbor blocks are computed on a worker thread while the previous
+    block's edges are being written.
+    """
+    
+    def __init__(
+        self,
+        graph_writer,
+        k: int = 10,
+        min_similarity: float = 0.5,
+        topic_shift_threshold: float = 0.3,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        query_rows: int = 1024,
+        exclude_same_conversation: bool = True
+    ):
+        """
+        Args:
+            graph_writer: BulkGraphWriter for the target graph
+            k: Neighbors kept per message
+            min_similarity: Neighbors below this cosine similarity get no edge
+            topic_shift_threshold: Replies less similar than this to their
+                parent are marked as topic shifts
+            memory_budget: Bytes of vectors and temporaries per neighbor block
+            query_rows: Messages per neighbor block
+            exclude_same_conversation: Only link messages of different conversations
+        """
+        self.graph_writer = graph_writer
+        self.k = k
+        self.min_similarity = min_similarity
+        self.topic_shift_threshold = topic_shift_threshold
+        self.memory_budget = memory_budget
+        self.query_rows = query_rows
+        self.exclude_same_conversation = exclude_same_conversation
+    
+    @classmethod
+    def from_config(cls, graph_writer, similarity_config: Optional[Dict[str, Any]]) -> 'SimilarityGraphBuilder':
+        """Create a builder from the `similarity` section of the config"""
+        config = similarity_config or {}
+        return cls(
+            graph_writer,
+            k=config.get("k", 10),
+            min_similarity=config.get("min_similarity", 0.5),
+            topic_shift_threshold=config.get("topic_shift_threshold", 0.3),
+            memory_budget=int(config.get("memory_budget_mb", DEFAULT_MEMORY_BUDGET >> 20)) << 20,
+            query_rows=config.get("query_rows", 1024),
+            exclude_same_conversation=config.get("exclude_same_conversation", True)
+        )
+    
+    def similarity_rows(self, vectors: MessageVectors, block: KnnBlock) -> List[Dict[str, Any]]:
+        """One row per message of a block, with the neighbors that pass min_similarity"""
+        start, neighbors, scores = block
+        keep = (neighbors >= 0) & (scores >= self.min_similarity)
+        rows = []
+        for offset in range(len(neighbors)):
+            selected = np.flatnonzero(keep[offset])
+            rows.append({
+                "id": vectors.message_id(start + offset),
+                "neighbors": [
+                    {
+                        "id": vectors.message_id(neighbors[offset, rank]),
+                        "score": float(scores[offset, rank]),
+                        "rank": int(rank)
+                    }
+                    for rank in selected
+                ]
+            })
+        return rows
+    
+    def topic_shift_rows(self, vectors: MessageVectors, similarities: np.ndarray,
+                         positions: np.ndarray) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": vectors.message_id(position),
+                "similarity": float(similarities[position]),
+                "topic_shift": bool(similarities[position] < self.topic_shift_threshold)
+            }
+            for position in positions
+        ]
+    
+    async def run(self, vectors: MessageVectors) -> Dict[str, Any]:
+        """
+        Replace every message's SIMILAR_TO edges and set its parent_similarity
+        and topic_shift properties
+        
+        Returns:
+            Dict with the messages analyzed, edges written and topic shifts found
+        """
+        loop = asyncio.get_running_loop()
+        stats = {"messages": len(vectors), "similar_to": 0, "replies_scored": 0, "topic_shifts": 0}
+        
+        blocks = knn_blocks(
+            vectors,
+            self.k,
+            memory_budget=self.memory_budget,
+            query_rows=self.query_rows,
+            exclude_same_conversation=self.exclude_same_conversation
+        )
+        pending = None
+        try:
+            while True:
+                block = await loop.run_in_executor(None, next, blocks, None)
+                if block is None:
+                    break
+                rows = self.similarity_rows(vectors, block)
+                stats["similar_to"] += sum(len(row["neighbors"]) for row in rows)
+                
+                if pending is not None:
+                    await pending
+                pending = asyncio.ensure_future(self.graph_writer.write_similarities(rows))
+            
+            if pending is not None:
+                await pending
+                pending = None
+        finally:
+            if pending is not None:
+                pending.cancel()
+        
+        similarities = await loop.run_in_executor(None, parent_similarities, vectors)
+        scored = np.flatnonzero(~np.isnan(similarities))
+        stats["replies_scored"] = len(scored)
+        stats["topic_shifts"] = int(np.count_nonzero(similarities[scored] < self.topic_shift_threshold))
+        for start in range(0, len(scored), TOPIC_SHIFT_ROWS_PER_TRANSACTION):
+            positions = scored[start:start + TOPIC_SHIFT_ROWS_PER_TRANSACTION]
+            await self.graph_writer.write_topic_shifts(self.topic_shift_rows(vectors, similarities, positions))
+        
+        return stats
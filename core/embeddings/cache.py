@@ -0,0 +1,193 @@
+from typing import List, Dict, Tuple, Optional
+from array import array
+from pathlib import Path
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import unicodedata
+
+_WHITESPACE = re.compile(r'\s+')
+
+# Approximate per-entry bookkeeping overhead in SQLite (row header, index entries)
+_ROW_OVERHEAD = 64
+
+# Keep IN (...) lists below SQLite's default bound-parameter limit
+_MAX_QUERY_PARAMS = 500
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different copies share a cache entry"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+class EmbeddingCache:
+    """
+    Content-addressed on-disk embedding cache
+    
+    Entries are keyed by a hash of the model name and normalized text and kept
+    in a SQLite file. When the stored size exceeds `max_size` bytes, the least
+    recently used entries are evicted.
+    """
+    
+    def __init__(self, path: Path, model_name: str, max_size: int = 1 << 30):
+        self.path = Path(path)
+        self.model_name = model_name
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._total_size = 0
+        self._clock = 0
+    
+    def key(self, text: str) -> bytes:
+        """Cache key for a text under this cache's model"""
+        digest = hashlib.sha256(self.model_name.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(normalize_text(text).encode('utf-8'))
+        return digest.digest()
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key BLOB PRIMARY KEY, vector BLOB NOT NULL, "
+                "size INTEGER NOT NULL, last_access INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+            )
+            total, clock = conn.execute(
+                "SELECT COALESCE(SUM(size), 0), COALESCE(MAX(last_access), 0) FROM embeddings"
+            ).fetchone()
+            self._total_size = total
+            self._clock = clock
+            self._conn = conn
+        return self._conn
+    
+    def get_many(self, texts: List[str]) -> Tuple[Dict[int, List[float]], List[int]]:
+        """
+        Split a batch into cache hits and misses in one call
+        
+        Args:
+            texts: Texts to look up
+        
+        Returns:
+            Tuple of (hits mapping input index -> embedding, indices of misses)
+        """
+        keys = [self.key(text) for text in texts]
+        found: Dict[bytes, List[float]] = {}
+        
+        with self._lock:
+            conn = self._connect()
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), _MAX_QUERY_PARAMS):
+                chunk = unique_keys[start:start + _MAX_QUERY_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk
+                )
+                for key, blob in rows:
+                    vector = array('f')
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+            
+            if found:
+                self._clock += 1
+                conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(self._clock, key) for key in found]
+                )
+                conn.commit()
+            
+            hits = {}
+            misses = []
+            for index, key in enumerate(keys):
+                if key in found:
+                    hits[index] = found[key]
+                else:
+                    misses.append(index)
+            
+            self.hits += len(hits)
+            self.misses += len(misses)
+        
+        return hits, misses
+    
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        """Store embeddings for texts, evicting least recently used entries if needed"""
+        rows = {}
+        for text, vector in zip(texts, vectors):
+            key = self.key(text)
+            blob = array('f', vector).tobytes()
+            rows[key] = (blob, len(key) + len(blob) + _ROW_OVERHEAD)
+        
+        if not rows:
+            return
+        
+        with self._lock:
+            conn = self._connect()
+            self._clock += 1
+            
+            # Replaced entries must not be counted twice
+            existing = 0
+            keys = list(rows)
+            for start in range(0, len(keys), _MAX_QUERY_PARAMS):
+                chunk = keys[start:start + _MAX_QUERY_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                existing += conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchone()[0]
+            
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                [(key, blob, size, self._clock) for key, (blob, size) in rows.items()]
+            )
+            self._total_size += sum(size for _, size in rows.values()) - existing
+            
+            if self._total_size > self.max_size:
+                self._evict(conn)
+            conn.commit()
+    
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least recently used entries until the cache is back under 90% of its bound"""
+        target = int(self.max_size * 0.9)
+        while self._total_size > target:
+            rows = conn.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_access LIMIT ?",
+                (_MAX_QUERY_PARAMS,)
+            ).fetchall()
+            if not rows:
+                self._total_size = 0
+                break
+            
+            evicted = []
+            for key, size in rows:
+                evicted.append((key,))
+                self._total_size -= size
+                if self._total_size <= target:
+                    break
+            conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+    
+    async def get_many_async(self, texts: List[str]) -> Tuple[Dict[int, List[float]], List[int]]:
+        """get_many on a worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_many, texts)
+    
+    async def put_many_async(self, texts: List[str], vectors: List[List[float]]):
+        """put_many on a worker thread"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.put_many, texts, vectors)
+    
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
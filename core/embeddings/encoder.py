@@ -0,0 +1,69 @@
+from typing import List, Dict, Any, Optional
+import asyncio
+import threading
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+class EmbeddingEncoder:
+    """Batched text encoder backed by a sentence-transformers model"""
+    
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        batch_size: int = 32,
+        max_length: int = 512,
+        device: str = "cpu"
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.device = device
+        self._model = None
+        self._model_lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'EmbeddingEncoder':
+        """Create an encoder from the `embeddings` section of the config"""
+        config = config or {}
+        return cls(
+            model_name=config.get("model_name", DEFAULT_MODEL_NAME),
+            batch_size=config.get("batch_size", 32),
+            max_length=config.get("max_length", 512),
+            device=config.get("device", "cpu")
+        )
+    
+    @property
+    def model(self):
+        """The underlying model, loaded on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    
+                    model = SentenceTransformer(self.model_name, device=self.device)
+                    model.max_seq_length = self.max_length
+                    self._model = model
+        return self._model
+    
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        """
+        Encode texts in batches of `batch_size`
+        
+        Embeddings are L2-normalized so cosine similarity reduces to a dot product.
+        """
+        if not texts:
+            return []
+        
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return vectors.tolist()
+    
+    async def encode_async(self, texts: List[str]) -> List[List[float]]:
+        """Encode texts on a worker thread so the event loop stays free for I/O"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.encode, texts)
@@ -1,18 +1,84 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import List, Dict, Iterator, Optional, Sequence, Set
+from datetime import datetime, timezone
+import sys
 import uuid
 
-@dataclass
+# Namespace for IDs derived from export content, so re-imports reproduce them
+ID_NAMESPACE = uuid.UUID("6f1c2a7e-5b0d-4c1e-9a43-2d8e5f7b9c10")
+
+# Characters kept from the end of each preceding turn in a unit's context text
+CONTEXT_TURN_CHARS = 300
+
 class Message:
-    id: str
-    content: str
-    role: str  # 'user' or 'assistant'
-    parent_id: Optional[str] = None
-    children_ids: List[str] = field(default_factory=list)
-    timestamp: datetime = field(default_factory=lambda: datetime.now())
-    metadata: Dict = field(default_factory=dict)
-    embedding_id: Optional[str] = None  # Reference to Qdrant vector
+    """
+    A single message node in a conversation tree
+    
+    Uses __slots__ instead of a per-instance dict, stores child ids as a tuple,
+    interns role strings and only allocates `metadata` and `timestamp` on first
+    access, which keeps large archives compact in memory.
+    """
+    
+    __slots__ = (
+        'id', 'content', 'role', 'parent_id', 'children_ids',
+        'create_time', 'embedding_id', '_timestamp', '_metadata'
+    )
+    
+    def __init__(
+        self,
+        id: str,
+        content: str,
+        role: str,  # 'user' or 'assistant'
+        parent_id: Optional[str] = None,
+        children_ids: Sequence[str] = (),
+        timestamp: Optional[datetime] = None,
+        metadata: Optional[Dict] = None,
+        embedding_id: Optional[str] = None,  # Reference to Qdrant vector
+        create_time: Optional[float] = None  # Export epoch seconds
+    ):
+        self.id = id
+        self.content = content
+        self.role = sys.intern(role)
+        self.parent_id = parent_id
+        self.children_ids = tuple(children_ids) if children_ids else ()
+        self.create_time = create_time
+        self.embedding_id = embedding_id
+        self._timestamp = timestamp
+        self._metadata = metadata
+    
+    @property
+    def timestamp(self) -> datetime:
+        """Message time from the export, or the time it was first requested"""
+        if self._timestamp is None:
+            if self.create_time is not None:
+                self._timestamp = datetime.fromtimestamp(self.create_time, timezone.utc)
+            else:
+                self._timestamp = datetime.now(timezone.utc)
+        return self._timestamp
+    
+    @timestamp.setter
+    def timestamp(self, value: datetime):
+        self._timestamp = value
+    
+    @property
+    def metadata(self) -> Dict:
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+    
+    @metadata.setter
+    def metadata(self, value: Dict):
+        self._metadata = value
+    
+    def __reduce__(self):
+        # Positional constructor args pickle far smaller than per-slot state
+        return (Message, (
+            self.id, self.content, self.role, self.parent_id, self.children_ids,
+            self._timestamp, self._metadata, self.embedding_id, self.create_time
+        ))
+    
+    def __repr__(self) -> str:
+        return f"Message(id={self.id!r}, role={self.role!r}, parent_id={self.parent_id!r})"
     
     def to_vector_payload(self) -> Dict:
         """Convert message to a format suitable for vector storage"""
@@ -24,6 +90,186 @@ class Message:
             "metadata": self.metadata
         }
 
+class ThreadPathIndex:
+    """
+    Ancestor and branch queries over a conversation tree without walking it
+    
+    Messages are numbered in depth-first preorder, so the subtree of a message
+    is the contiguous interval [position, end) of that numbering (its Euler
+    tour interval) and ancestor checks are two comparisons. Ancestors at a
+    given distance and branch points use jump pointers (the 2**j-th ancestor
+    of every message), built on first use. Messages unreachable from the root
+    are indexed as further trees.
+    
+    The active branch, the one ChatGPT shows, is resolved once while the
+    index is built; its path is listed on first use.
+    
+    Queries raise KeyError for message ids that are not in the tree.
+    """
+    
+    __slots__ = ('ids', 'position', 'parent', 'depth', 'end', 'active_leaf_id', '_active_path', '_jumps')
+    
+    def __init__(self, messages: Dict[str, Message], root_id: str, current_node: Optional[str] = None):
+        """
+        Args:
+            messages: Messages of the tree
+            root_id: Message the first tree starts at
+            current_node: Last message of the active branch, when the export records it
+        """
+        roots = [root_id] if root_id in messages else []
+        roots.extend(
+            msg.id for msg in messages.values()
+            if msg.id != root_id and msg.parent_id not in messages
+        )
+        
+        self.ids: List[str] = []
+        self.position: Dict[str, int] = {}
+        self.parent: List[int] = []  # -1 for roots
+        self.depth: List[int] = []
+        last_child: Dict[int, int] = {}
+        for root in roots:
+            stack = [(root, -1)]
+            while stack:
+                message_id, parent_index = stack.pop()
+                if message_id in self.position:
+                    continue
+                
+                index = len(self.ids)
+                self.position[message_id] = index
+                self.ids.append(message_id)
+                self.parent.append(parent_index)
+                self.depth.append(self.depth[parent_index] + 1 if parent_index >= 0 else 0)
+                if parent_index >= 0:
+                    # Children are visited in order, so the last one visited is the last child
+                    last_child[parent_index] = index
+                stack.extend(
+                    (child_id, index) for child_id in reversed(messages[message_id].children_ids)
+                    if child_id in messages
+                )
+        
+        # Children follow their parent in preorder, so one reverse pass sums subtree sizes
+        size = [1] * len(self.ids)
+        for index in range(len(self.ids) - 1, -1, -1):
+            if self.parent[index] >= 0:
+                size[self.parent[index]] += size[index]
+        self.end = [index + count for index, count in enumerate(size)]
+        self._jumps: Optional[List[List[int]]] = None
+        
+        # Without a current node, follow the latest regeneration (the last child) from the root
+        self.active_leaf_id: Optional[str] = None
+        self._active_path: Optional[List[str]] = None
+        if current_node in self.position:
+            self.active_leaf_id = current_node
+        elif root_id in self.position:
+            index = 0
+            while index in last_child:
+                index = last_child[index]
+            self.active_leaf_id = self.ids[index]
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self.position
+    
+    def depth_of(self, message_id: str) -> int:
+        """Replies between the root and a message; the root has depth 0"""
+        return self.depth[self.position[message_id]]
+    
+    def is_ancestor(self, ancestor_id: str, message_id: str) -> bool:
+        """Whether `ancestor_id` is on the path from the root to `message_id` (itself included)"""
+        ancestor = self.position[ancestor_id]
+        return ancestor <= self.position[message_id] < self.end[ancestor]
+    
+    def same_branch(self, first_id: str, second_id: str) -> bool:
+        """Whether one message leads to the other, i.e. both lie on one root-to-leaf path"""
+        return self.is_ancestor(first_id, second_id) or self.is_ancestor(second_id, first_id)
+    
+    def ancestor_ids(self, message_id: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Ancestors of a message, root first
+        
+        Args:
+            message_id: Message whose ancestors to list; it is not included
+            limit: Only the `limit` nearest ancestors, in O(limit)
+        """
+        index = self.parent[self.position[message_id]]
+        remaining = self.depth[self.position[message_id]] if limit is None else limit
+        ancestors = []
+        while index >= 0 and remaining > 0:
+            ancestors.append(self.ids[index])
+            index = self.parent[index]
+            remaining -= 1
+        ancestors.reverse()
+        return ancestors
+    
+    def path_ids(self, message_id: str) -> List[str]:
+        """Messages from the root down to and including `message_id`"""
+        return self.ancestor_ids(message_id) + [message_id]
+    
+    def active_path_ids(self) -> List[str]:
+        """Messages of the active branch, root first; listed once and then reused"""
+        if self._active_path is None:
+            self._active_path = [] if self.active_leaf_id is None else self.path_ids(self.active_leaf_id)
+        return self._active_path
+    
+    def is_active(self, message_id: str) -> bool:
+        """Whether a message is on the active branch, in O(1)"""
+        return self.active_leaf_id is not None and self.is_ancestor(message_id, self.active_leaf_id)
+    
+    def descendant_ids(self, message_id: str) -> List[str]:
+        """Every message below `message_id`, in preorder"""
+        index = self.position[message_id]
+        return self.ids[index + 1:self.end[index]]
+    
+    def kth_ancestor(self, message_id: str, k: int) -> Optional[str]:
+        """The ancestor `k` replies above a message in O(log k), or None above the root"""
+        index = self.position[message_id]
+        if k > self.depth[index]:
+            return None
+        
+        jumps = self._jump_table()
+        level = 0
+        while k:
+            if k & 1:
+                index = jumps[level][index]
+            k >>= 1
+            level += 1
+        return self.ids[index]
+    
+    def common_ancestor(self, first_id: str, second_id: str) -> Optional[str]:
+        """
+        Deepest message on both paths in O(log n): where two branches fork
+        
+        Returns None for messages of different trees.
+        """
+        first = self.position[first_id]
+        second = self.position[second_id]
+        if first <= second < self.end[first]:
+            return first_id
+        if second <= first < self.end[second]:
+            return second_id
+        
+        # Climb from `first` to the highest ancestor that is still not above `second`
+        for jumps in reversed(self._jump_table()):
+            ancestor = jumps[first]
+            if ancestor >= 0 and not (ancestor <= second < self.end[ancestor]):
+                first = ancestor
+        
+        parent = self.parent[first]
+        return self.ids[parent] if parent >= 0 else None
+    
+    def _jump_table(self) -> List[List[int]]:
+        """jumps[j][i] is the 2**j-th ancestor of message i, or -1"""
+        if self._jumps is None:
+            jumps = [self.parent]
+            max_depth = max(self.depth, default=0)
+            while (1 << len(jumps)) <= max_depth:
+                previous = jumps[-1]
+                jumps.append([previous[index] if index >= 0 else -1 for index in previous])
+            self._jumps = jumps
+        return self._jumps
+
 @dataclass
 class ConversationThread:
     id: str
@@ -31,6 +277,13 @@ class ConversationThread:
     messages: Dict[str, Message]  # message_id -> Message
     root_id: str
     metadata: Dict = field(default_factory=dict)
+    _paths: Optional[ThreadPathIndex] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __getstate__(self) -> Dict:
+        # The path index is cheap to rebuild and would double the pickled size
+        state = self.__dict__.copy()
+        state["_paths"] = None
+        return state
     
     @classmethod
     def from_export_mapping(cls, conversation_data: Dict) -> 'ConversationThread':
@@ -43,17 +296,17 @@ class ConversationThread:
             msg = node['message']
             if msg is None:
                 continue
-                
-            content = ""
-            for part in msg['content'].get('parts', []):
-                if isinstance(part, str):
-                    content += part
+            
+            content = "".join(
+                part for part in msg['content'].get('parts', []) if isinstance(part, str)
+            )
             
             messages[node_id] = Message(
                 id=node_id,
                 content=content,
                 role=msg['author']['role'],
-                children_ids=node.get('children', [])
+                children_ids=node.get('children', ()),
+                create_time=msg.get('create_time')
             )
         
         # Second pass: Set parent IDs
@@ -62,55 +315,181 @@ class ConversationThread:
                 if child_id in messages:
                     messages[child_id].parent_id = node_id
         
+        root_id = cls._find_root_id(conversation_data)
+        
+        # Prefer the export's own conversation id; fall back to one derived
+        # from the root node so it is still stable across re-imports
+        conversation_id = conversation_data.get('id') or str(
+            uuid.uuid5(ID_NAMESPACE, f"{root_id}:{conversation_data.get('create_time')}")
+        )
+        
         return cls(
-            id=str(uuid.uuid4()),
+            id=conversation_id,
             title=conversation_data.get('title'),
             messages=messages,
-            root_id=conversation_data.get('root', next(iter(mapping))),
+            root_id=root_id,
             metadata={
                 "create_time": conversation_data.get('create_time'),
                 "update_time": conversation_data.get('update_time'),
+                "current_node": conversation_data.get('current_node'),
                 "moderation_results": conversation_data.get('moderation_results', [])
             }
         )
     
-    def traverse_messages(self) -> List[Message]:
-        """Traverse messages in chronological order"""
-        result = []
+    @staticmethod
+    def _find_root_id(conversation_data: Dict) -> str:
+        """Locate the first node carrying a message, skipping empty placeholder roots"""
+        mapping = conversation_data['mapping']
+        root_id = conversation_data.get('root')
+        if root_id not in mapping:
+            root_id = next(
+                (node_id for node_id, node in mapping.items() if node.get('parent') is None),
+                next(iter(mapping))
+            )
+        
+        # Exports start with a message-less "client-created-root" node
+        while mapping[root_id].get('message') is None and mapping[root_id].get('children'):
+            root_id = mapping[root_id]['children'][0]
+        
+        return root_id
+    
+    def iter_messages(self) -> Iterator[Message]:
+        """Lazily traverse messages breadth-first from the root in linear time"""
+        messages = self.messages
         queue = [self.root_id]
+        head = 0
         
-        while queue:
-            msg_id = queue.pop(0)
-            if msg_id in self.messages:
-                msg = self.messages[msg_id]
-                result.append(msg)
+        while head < len(queue):
+            msg = messages.get(queue[head])
+            head += 1
+            if msg is not None:
+                yield msg
                 queue.extend(msg.children_ids)
-                
-        return result
-
-    def extract_semantic_units(self) -> List[Dict]:
-        """Extract semantic units for vector embedding"""
+    
+    def traverse_messages(self) -> List[Message]:
+        """Traverse messages in chronological order"""
+        return list(self.iter_messages())
+    
+    @property
+    def path_index(self) -> ThreadPathIndex:
+        """Ancestor index over the message tree, built on first use"""
+        if self._paths is None:
+            self._paths = ThreadPathIndex(self.messages, self.root_id, self.metadata.get("current_node"))
+        return self._paths
+    
+    @property
+    def active_leaf_id(self) -> Optional[str]:
+        """
+        Last message of the branch shown in ChatGPT
+        
+        The export's `current_node` when known, otherwise the branch that
+        always follows the latest regeneration (the last child).
+        """
+        return self.path_index.active_leaf_id
+    
+    def active_path(self) -> List[Message]:
+        """Messages of the active branch, root first"""
+        return [self.messages[message_id] for message_id in self.path_index.active_path_ids()]
+    
+    def is_active(self, message_id: str) -> bool:
+        """Whether a message is on the active branch, in O(1)"""
+        return self.path_index.is_active(message_id)
+    
+    def context_messages(self, message_id: str, turns: int) -> List[Message]:
+        """The `turns` messages leading up to a message on its branch, oldest first"""
+        return [self.messages[ancestor_id] for ancestor_id in self.path_index.ancestor_ids(message_id, turns)]
+    
+    def extract_semantic_units(
+        self,
+        message_ids: Optional[Set[str]] = None,
+        chunker=None,
+        context_turns: int = 0
+    ) -> List[Dict]:
+        """
+        Extract semantic units for vector embedding
+        
+        Each unit references its message's content and carries the character
+        offsets of its chunk in metadata; use unit_text() to get the text and
+        embedding_text() for the text to embed.
+        
+        Args:
+            message_ids: Optional subset of messages to extract units for
+            chunker: Optional TextChunker; without one every message is a
+                single unit
+            context_turns: The ends of up to this many preceding messages on
+                the unit's branch are added to its context as text, which is
+                embedded with the unit
+        """
+        messages = [
+            msg for msg in self.iter_messages()
+            if message_ids is None or msg.id in message_ids
+        ]
+        if chunker is not None:
+            spans = chunker.split([msg.content for msg in messages])
+        else:
+            spans = [[(0, len(msg.content))] for msg in messages]
+        
         units = []
-        for msg in self.traverse_messages():
-            # Basic semantic unit: entire message
-            units.append({
-                "text": msg.content,
-                "metadata": {
-                    "message_id": msg.id,
-                    "conversation_id": self.id,
-                    "role": msg.role,
-                    "type": "message",
-                    "context": {
-                        "title": self.title,
-                        "parent_id": msg.parent_id
-                    }
-                }
-            })
+        for msg, msg_spans in zip(messages, spans):
+            unit_type = "message" if len(msg_spans) == 1 else "chunk"
+            for index, (start, end) in enumerate(msg_spans):
+                units.append(self.make_unit(msg, unit_type, index, start, end, context_turns))
             
-            # TODO: Add more granular semantic units:
-            # - Sentence-level splits
-            # - Paragraph-level splits
-            # - Code blocks
-            # - Question-answer pairs
-            
-        return units
\ No newline at end of file
+            # TODO: Add question-answer pair units
+        
+        return units
+    
+    def make_unit(
+        self,
+        msg: Message,
+        unit_type: str,
+        index: int,
+        start: int,
+        end: int,
+        context_turns: int = 0
+    ) -> Dict:
+        """Semantic unit for the [start, end) chunk of one of this thread's messages"""
+        context = {"title": self.title, "parent_id": msg.parent_id}
+        if context_turns > 0 and msg.id in self.path_index:
+            turns = [
+                f"{turn.role}: {turn.content[-CONTEXT_TURN_CHARS:]}"
+                for turn in self.context_messages(msg.id, context_turns) if turn.content
+            ]
+            if turns:
+                context["text"] = "\n".join(turns)
+        
+        return {
+            "text": msg.content,
+            "metadata": {
+                "message_id": msg.id,
+                "conversation_id": self.id,
+                "role": msg.role,
+                "type": unit_type,
+                "chunk": {
+                    "index": index,
+                    "start": start,
+                    "end": end
+                },
+                "context": context
+            }
+        }
+
+def unit_text(unit: Dict) -> str:
+    """Text covered by a semantic unit's chunk span"""
+    chunk = unit["metadata"].get("chunk")
+    if chunk is None:
+        return unit["text"]
+    return unit["text"][chunk["start"]:chunk["end"]]
+
+def embedding_text(unit: Dict) -> str:
+    """
+    Text embedded for a semantic unit: its chunk, followed by the preceding turns
+    
+    The context comes last so that when the model truncates long inputs it
+    drops context rather than the unit's own text.
+    """
+    text = unit_text(unit)
+    context = unit["metadata"].get("context", {}).get("text")
+    if context:
+        return f"{text}\n\n{context}"
+    return text
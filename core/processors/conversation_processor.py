@@ -1,18 +1,132 @@
-from typing import List, Dict, Any, Generator
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
 from pathlib import Path
 import asyncio
+import os
+import uuid
 from datetime import datetime
 
-from ...core.models.conversation import ConversationThread, Message
+from ...core.analysis.chunking import TextChunker
+from ...core.analysis.concepts import ConceptExtractor, ConceptRegistry
+from ...core.analysis.dedup import NearDuplicateIndex
+from ...core.analysis.metrics import METRICS, MessageTable, MessageTableBuilder, MetricsEngine
+from ...core.analysis.search import HybridSearcher
+from ...core.analysis.similarity import MessageVectors, SimilarityGraphBuilder
+from ...core.embeddings.cache import EmbeddingCache
+from ...core.embeddings.encoder import EmbeddingEncoder
+from ...core.models.conversation import ConversationThread, ID_NAMESPACE, embedding_text, unit_text
+from ...core.storage.graph_writer import BulkGraphWriter
+from ...core.storage.local_index import LocalVectorIndex
+from ...core.processors.instrumentation import ImportInstrumentation
+from ...core.processors.parallel import ParallelParser
+from ...core.processors.pipeline import ImportBatch, ImportPipeline
+from ...core.storage.manifest import ImportManifest, conversation_fingerprint
+from ...core.storage.snapshot import ImportSnapshot
 from ...importers.common.base import ChatImporter
 
 class ConversationProcessor:
     """Process conversations for vector storage and knowledge graph relationships"""
     
-    def __init__(self, qdrant_client, neo4j_client):
+    def __init__(self, qdrant_client, neo4j_client, config: Optional[Dict[str, Any]] = None):
         self.qdrant = qdrant_client
         self.neo4j = neo4j_client
-        self.collection_name = "chat_embeddings"
+        self.config = config or {}
+        
+        qdrant_config = self.config.get("qdrant", {})
+        self.collection_name = qdrant_config.get("collection_name", "chat_embeddings")
+        self.max_inflight_batches = max(1, qdrant_config.get("max_inflight_batches", 4))
+        self.scroll_batch_size = max(1, qdrant_config.get("scroll_batch_size", 1000))
+        
+        embeddings_config = self.config.get("embeddings", {})
+        self.encoder = EmbeddingEncoder.from_config(embeddings_config)
+        self.batch_size = self.encoder.batch_size
+        analysis_config = self.config.get("analysis", {})
+        self.chunker = TextChunker.from_config(analysis_config, embeddings_config)
+        self.concept_extractor = ConceptExtractor.from_config(analysis_config)
+        self.context_turns = analysis_config.get("context_turns", 0)
+        self.metric_names = analysis_config.get("metrics", METRICS)
+        
+        # Near-duplicate units are linked to a stored representative instead of embedded
+        self.deduplicator = NearDuplicateIndex.from_config(
+            self.config.get("deduplication"), self.config.get("storage", {})
+        )
+        
+        storage_config = self.config.get("storage", {})
+        self.embedding_cache = None
+        if embeddings_config.get("cache_enabled", True):
+            self.embedding_cache = EmbeddingCache(
+                Path(storage_config.get("cache_dir", "cache")) / "embeddings.sqlite3",
+                model_name=self.encoder.model_name,
+                max_size=storage_config.get("max_cache_size", 1 << 30)
+            )
+        
+        # Optional local vector index: serverless search and a warm cache in front of Qdrant
+        index_config = self.config.get("local_index", {})
+        self.local_index = None
+        self.index_nprobe = index_config.get("nprobe")
+        self.ivf_lists = index_config.get("ivf_lists", 0)
+        if index_config.get("enabled", False):
+            self.local_index = LocalVectorIndex.from_config(
+                index_config,
+                storage_config,
+                dim=qdrant_config.get("vector_size", 384)
+            )
+        
+        neo4j_config = self.config.get("neo4j", {})
+        self.graph_writer = BulkGraphWriter(
+            neo4j_client,
+            database=neo4j_config.get("database"),
+            rows_per_statement=neo4j_config.get("rows_per_statement", 5000)
+        )
+        self.similarity = SimilarityGraphBuilder.from_config(self.graph_writer, self.config.get("similarity"))
+        self.searcher = HybridSearcher.from_config(
+            self,
+            neo4j_client,
+            self.config.get("search"),
+            database=neo4j_config.get("database")
+        )
+        
+        import_config = self.config.get("import", {})
+        self.max_batch_size = max(1, import_config.get("max_batch_size", 100))
+        self.import_workers = max(1, import_config.get("threads", 4))
+        self.queue_size = import_config.get("queue_size")
+        
+        # 0 parses on a single worker thread; None uses one process per core
+        parse_processes = import_config.get("parse_processes", 0)
+        self.parse_processes = (os.cpu_count() or 1) if parse_processes is None else parse_processes
+        self.parse_chunk_size = import_config.get("parse_chunk_size", 64)
+        
+        # Per-call latency of the stores and models; off by default
+        self.instrumentation = ImportInstrumentation(import_config.get("instrumentation", False))
+        
+        # State of the current or most recent import, for import_progress()
+        self._import_state = "idle"
+        self._import_stats: Optional[Dict[str, Any]] = None
+        self._import_pipeline: Optional[ImportPipeline] = None
+        self._import_error: Optional[str] = None
+        
+        self.manifest = None
+        if import_config.get("incremental", True):
+            self.manifest = ImportManifest(
+                Path(storage_config.get("data_dir", "data")) / "import_manifest.json"
+            )
+        
+        # Parsed messages and embeddings kept on disk so downstream stores can be rebuilt
+        self.snapshot = None
+        if import_config.get("snapshot", False):
+            self.snapshot = ImportSnapshot.from_config(storage_config, qdrant_config.get("vector_size", 384))
+        
+        # Concepts merged so far, kept with the manifest or snapshot so later imports merge the same way
+        data_dir = Path(storage_config.get("data_dir", "data"))
+        persistent = self.manifest is not None or self.snapshot is not None
+        self.concept_registry = ConceptRegistry(
+            analysis_config.get("concept_similarity", 0.9),
+            data_dir / "concepts.npz" if persistent else None
+        )
+        
+        # Columnar rows of every stored conversation, for corpus-wide metrics; saved
+        # with the manifest because incremental imports skip unchanged conversations
+        self.table_builder = MessageTableBuilder(path=data_dir / "message_table.npz" if persistent else None)
+        self._metrics: Optional[MetricsEngine] = None
     
     async def process_import(self, importer: ChatImporter, source_path: Path) -> Dict[str, Any]:
         """
@@ -21,7 +135,7 @@ class ConversationProcessor:
         Args:
             importer: ChatImporter instance
             source_path: Path to the source file/directory
-            
+        
         Returns:
             Dict containing import statistics
         """
@@ -31,124 +145,756 @@ class ConversationProcessor:
         stats = {
             "start_time": datetime.now(),
             "conversations_processed": 0,
+            "conversations_skipped": 0,
+            "conversations_updated": 0,
             "messages_processed": 0,
             "vectors_created": 0,
             "relationships_created": 0,
-            "concepts_extracted": 0
+            "concepts_extracted": 0,
+            "embedding_cache_hits": 0,
+            "embedding_cache_misses": 0,
+            "duplicate_units": 0
         }
+        cache = self.embedding_cache
+        cache_hits, cache_misses = (cache.hits, cache.misses) if cache else (0, 0)
         
-        # Extract and process conversations
-        for conv_data in importer.extract_conversations(source_path):
-            thread = ConversationThread.from_export_mapping(conv_data)
-            await self.process_conversation(thread)
+        self.instrumentation.reset()
+        self._import_state = "running"
+        self._import_stats = stats
+        self._import_pipeline = None
+        self._import_error = None
+        
+        # Load the manifest up front; stages only read and update it afterwards
+        loop = asyncio.get_running_loop()
+        if self.manifest is not None:
+            await loop.run_in_executor(None, self.manifest.load)
+        await loop.run_in_executor(None, self.table_builder.load)
+        
+        # A full import replaces the snapshot; an incremental one appends to it
+        if self.snapshot is not None:
+            self.snapshot.begin(reset=self.manifest is None)
+        
+        parser = None
+        if self.parse_processes > 0:
+            parser = ParallelParser(
+                self.parse_processes,
+                chunk_size=self.parse_chunk_size,
+                chunker=self.chunker,
+                concepts=self.concept_extractor,
+                context_turns=self.context_turns
+            )
+            parser.start()
+        
+        pipeline = ImportPipeline(
+            self,
+            workers=self.import_workers,
+            queue_size=self.queue_size,
+            parser=parser
+        )
+        self._import_pipeline = pipeline
+        try:
+            await pipeline.run(importer.extract_conversations(source_path), stats)
+        except asyncio.CancelledError:
+            self._import_state = "cancelled"
+            raise
+        except BaseException as e:
+            self._import_state = "failed"
+            self._import_error = repr(e)
+            raise
+        finally:
+            if parser is not None:
+                parser.close()
             
-            stats["conversations_processed"] += 1
-            stats["messages_processed"] += len(thread.messages)
+            # Only completed batches are recorded, so an interrupted import
+            # resumes where it stopped. Saving merges and writes whole files,
+            # so it stays off the event loop.
+            await loop.run_in_executor(None, self._save_import_state)
+            
+            # Cached search results may no longer reflect the stores
+            self.searcher.invalidate()
+        
+        if self.local_index is not None:
+            await loop.run_in_executor(None, self.local_index.flush)
+            await loop.run_in_executor(None, self.local_index.maybe_build_ivf, self.ivf_lists)
+            self.searcher.invalidate()
+        
+        if cache is not None:
+            stats["embedding_cache_hits"] = cache.hits - cache_hits
+            stats["embedding_cache_misses"] = cache.misses - cache_misses
+        
+        # Gathered during the pass above, so this does not re-read the archive
+        stats["source_metadata"] = importer.extract_metadata(source_path)
         
         stats["end_time"] = datetime.now()
         stats["duration"] = stats["end_time"] - stats["start_time"]
         
+        instrumentation = self.instrumentation.snapshot()
+        if instrumentation is not None:
+            stats["instrumentation"] = instrumentation
+        self._import_state = "finished"
+        
+        return stats
+    
+    def _save_import_state(self):
+        """Write the manifest, snapshot, concept registry and metrics table; blocks on file I/O"""
+        if self.manifest is not None:
+            self.manifest.save()
+        if self.snapshot is not None:
+            self.snapshot.commit()
+        if self.concept_extractor is not None:
+            self.concept_registry.save()
+        self.table_builder.save()
+    
+    def warm_up(self):
+        """
+        Load the embedding model, tokenizer and spaCy pipeline now instead of
+        on first use
+        
+        Blocks for as long as the models take to load; call it from a worker thread.
+        """
+        self.encoder.model
+        self.chunker.load()
+        if self.concept_extractor is not None:
+            self.concept_extractor.nlp
+    
+    def close(self):
+        """Release the local files held open by the processor"""
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+        if self.deduplicator is not None:
+            self.deduplicator.close()
+        if self.local_index is not None:
+            self.local_index.close()
+    
+    def import_progress(self) -> Dict[str, Any]:
+        """
+        Counters, stage throughput and queue depths of the current or last import
+        
+        Safe to call while an import runs; per-call latencies are included when
+        `import.instrumentation` is enabled.
+        """
+        progress: Dict[str, Any] = {"state": self._import_state}
+        stats = self._import_stats
+        if stats is None:
+            return progress
+        
+        progress["counters"] = {
+            key: value for key, value in stats.items()
+            if isinstance(value, int) and not isinstance(value, bool)
+        }
+        start_time = stats["start_time"]
+        progress["start_time"] = start_time
+        progress["elapsed_seconds"] = round(
+            (stats.get("end_time", datetime.now()) - start_time).total_seconds(), 3
+        )
+        if self._import_pipeline is not None:
+            progress.update(self._import_pipeline.progress())
+        if self._import_error is not None:
+            progress["error"] = self._import_error
+        
+        instrumentation = self.instrumentation.snapshot()
+        if instrumentation is not None:
+            progress["operations"] = instrumentation
+        return progress
+    
+    async def reload_from_snapshot(
+        self,
+        vectors: bool = True,
+        graph: bool = True,
+        concepts: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Rebuild the stores from the import snapshot instead of the export
+        
+        Nothing is parsed or embedded again, so changes to the graph schema or
+        concept settings can be tried in seconds. Concept names are still
+        embedded for merging, which the embedding cache normally serves.
+        
+        Args:
+            vectors: Rewrite the vectors to Qdrant and the local index
+            graph: Rewrite conversation and message nodes to Neo4j
+            concepts: Re-extract and link concepts
+        
+        Returns:
+            Dict containing reload statistics
+        """
+        if self.snapshot is None:
+            raise ValueError("Import snapshots are disabled (import.snapshot)")
+        
+        stats = {
+            "start_time": datetime.now(),
+            "conversations_processed": 0,
+            "messages_processed": 0,
+            "vectors_created": 0,
+            "relationships_created": 0,
+            "concepts_extracted": 0
+        }
+        
+        batches = self.snapshot.iter_batches(self.max_batch_size, self.context_turns)
+        loop = asyncio.get_running_loop()
+        all_duplicates = []
+        while True:
+            batch = await loop.run_in_executor(None, next, batches, None)
+            if batch is None:
+                break
+            threads, semantic_units, embeddings, duplicates = batch
+            
+            if vectors:
+                vector_ids = await self._write_vectors(semantic_units, embeddings.tolist())
+                stats["vectors_created"] += len(semantic_units)
+            else:
+                vector_ids = {
+                    unit["metadata"]["message_id"]: self._point_id(unit)
+                    for unit in semantic_units if unit["metadata"]["chunk"]["index"] == 0
+                }
+            
+            # Messages whose first chunk was a duplicate share the representative's vector
+            for duplicate in duplicates:
+                if duplicate["chunk_index"] == 0:
+                    vector_ids[duplicate["message_id"]] = duplicate["point_id"]
+            all_duplicates.extend(duplicates)
+            
+            if graph:
+                stats["relationships_created"] += await self._create_graph_structure(threads, vector_ids)
+            concept_batch = ImportBatch(threads=threads)
+            if concepts:
+                stats["concepts_extracted"] += await self._process_concepts(concept_batch)
+            
+            await loop.run_in_executor(None, self.table_builder.add_many, threads, concept_batch.topics)
+            
+            stats["conversations_processed"] += len(threads)
+            stats["messages_processed"] += sum(len(thread.messages) for thread in threads)
+        
+        # A representative may come from a later conversation of the snapshot,
+        # so DUPLICATE_OF edges are written once every message exists
+        if graph and all_duplicates:
+            stats["relationships_created"] += await self._create_graph_structure([], {}, None, all_duplicates)
+        
+        if vectors and self.local_index is not None:
+            await loop.run_in_executor(None, self.local_index.flush)
+        if concepts and self.concept_extractor is not None:
+            await loop.run_in_executor(None, self.concept_registry.save)
+        await loop.run_in_executor(None, self.table_builder.save)
+        self.searcher.invalidate()
+        
+        stats["end_time"] = datetime.now()
+        stats["duration"] = stats["end_time"] - stats["start_time"]
         return stats
     
     async def process_conversation(self, thread: ConversationThread):
         """Process a single conversation thread"""
-        # Extract semantic units for vector embedding
-        semantic_units = thread.extract_semantic_units()
+        await self._process_batch([thread])
+    
+    async def _process_batch(
+        self,
+        threads: List[ConversationThread],
+        stats: Optional[Dict[str, Any]] = None,
+        message_filter: Optional[Dict[str, Set[str]]] = None
+    ):
+        """
+        Process a group of conversation threads outside the import pipeline
+        
+        Args:
+            threads: Threads to process
+            stats: Optional import statistics to update
+            message_filter: Optional thread id -> ids of the only messages to
+                process, used for conversations that changed since the last import
+        """
+        batch = ImportBatch(threads=threads, message_filter=message_filter or {})
+        try:
+            await self._embed_batch(batch)
+        except BaseException:
+            self._discard_batch(batch)
+            raise
+        await self._store_batch(batch, stats)
+    
+    def _parse_batch(self, conversations: Iterator[Dict[str, Any]], stats: Dict[str, Any]) -> Optional[ImportBatch]:
+        """
+        Pull conversations until a batch of `import.max_batch_size` needs processing
+        
+        Runs on a worker thread. Conversations unchanged since the last import are
+        skipped; changed ones are limited to their added or edited messages.
         
-        # Create vector embeddings in Qdrant
-        vector_ids = await self._create_vector_embeddings(semantic_units)
+        Returns:
+            The next batch, or None once the source is exhausted
+        """
+        batch = ImportBatch(threads=[])
         
-        # Create knowledge graph structure
-        await self._create_graph_structure(thread, vector_ids)
+        for conv_data in conversations:
+            thread = ConversationThread.from_export_mapping(conv_data)
+            fingerprint = conversation_fingerprint(thread) if self.manifest is not None else None
+            if not self._admit_thread(batch, thread, fingerprint, stats):
+                continue
+            
+            if len(batch.threads) >= self.max_batch_size:
+                break
+        
+        if not batch.threads:
+            return None
+        
+        if self.concept_extractor is not None:
+            with self.instrumentation.timer("concepts.extract", len(batch.threads)):
+                batch.mentions = self.concept_extractor.extract(batch.threads, batch.message_filter)
+        return batch
+    
+    def _admit_thread(
+        self,
+        batch: ImportBatch,
+        thread: ConversationThread,
+        fingerprint: Optional[str],
+        stats: Dict[str, Any]
+    ) -> bool:
+        """
+        Add a parsed thread to a batch unless the manifest says it is unchanged
+        
+        Threads that changed since the last import are limited to their added or
+        edited messages.
+        """
+        if self.manifest is not None:
+            if self.manifest.is_unchanged(thread, fingerprint):
+                stats["conversations_skipped"] += 1
+                return False
+            
+            changed_ids = self.manifest.changed_message_ids(thread)
+            if changed_ids is not None:
+                batch.message_filter[thread.id] = changed_ids
+                stats["conversations_updated"] += 1
+            batch.fingerprints[thread.id] = fingerprint
+        
+        batch.threads.append(thread)
+        return True
+    
+    async def _embed_batch(self, batch: ImportBatch):
+        """
+        Extract semantic units for a batch and compute their embeddings
+        
+        Chunking and duplicate detection run on worker threads, so the event
+        loop keeps serving other stages and requests meanwhile.
+        """
+        loop = asyncio.get_running_loop()
+        if not batch.units_ready:
+            batch.semantic_units = await loop.run_in_executor(None, self._extract_units, batch)
+            batch.units_ready = True
+        
+        if self.deduplicator is not None:
+            with self.instrumentation.timer("dedup.find_or_add", len(batch.semantic_units)):
+                batch.semantic_units, batch.duplicates = await loop.run_in_executor(
+                    None, self._split_duplicates, batch.semantic_units, batch.key
+                )
+        
+        batch.vectors = await self._generate_embeddings([embedding_text(unit) for unit in batch.semantic_units])
+    
+    def _extract_units(self, batch: ImportBatch) -> List[Dict]:
+        """Semantic units of a batch's threads; runs on a worker thread"""
+        units = []
+        for thread in batch.threads:
+            units.extend(thread.extract_semantic_units(
+                batch.message_filter.get(thread.id),
+                chunker=self.chunker,
+                context_turns=self.context_turns
+            ))
+        return units
+    
+    def _discard_batch(self, batch: ImportBatch):
+        """Drop the near-duplicate representatives of a batch that will not be stored"""
+        if self.deduplicator is not None:
+            self.deduplicator.discard(batch.key)
+    
+    def _split_duplicates(self, units: List[Dict], batch_key: int) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Separate near duplicates of units stored earlier or earlier in the batch
+        
+        Only the first unit of each group of near duplicates (per role) is
+        embedded and stored; the others are returned as duplicate rows and
+        linked to it in the graph. The batch's new representatives become
+        visible to other batches once _store_batch commits them. Runs on a
+        worker thread.
+        
+        Returns:
+            (units to embed, duplicate rows)
+        """
+        point_ids = [self._point_id(unit) for unit in units]
+        matches = self.deduplicator.find_or_add(
+            [unit_text(unit) for unit in units],
+            [unit["metadata"]["role"] for unit in units],
+            [(unit["metadata"]["message_id"], point_id) for unit, point_id in zip(units, point_ids)],
+            batch=batch_key
+        )
+        
+        kept = []
+        duplicates = []
+        for unit, own_point_id, match in zip(units, point_ids, matches):
+            # A unit imported again matches itself and is stored as before
+            if match is None or match[0][1] == own_point_id:
+                kept.append(unit)
+                continue
+            
+            (representative_id, point_id), similarity = match
+            duplicates.append({
+                "conversation_id": unit["metadata"]["conversation_id"],
+                "message_id": unit["metadata"]["message_id"],
+                "representative_id": representative_id,
+                "point_id": point_id,
+                "chunk_index": unit["metadata"]["chunk"]["index"],
+                "similarity": similarity
+            })
+        return kept, duplicates
+    
+    async def _store_batch(self, batch: ImportBatch, stats: Optional[Dict[str, Any]] = None):
+        """Write an embedded batch to Qdrant and Neo4j and record it in the manifest"""
+        loop = asyncio.get_running_loop()
+        try:
+            # Create vector embeddings in Qdrant
+            vector_ids = await self._write_vectors(batch.semantic_units, batch.vectors)
+            
+            # Messages whose first chunk was a duplicate share the representative's vector
+            for duplicate in batch.duplicates:
+                if duplicate["chunk_index"] == 0:
+                    vector_ids[duplicate["message_id"]] = duplicate["point_id"]
+            
+            # Create knowledge graph structure
+            relationships = await self._create_graph_structure(
+                batch.threads, vector_ids, batch.message_filter, batch.duplicates
+            )
+            
+            # Duplicates in later batches may now link to this batch's messages
+            if self.deduplicator is not None:
+                await loop.run_in_executor(None, self.deduplicator.commit, batch.key)
+        finally:
+            # A no-op once committed; a failed batch's representatives were never stored
+            self._discard_batch(batch)
         
         # Extract and link concepts
-        await self._process_concepts(thread)
+        concepts = await self._process_concepts(batch)
+        
+        await loop.run_in_executor(None, self.table_builder.add_many, batch.threads, batch.topics)
+        
+        if self.snapshot is not None:
+            with self.instrumentation.timer("snapshot.append", len(batch.semantic_units)):
+                await loop.run_in_executor(
+                    None, self.snapshot.append, batch.threads, batch.semantic_units, batch.vectors, batch.duplicates
+                )
+        
+        if self.manifest is not None:
+            for thread in batch.threads:
+                if thread.id in batch.fingerprints:
+                    self.manifest.record(thread, batch.fingerprints[thread.id])
+        
+        if stats is not None:
+            stats["conversations_processed"] += len(batch.threads)
+            stats["messages_processed"] += sum(
+                len(batch.message_filter.get(thread.id, thread.messages)) for thread in batch.threads
+            )
+            stats["vectors_created"] += len(batch.semantic_units)
+            stats["duplicate_units"] += len(batch.duplicates)
+            stats["relationships_created"] += relationships
+            stats["concepts_extracted"] += concepts
     
     async def _create_vector_embeddings(self, semantic_units: List[Dict]) -> Dict[str, str]:
         """Create vector embeddings for semantic units"""
+        vectors = await self._generate_embeddings([embedding_text(unit) for unit in semantic_units])
+        return await self._write_vectors(semantic_units, vectors)
+    
+    async def _write_vectors(self, semantic_units: List[Dict], vectors: List[List[float]]) -> Dict[str, str]:
+        """
+        Write embedded semantic units to Qdrant
+        
+        Points are sent as batched upserts of `embeddings.batch_size`, with up
+        to `qdrant.max_inflight_batches` requests outstanding at once.
+        """
         vector_ids = {}
+        inflight = asyncio.Semaphore(self.max_inflight_batches)
+        pending = []
         
-        for unit in semantic_units:
-            # Create vector embedding
-            vector_id = await self.qdrant.create_point(
-                collection_name=self.collection_name,
-                payload=unit["metadata"],
-                vector=await self._generate_embedding(unit["text"])
-            )
+        try:
+            for start in range(0, len(semantic_units), self.batch_size):
+                batch = semantic_units[start:start + self.batch_size]
+                point_ids = [self._point_id(unit) for unit in batch]
+                
+                await inflight.acquire()
+                pending.append(asyncio.ensure_future(self._upsert_vectors(
+                    point_ids, vectors[start:start + self.batch_size], batch, inflight
+                )))
+                
+                # Messages link to the vector of their first chunk
+                for unit, point_id in zip(batch, point_ids):
+                    if unit["metadata"]["chunk"]["index"] == 0:
+                        vector_ids[unit["metadata"]["message_id"]] = point_id
             
-            vector_ids[unit["metadata"]["message_id"]] = vector_id
+            await asyncio.gather(*pending)
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            raise
         
         return vector_ids
     
-    async def _create_graph_structure(self, thread: ConversationThread, vector_ids: Dict[str, str]):
-        """Create Neo4j graph structure"""
-        # Create conversation node
-        conv_props = {
-            "id": thread.id,
-            "title": thread.title,
-            "create_time": thread.metadata.get("create_time"),
-            "update_time": thread.metadata.get("update_time")
-        }
-        
-        await self.neo4j.create_node("Conversation", conv_props)
-        
-        # Create message nodes and relationships
-        for msg in thread.traverse_messages():
-            msg_props = {
-                "id": msg.id,
-                "content": msg.content,
-                "role": msg.role,
-                "vector_id": vector_ids.get(msg.id),
-                "timestamp": msg.timestamp.isoformat()
-            }
-            
-            await self.neo4j.create_node("Message", msg_props)
+    @staticmethod
+    def _point_id(unit: Dict) -> str:
+        """Deterministic Qdrant point id, so re-imports overwrite rather than duplicate"""
+        metadata = unit["metadata"]
+        name = f"{metadata['conversation_id']}:{metadata['message_id']}"
+        chunk_index = metadata["chunk"]["index"]
+        if chunk_index:
+            name = f"{name}:{chunk_index}"
+        return str(uuid.uuid5(ID_NAMESPACE, name))
+    
+    async def _upsert_vectors(
+        self,
+        point_ids: List[str],
+        vectors: List[List[float]],
+        semantic_units: List[Dict],
+        inflight: asyncio.Semaphore
+    ):
+        """Write one batch of vectors to Qdrant and the local index, then release its in-flight slot"""
+        payloads = [unit["metadata"] for unit in semantic_units]
+        try:
+            if self.qdrant is not None:
+                from qdrant_client import models
+                
+                with self.instrumentation.timer("qdrant.upsert", len(point_ids)):
+                    await self.qdrant.upsert(
+                        collection_name=self.collection_name,
+                        points=models.Batch(ids=point_ids, vectors=vectors, payloads=payloads)
+                    )
             
-            # Link to conversation
-            await self.neo4j.create_relationship(
-                "Message", {"id": msg.id},
-                "BELONGS_TO",
-                "Conversation", {"id": thread.id}
+            if self.local_index is not None:
+                loop = asyncio.get_running_loop()
+                # The local index also serves search without Neo4j, so its payloads carry the chunk text
+                local_payloads = [
+                    dict(payload, text=unit_text(unit)) for payload, unit in zip(payloads, semantic_units)
+                ]
+                with self.instrumentation.timer("local_index.upsert", len(point_ids)):
+                    await loop.run_in_executor(None, self.local_index.upsert, point_ids, vectors, local_payloads)
+        finally:
+            inflight.release()
+    
+    async def search_vectors(
+        self,
+        query: str,
+        limit: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the semantic units closest to a query text
+        
+        Served from the local index when it holds vectors, otherwise from Qdrant.
+        
+        Args:
+            query: Query text
+            limit: Maximum number of hits
+            filters: Optional exact-match payload filters
+            vector: Precomputed query embedding, if the caller has one
+        
+        Returns:
+            Hits as dicts with id, score and payload, best first
+        """
+        if vector is None:
+            vector = await self._generate_embedding(query)
+        
+        if self.local_index is not None and self.local_index.count:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(
+                None,
+                lambda: self.local_index.search([vector], limit, filters, nprobe=self.index_nprobe)
             )
-            
-            # Link to parent message
-            if msg.parent_id:
-                await self.neo4j.create_relationship(
-                    "Message", {"id": msg.id},
-                    "REPLIES_TO",
-                    "Message", {"id": msg.parent_id}
-                )
+            return results[0]
+        
+        if self.qdrant is None:
+            return []
+        
+        from qdrant_client import models
+        
+        query_filter = None
+        if filters:
+            query_filter = models.Filter(must=[
+                models.FieldCondition(key=key, match=models.MatchValue(value=value))
+                for key, value in filters.items()
+            ])
+        
+        hits = await self.qdrant.search(
+            collection_name=self.collection_name,
+            query_vector=vector,
+            query_filter=query_filter,
+            limit=limit,
+            with_payload=True
+        )
+        return [{"id": str(hit.id), "score": hit.score, "payload": hit.payload} for hit in hits]
+    
+    async def _create_graph_structure(
+        self,
+        threads: List[ConversationThread],
+        vector_ids: Dict[str, str],
+        message_filter: Optional[Dict[str, Set[str]]] = None,
+        duplicates: Optional[List[Dict]] = None
+    ) -> int:
+        """Create Neo4j graph structure for a batch of threads in a single transaction"""
+        with self.instrumentation.timer("neo4j.write_graph", len(threads)):
+            written = await self.graph_writer.write(threads, vector_ids, message_filter, duplicates)
+        return written["relationships"]
     
-    async def _process_concepts(self, thread: ConversationThread):
-        """Extract and link concepts from messages"""
-        # TODO: Implement concept extraction
-        # - Extract key concepts/topics from messages
-        # - Create concept nodes
-        # - Link messages to concepts
-        # - Create relationships between related concepts
-        pass
+    async def _process_concepts(self, batch: ImportBatch) -> int:
+        """
+        Score a batch's concept mentions, merge them into canonical concepts and
+        write Concept nodes and MENTIONS edges in one transaction
+        
+        Mentions normally arrive from the parse stage; batches processed outside
+        the pipeline are analyzed here. The most relevant concept of every
+        analyzed message is left in `batch.topics` for the metrics table.
+        
+        Returns:
+            Number of distinct concepts linked by the batch
+        """
+        extractor = self.concept_extractor
+        if extractor is None:
+            return 0
+        
+        loop = asyncio.get_running_loop()
+        if batch.mentions is None:
+            with self.instrumentation.timer("concepts.extract", len(batch.threads)):
+                batch.mentions = await loop.run_in_executor(
+                    None, extractor.extract, batch.threads, batch.message_filter
+                )
+        
+        batch.topics = {message_id: None for message_id, _ in batch.mentions}
+        selected = await loop.run_in_executor(None, extractor.select, batch.mentions)
+        if not selected:
+            return 0
+        
+        # The most relevant surface form of a key names a new concept
+        forms = {}
+        prominence = {}
+        for _, key, name, label, relevance, _ in selected:
+            if relevance > prominence.get(key, -1.0):
+                forms[key] = (name, label)
+            prominence[key] = max(prominence.get(key, 0.0), relevance)
+        forms = {key: forms[key] for key in sorted(forms, key=prominence.get, reverse=True)}
+        
+        concept_ids = await self.concept_registry.resolve(forms, self._generate_embeddings)
+        
+        # Several surface forms in one message may resolve to the same concept
+        mentions = {}
+        for message_id, key, _, _, relevance, count in selected:
+            row = mentions.setdefault((message_id, concept_ids[key]), {
+                "message_id": message_id,
+                "concept_id": concept_ids[key],
+                "relevance": 0.0,
+                "count": 0
+            })
+            row["relevance"] = max(row["relevance"], relevance)
+            row["count"] += count
+        
+        # A message's most relevant concept is its topic in the metrics table
+        best = {}
+        for row in mentions.values():
+            current = best.get(row["message_id"])
+            if current is None or (row["relevance"], row["count"]) > (current["relevance"], current["count"]):
+                best[row["message_id"]] = row
+        batch.topics.update((message_id, row["concept_id"]) for message_id, row in best.items())
+        
+        concepts = []
+        for concept_id in dict.fromkeys(row["concept_id"] for row in mentions.values()):
+            name, label = self.concept_registry.describe(concept_id)
+            concepts.append({"id": concept_id, "name": name, "label": label})
+        
+        with self.instrumentation.timer("neo4j.write_concepts", len(mentions)):
+            await self.graph_writer.write_concepts(concepts, list(mentions.values()))
+        return len(concepts)
     
     async def _generate_embedding(self, text: str) -> List[float]:
         """Generate vector embedding for text"""
-        # TODO: Implement actual embedding generation
-        # This will use the model specified in Qdrant configuration
-        pass
-    
-    async def analyze_semantic_relationships(self, thread: ConversationThread):
-        """Analyze semantic relationships between messages"""
-        # TODO: Implement semantic analysis
-        # - Find similar messages/concepts
-        # - Identify topic shifts
-        # - Track concept evolution
-        # - Analyze conversation flow
-        pass
+        embeddings = await self._generate_embeddings([text])
+        return embeddings[0]
+    
+    async def _generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate vector embeddings for a batch of texts, consulting the embedding cache first"""
+        instrumentation = self.instrumentation
+        if self.embedding_cache is None:
+            with instrumentation.timer("encoder.encode", len(texts)):
+                return await self.encoder.encode_async(texts)
+        
+        with instrumentation.timer("embedding_cache.get", len(texts)):
+            hits, misses = await self.embedding_cache.get_many_async(texts)
+        embeddings = [None] * len(texts)
+        for index, embedding in hits.items():
+            embeddings[index] = embedding
+        
+        if misses:
+            miss_texts = [texts[index] for index in misses]
+            with instrumentation.timer("encoder.encode", len(miss_texts)):
+                vectors = await self.encoder.encode_async(miss_texts)
+            for index, embedding in zip(misses, vectors):
+                embeddings[index] = embedding
+            with instrumentation.timer("embedding_cache.put", len(miss_texts)):
+                await self.embedding_cache.put_many_async(miss_texts, vectors)
+        
+        return embeddings
+    
+    async def analyze_semantic_relationships(self) -> Dict[str, Any]:
+        """
+        Link every stored message to its nearest neighbors in other conversations
+        and mark replies that shift topic
+        
+        A batch job over all stored embeddings, read from the import snapshot
+        or the local index when enabled, otherwise scrolled from Qdrant
+        `qdrant.scroll_batch_size` points at a time; no source is queried
+        once per message. Existing SIMILAR_TO edges are replaced, so the job
+        can be re-run after imports.
+        
+        Returns:
+            Dict with the messages analyzed, SIMILAR_TO edges written and topic shifts found
+        """
+        loop = asyncio.get_running_loop()
+        vectors = await loop.run_in_executor(None, self._local_message_vectors)
+        if vectors is None:
+            if self.qdrant is None:
+                raise ValueError(
+                    "Semantic relationship analysis reads the stored embeddings; "
+                    "configure Qdrant or enable import.snapshot or local_index"
+                )
+            vectors = await MessageVectors.from_qdrant(self.qdrant, self.collection_name, self.scroll_batch_size)
+        return await self.similarity.run(vectors)
+    
+    def _local_message_vectors(self) -> Optional[MessageVectors]:
+        """Message vectors from the snapshot or the local index, or None when neither holds any"""
+        if self.snapshot is not None and self.snapshot.counts["units"]:
+            return MessageVectors.from_snapshot(self.snapshot)
+        if self.local_index is not None and self.local_index.count:
+            return MessageVectors.from_local_index(self.local_index)
+        return None
+    
+    async def metrics(self) -> MetricsEngine:
+        """Metrics engine over every conversation stored so far, updated after new batches"""
+        if self._metrics is None or self.table_builder.dirty:
+            # Merging new batches and loading the saved table stay off the event loop
+            table = await asyncio.get_running_loop().run_in_executor(None, self.table_builder.build)
+            if self._metrics is None or self._metrics.table is not table:
+                self._metrics = MetricsEngine(table)
+        return self._metrics
     
     async def extract_metrics(self, thread: ConversationThread) -> Dict[str, Any]:
         """Extract conversation metrics"""
-        # TODO: Implement metric extraction
-        # - Message frequency
-        # - Response times
-        # - Topic diversity
-        # - Conversation depth
-        # - User/Assistant interaction patterns
-        pass
\ No newline at end of file
+        engine = await self.metrics()
+        if engine.table.code(thread.id) is None:
+            # Not stored yet: measure the thread on its own
+            engine = MetricsEngine(MessageTable.from_threads([thread]))
+        return await asyncio.get_running_loop().run_in_executor(
+            None, engine.conversation_metrics, thread.id, self.metric_names
+        )
+    
+    async def analyze_metrics(self, conversation_id: str, metrics: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Metrics for a stored conversation
+        
+        Args:
+            conversation_id: Conversation to report on
+            metrics: Metric names (default: `analysis.metrics`)
+        
+        Raises:
+            KeyError: If the conversation has not been imported
+        """
+        engine = await self.metrics()
+        return await asyncio.get_running_loop().run_in_executor(
+            None, engine.conversation_metrics, conversation_id, metrics or self.metric_names
+        )
\ No newline at end of file
@@ -0,0 +1,108 @@
+from typing import Dict, Any, List, Optional
+import random
+import time
+
+import numpy as np
+
+# Latency samples kept per operation; beyond this, reservoir sampling keeps an unbiased subset
+DEFAULT_MAX_SAMPLES = 4096
+
+class LatencyRecorder:
+    """Call count, item count and a bounded latency sample for one operation"""
+    
+    __slots__ = ('calls', 'items', 'total_seconds', 'max_seconds', '_samples', '_max_samples', '_rng')
+    
+    def __init__(self, max_samples: int = DEFAULT_MAX_SAMPLES):
+        self.calls = 0
+        self.items = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._samples: List[float] = []
+        self._max_samples = max_samples
+        self._rng = random.Random(0)
+    
+    def add(self, seconds: float, items: int = 1):
+        self.calls += 1
+        self.items += items
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        
+        if len(self._samples) < self._max_samples:
+            self._samples.append(seconds)
+        else:
+            slot = self._rng.randrange(self.calls)
+            if slot < self._max_samples:
+                self._samples[slot] = seconds
+    
+    def summary(self) -> Dict[str, Any]:
+        p50, p95 = np.percentile(self._samples, [50, 95]) if self._samples else (0.0, 0.0)
+        return {
+            "calls": self.calls,
+            "items": self.items,
+            "total_seconds": round(self.total_seconds, 3),
+            "items_per_second": round(self.items / self.total_seconds, 1) if self.total_seconds else None,
+            "p50_ms": round(p50 * 1000, 2),
+            "p95_ms": round(p95 * 1000, 2),
+            "max_ms": round(self.max_seconds * 1000, 2)
+        }
+
+class _NullTimer:
+    """Timer returned while instrumentation is off; entering and leaving it does nothing"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ('_recorder', '_items', '_start')
+    
+    def __init__(self, recorder: LatencyRecorder, items: int):
+        self._recorder = recorder
+        self._items = items
+    
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._recorder.add(time.perf_counter() - self._start, self._items)
+        return False
+
+class ImportInstrumentation:
+    """
+    Latency and throughput of the individual store and model calls of an import
+    
+    Wrap a call in `with instrumentation.timer("qdrant.upsert", items):`. The
+    block may contain awaits, so the time includes waiting on the server.
+    When disabled, timer() returns a shared no-op context manager.
+    """
+    
+    def __init__(self, enabled: bool = False, max_samples: int = DEFAULT_MAX_SAMPLES):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._operations: Dict[str, LatencyRecorder] = {}
+    
+    def timer(self, operation: str, items: int = 1):
+        if not self.enabled:
+            return _NULL_TIMER
+        
+        recorder = self._operations.get(operation)
+        if recorder is None:
+            recorder = self._operations[operation] = LatencyRecorder(self.max_samples)
+        return _Timer(recorder, items)
+    
+    def reset(self):
+        self._operations = {}
+    
+    def snapshot(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Per-operation summaries, or None when disabled"""
+        if not self.enabled:
+            return None
+        return {name: recorder.summary() for name, recorder in sorted(self._operations.items())}
@@ -0,0 +1,187 @@
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Awaitable, Callable, Optional
+import asyncio
+import collections
+import uuid
+
+from ...importers.common.base import ChatImporter
+
+# Finished jobs kept for status queries; older ones are forgotten
+DEFAULT_MAX_FINISHED = 100
+
+class ImportJob:
+    """One submitted import and its outcome"""
+    
+    def __init__(self, source_path: Path, importer: ChatImporter, format_type: str):
+        self.id = uuid.uuid4().hex
+        self.source_path = source_path
+        self.importer = importer
+        self.format = format_type
+        self.state = "queued"  # queued, running, finished, failed or cancelled
+        self.submitted_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.stats: Optional[Dict[str, Any]] = None
+        self.counters: Optional[Dict[str, int]] = None  # Final counters, also kept when cancelled or failed
+        self.error: Optional[str] = None
+        self.processor = None
+        self.task: Optional[asyncio.Task] = None
+    
+    @property
+    def done(self) -> bool:
+        return self.state in ("finished", "failed", "cancelled")
+    
+    def progress(self) -> Dict[str, Any]:
+        """
+        State, counters, rate and estimated time remaining
+        
+        The total is estimated from how much of the source the importer has
+        read, since exports do not record their conversation count up front.
+        """
+        progress: Dict[str, Any] = {
+            "job_id": self.id,
+            "state": self.state,
+            "source_path": str(self.source_path),
+            "format": self.format,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if self.error is not None:
+            progress["error"] = self.error
+        if self.started_at is None:
+            return progress
+        
+        if self.counters is not None:
+            counters = self.counters
+        elif self.processor is not None:
+            counters = self.processor.import_progress().get("counters", {})
+        else:
+            counters = {}
+        progress["counters"] = counters
+        
+        elapsed = ((self.finished_at or datetime.now()) - self.started_at).total_seconds()
+        progress["elapsed_seconds"] = round(elapsed, 3)
+        
+        # Skipped conversations take almost no time, so they only count towards the total
+        processed = counters.get("conversations_processed", 0)
+        done = processed + counters.get("conversations_skipped", 0)
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        progress["conversations_per_second"] = round(rate, 2)
+        if elapsed > 0:
+            progress["messages_per_second"] = round(counters.get("messages_processed", 0) / elapsed, 2)
+        
+        source = self.importer.progress()
+        if source is not None:
+            progress["source"] = source
+        
+        if self.state == "running" and source and source["bytes_read"] and rate > 0:
+            fraction = min(1.0, source["bytes_read"] / max(1, source["bytes_total"]))
+            total = max(done, source["conversations_read"] / fraction)
+            progress["estimated_conversations"] = int(round(total))
+            progress["percent"] = round(100.0 * done / total, 1) if total else None
+            progress["eta_seconds"] = round(max(0.0, total - done) / rate, 1)
+        return progress
+
+class ImportJobManager:
+    """
+    Runs imports as background tasks, one at a time in submission order
+    
+    Imports share the processor's manifest, snapshot and counters, so they
+    are serialized; other requests keep being served while a job runs.
+    """
+    
+    def __init__(
+        self,
+        get_processor: Callable[[], Awaitable[Any]],
+        max_finished: int = DEFAULT_MAX_FINISHED
+    ):
+        """
+        Args:
+            get_processor: Coroutine function returning the ConversationProcessor
+            max_finished: Finished jobs kept for status queries
+        """
+        self._get_processor = get_processor
+        self.max_finished = max_finished
+        self._jobs: Dict[str, ImportJob] = collections.OrderedDict()
+        self._lock: Optional[asyncio.Lock] = None  # Created on the loop that runs the jobs
+    
+    def submit(self, source_path: Path, importer: ChatImporter, format_type: str) -> ImportJob:
+        """Queue an import and return its job without waiting for it"""
+        job = ImportJob(source_path, importer, format_type)
+        self._jobs[job.id] = job
+        self._forget_finished()
+        job.task = asyncio.ensure_future(self._run(job))
+        return job
+    
+    def get(self, job_id: str) -> ImportJob:
+        """Raises KeyError for unknown or forgotten jobs"""
+        return self._jobs[job_id]
+    
+    def jobs(self) -> List[ImportJob]:
+        return list(self._jobs.values())
+    
+    async def cancel(self, job_id: str) -> ImportJob:
+        """
+        Cancel a queued or running job and wait for it to stop
+        
+        Batches stored before the cancellation stay stored and are recorded in
+        the manifest, so importing the same source again resumes after them.
+        """
+        job = self.get(job_id)
+        if not job.done and job.task is not None:
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+        return job
+    
+    async def run_exclusive(self, operation: Callable[[Any], Awaitable[Any]]) -> Any:
+        """
+        Await `operation(processor)` after the imports submitted before it
+        
+        For batch jobs over everything stored, which should not read the
+        stores while an import is writing them.
+        """
+        # Queued jobs may not have reached the lock yet; wait() never cancels them
+        tasks = [job.task for job in self._jobs.values() if not job.done and job.task is not None]
+        if tasks:
+            await asyncio.wait(tasks)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            return await operation(await self._get_processor())
+    
+    async def close(self):
+        """Cancel every unfinished job"""
+        tasks = [job.task for job in self._jobs.values() if not job.done and job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _run(self, job: ImportJob):
+        # Created here rather than in __init__: before Python 3.10 a lock binds
+        # to the event loop current at construction, not the one running jobs
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        try:
+            async with self._lock:
+                job.processor = await self._get_processor()
+                job.state = "running"
+                job.started_at = datetime.now()
+                job.stats = await job.processor.process_import(job.importer, job.source_path)
+                job.state = "finished"
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e) or repr(e)
+        finally:
+            job.finished_at = datetime.now()
+            if job.processor is not None:
+                job.counters = job.processor.import_progress().get("counters", {})
+            job.processor = None
+    
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
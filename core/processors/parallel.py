@@ -0,0 +1,125 @@
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import collections
+import itertools
+import multiprocessing
+
+from ...core.analysis.concepts import MessageMentions
+from ...core.models.conversation import ConversationThread
+from ...core.storage.manifest import conversation_fingerprint
+
+# (thread, content fingerprint, semantic units for every message,
+#  concept mentions for every message or None when concepts are disabled)
+ParsedConversation = Tuple[ConversationThread, str, List[Dict], Optional[List[MessageMentions]]]
+
+def parse_chunk(
+    conversations: List[Dict[str, Any]],
+    chunker=None,
+    concepts=None,
+    context_turns: int = 0
+) -> List[ParsedConversation]:
+    """
+    Parse a chunk of raw export conversations in a worker process
+    
+    The raw `mapping` dicts stay in the worker; only the compact threads and
+    their units are pickled back. Unit texts are the message content strings
+    themselves, so pickle's memo sends each string once. With a
+    ConceptExtractor, the whole chunk goes through one `nlp.pipe` call.
+    """
+    threads = [ConversationThread.from_export_mapping(conv_data) for conv_data in conversations]
+    
+    mentions_by_thread: Dict[str, List[MessageMentions]] = {}
+    if concepts is not None:
+        thread_of = {msg_id: thread.id for thread in threads for msg_id in thread.messages}
+        for entry in concepts.extract(threads, n_process=1):
+            mentions_by_thread.setdefault(thread_of[entry[0]], []).append(entry)
+    
+    return [
+        (
+            thread,
+            conversation_fingerprint(thread),
+            thread.extract_semantic_units(chunker=chunker, context_turns=context_turns),
+            mentions_by_thread.get(thread.id, []) if concepts is not None else None
+        )
+        for thread in threads
+    ]
+
+def _take(iterator: Iterator[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    return list(itertools.islice(iterator, count))
+
+class ParallelParser:
+    """Parse conversations and extract semantic units and concept mentions in a process pool"""
+    
+    def __init__(
+        self,
+        processes: int,
+        chunk_size: int = 64,
+        chunker=None,
+        concepts=None,
+        context_turns: int = 0
+    ):
+        """
+        Args:
+            processes: Number of worker processes
+            chunk_size: Conversations sent to a worker per task
+            chunker: Optional TextChunker applied in the workers; its
+                tokenizer is loaded once per worker process
+            concepts: Optional ConceptExtractor applied in the workers; its
+                spaCy pipeline is loaded once per worker process
+            context_turns: Preceding messages whose ends form each unit's context text
+        """
+        self.processes = max(1, processes)
+        self.chunk_size = max(1, chunk_size)
+        self.chunker = chunker
+        self.concepts = concepts
+        self.context_turns = context_turns
+        self._pool = None
+    
+    def start(self):
+        """Start the worker processes"""
+        if self._pool is None:
+            # spawn avoids forking a process that already runs executor and model threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+    
+    def close(self):
+        """Shut the worker processes down"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+    
+    async def parse(self, conversations: Iterator[Dict[str, Any]]) -> AsyncIterator[ParsedConversation]:
+        """
+        Yield parsed conversations in source order
+        
+        At most two chunks per worker are in flight, so a consumer that stops
+        pulling results also stops reading the source.
+        """
+        loop = asyncio.get_running_loop()
+        pending = collections.deque()
+        max_pending = self.processes * 2
+        exhausted = False
+        
+        try:
+            while True:
+                while not exhausted and len(pending) < max_pending:
+                    # Reading the source decodes JSON, so keep it off the event loop
+                    chunk = await loop.run_in_executor(None, _take, conversations, self.chunk_size)
+                    if not chunk:
+                        exhausted = True
+                        break
+                    pending.append(loop.run_in_executor(
+                        self._pool, parse_chunk, chunk, self.chunker, self.concepts, self.context_turns
+                    ))
+                
+                if not pending:
+                    return
+                
+                for parsed in await pending.popleft():
+                    yield parsed
+        finally:
+            for future in pending:
+                future.cancel()
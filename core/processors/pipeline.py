@@ -0,0 +1,241 @@
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterator, Optional, Set
+import asyncio
+import itertools
+import time
+
+from ...core.analysis.concepts import MessageMentions
+from ...core.models.conversation import ConversationThread
+from ...core.processors.parallel import ParallelParser
+
+# Marks the end of a stage's output
+_DONE = object()
+
+# Batch keys; never reused, unlike id() of a batch that was freed
+_BATCH_KEYS = itertools.count()
+
+@dataclass
+class ImportBatch:
+    """A group of conversations moving through the import pipeline together"""
+    threads: List[ConversationThread]
+    message_filter: Dict[str, Set[str]] = field(default_factory=dict)  # thread id -> added or edited message ids
+    fingerprints: Dict[str, str] = field(default_factory=dict)  # thread id -> content hash
+    semantic_units: List[Dict] = field(default_factory=list)
+    units_ready: bool = False  # True when units were extracted during parsing
+    vectors: List[List[float]] = field(default_factory=list)
+    duplicates: List[Dict] = field(default_factory=list)  # Units left out as near duplicates of stored ones
+    mentions: Optional[List[MessageMentions]] = None  # Concept mentions, once extracted
+    topics: Dict[str, Optional[str]] = field(default_factory=dict)  # message id -> most relevant concept id
+    key: int = field(default_factory=lambda: next(_BATCH_KEYS))  # Unique key of pending near-duplicate state
+
+class StageStats:
+    """Throughput counters for a single pipeline stage"""
+    
+    __slots__ = ('items', 'batches', 'busy_seconds', 'max_batch_items', 'max_output_queue_depth',
+                 'started', 'finished')
+    
+    def __init__(self):
+        self.items = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.max_batch_items = 0
+        self.max_output_queue_depth = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+    
+    def add_batch(self, items: int, seconds: float):
+        self.items += items
+        self.batches += 1
+        self.busy_seconds += seconds
+        if items > self.max_batch_items:
+            self.max_batch_items = items
+    
+    def as_dict(self) -> Dict[str, Any]:
+        wall_seconds = None
+        if self.started is not None:
+            wall_seconds = round((self.finished or time.perf_counter()) - self.started, 3)
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wall_seconds": wall_seconds,
+            "items_per_second": round(self.items / self.busy_seconds, 1) if self.busy_seconds else None,
+            "mean_batch_items": round(self.items / self.batches, 1) if self.batches else None,
+            "max_batch_items": self.max_batch_items,
+            "max_output_queue_depth": self.max_output_queue_depth,
+            "running": self.started is not None and self.finished is None
+        }
+
+class ImportPipeline:
+    """
+    Staged producer/consumer import pipeline
+    
+    parse -> embed -> store, connected by bounded queues. Parsing runs on a
+    worker thread and the embed stage encodes while store workers wait on
+    Qdrant and Neo4j. When sinks fall behind, the queues fill up and the
+    upstream stages block, so memory stays bounded by the queue sizes.
+    """
+    
+    def __init__(
+        self,
+        processor,
+        workers: int = 4,
+        queue_size: Optional[int] = None,
+        parser: Optional[ParallelParser] = None
+    ):
+        """
+        Args:
+            processor: ConversationProcessor providing the stage operations
+            workers: Number of concurrent store workers
+            queue_size: Maximum batches waiting between stages (default: workers)
+            parser: Optional process-pool parser; when unset, parsing runs on
+                a single worker thread
+        """
+        self.processor = processor
+        self.parser = parser
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size or self.workers)
+        self.stages = {name: StageStats() for name in ("parse", "embed", "store")}
+        self.queues: Dict[str, asyncio.Queue] = {}
+    
+    def progress(self) -> Dict[str, Any]:
+        """Live view of the stages and queues, safe to call while the pipeline runs"""
+        return {
+            "stages": {name: stage.as_dict() for name, stage in self.stages.items()},
+            "queue_depths": {name: queue.qsize() for name, queue in self.queues.items()}
+        }
+    
+    async def run(self, conversations: Iterator[Dict[str, Any]], stats: Dict[str, Any]):
+        """Run all stages to completion, cancelling the rest if any stage fails"""
+        parsed = asyncio.Queue(maxsize=self.queue_size)
+        embedded = asyncio.Queue(maxsize=self.queue_size)
+        self.queues = {"parsed": parsed, "embedded": embedded}
+        self.stages["store"].started = time.perf_counter()
+        
+        tasks = [
+            asyncio.ensure_future(self._parse(conversations, parsed, stats)),
+            asyncio.ensure_future(self._embed(parsed, embedded)),
+        ]
+        tasks.extend(
+            asyncio.ensure_future(self._store(embedded, stats)) for _ in range(self.workers)
+        )
+        
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            
+            # Batches still queued will never be stored
+            for queue in self.queues.values():
+                while not queue.empty():
+                    batch = queue.get_nowait()
+                    if batch is not _DONE:
+                        self.processor._discard_batch(batch)
+            raise
+        finally:
+            self.stages["store"].finished = time.perf_counter()
+            stats["stages"] = {name: stage.as_dict() for name, stage in self.stages.items()}
+    
+    async def _put(self, queue: asyncio.Queue, item, stage: StageStats):
+        await queue.put(item)
+        stage.max_output_queue_depth = max(stage.max_output_queue_depth, queue.qsize())
+    
+    async def _parse(self, conversations: Iterator[Dict[str, Any]], output: asyncio.Queue, stats: Dict[str, Any]):
+        if self.parser is not None:
+            await self._parse_parallel(conversations, output, stats)
+            return
+        
+        stage = self.stages["parse"]
+        stage.started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            start = time.perf_counter()
+            batch = await loop.run_in_executor(None, self.processor._parse_batch, conversations, stats)
+            if batch is None:
+                stage.busy_seconds += time.perf_counter() - start
+                break
+            
+            stage.add_batch(len(batch.threads), time.perf_counter() - start)
+            await self._put(output, batch, stage)
+        
+        stage.finished = time.perf_counter()
+        await output.put(_DONE)
+    
+    async def _parse_parallel(self, conversations: Iterator[Dict[str, Any]], output: asyncio.Queue, stats: Dict[str, Any]):
+        stage = self.stages["parse"]
+        stage.started = time.perf_counter()
+        batch = self._new_parallel_batch()
+        start = time.perf_counter()
+        
+        async for thread, fingerprint, units, mentions in self.parser.parse(conversations):
+            if not self.processor._admit_thread(batch, thread, fingerprint, stats):
+                continue
+            
+            message_ids = batch.message_filter.get(thread.id)
+            if message_ids is not None:
+                units = [unit for unit in units if unit["metadata"]["message_id"] in message_ids]
+                if mentions is not None:
+                    mentions = [entry for entry in mentions if entry[0] in message_ids]
+            batch.semantic_units.extend(units)
+            if mentions is not None:
+                batch.mentions.extend(mentions)
+            
+            if len(batch.threads) >= self.processor.max_batch_size:
+                stage.add_batch(len(batch.threads), time.perf_counter() - start)
+                await self._put(output, batch, stage)
+                batch = self._new_parallel_batch()
+                start = time.perf_counter()
+        
+        if batch.threads:
+            stage.add_batch(len(batch.threads), time.perf_counter() - start)
+            await self._put(output, batch, stage)
+        else:
+            stage.busy_seconds += time.perf_counter() - start
+        
+        stage.finished = time.perf_counter()
+        await output.put(_DONE)
+    
+    def _new_parallel_batch(self) -> ImportBatch:
+        """Batch whose units, and concept mentions if enabled, arrive from the workers"""
+        return ImportBatch(
+            threads=[],
+            units_ready=True,
+            mentions=[] if self.parser.concepts is not None else None
+        )
+    
+    async def _embed(self, source: asyncio.Queue, output: asyncio.Queue):
+        stage = self.stages["embed"]
+        stage.started = time.perf_counter()
+        
+        while True:
+            batch = await source.get()
+            if batch is _DONE:
+                break
+            
+            start = time.perf_counter()
+            try:
+                await self.processor._embed_batch(batch)
+                stage.add_batch(len(batch.semantic_units), time.perf_counter() - start)
+                await self._put(output, batch, stage)
+            except BaseException:
+                self.processor._discard_batch(batch)
+                raise
+        
+        stage.finished = time.perf_counter()
+        for _ in range(self.workers):
+            await output.put(_DONE)
+    
+    async def _store(self, source: asyncio.Queue, stats: Dict[str, Any]):
+        stage = self.stages["store"]
+        
+        while True:
+            batch = await source.get()
+            if batch is _DONE:
+                break
+            
+            start = time.perf_counter()
+            await self.processor._store_batch(batch, stats)
+            stage.add_batch(len(batch.semantic_units), time.perf_counter() - start)
@@ -0,0 +1,148 @@
+from typing import Dict, Any, Optional
+from pathlib import Path
+import asyncio
+import os
+
+import yaml
+
+# Searched in order when no config path is given
+CONFIG_FILES = ("config.yml", "config.template.yml")
+CONFIG_ENV = "CHAT_ANALYSIS_CONFIG"
+
+# Project root: config files live next to requirements.txt
+_ROOT = Path(__file__).resolve().parents[2]
+
+def load_config(path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Load the YAML configuration
+    
+    Uses `path`, else $CHAT_ANALYSIS_CONFIG, else config.yml and then
+    config.template.yml in the project root. QDRANT_URL, NEO4J_URL,
+    NEO4J_USER and NEO4J_PASSWORD override the corresponding settings.
+    """
+    if path is None and os.environ.get(CONFIG_ENV):
+        path = Path(os.environ[CONFIG_ENV])
+    if path is None:
+        path = next((_ROOT / name for name in CONFIG_FILES if (_ROOT / name).exists()), None)
+    
+    config: Dict[str, Any] = {}
+    if path is not None:
+        with open(path, encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+    
+    overrides = {
+        ("qdrant", "url"): "QDRANT_URL",
+        ("neo4j", "uri"): "NEO4J_URL",
+        ("neo4j", "user"): "NEO4J_USER",
+        ("neo4j", "password"): "NEO4J_PASSWORD",
+    }
+    for (section, key), variable in overrides.items():
+        if os.environ.get(variable):
+            config.setdefault(section, {})[key] = os.environ[variable]
+    return config
+
+def create_neo4j_driver(neo4j_config: Dict[str, Any]):
+    """
+    Pooled async Neo4j driver for the `neo4j` config section
+    
+    The driver owns the connection pool; sessions are cheap views onto it and
+    are opened per unit of work, so concurrent callers share connections.
+    """
+    from neo4j import AsyncGraphDatabase
+    
+    uri = neo4j_config.get("uri") or f"bolt://{neo4j_config.get('host', 'localhost')}:{neo4j_config.get('port', 7687)}"
+    return AsyncGraphDatabase.driver(
+        uri,
+        auth=(neo4j_config.get("user", "neo4j"), neo4j_config.get("password", "")),
+        max_connection_pool_size=neo4j_config.get("max_connection_pool_size", 50),
+        connection_acquisition_timeout=neo4j_config.get("connection_acquisition_timeout", 60.0),
+        max_connection_lifetime=neo4j_config.get("max_connection_lifetime", 3600),
+        connection_timeout=neo4j_config.get("connection_timeout", 30.0),
+        keep_alive=True
+    )
+
+def create_qdrant_client(qdrant_config: Dict[str, Any]):
+    """
+    Async Qdrant client for the `qdrant` config section
+    
+    REST requests go through one keep-alive HTTP connection pool bounded by
+    `max_connections`; with `prefer_grpc` a single multiplexed gRPC channel
+    is used instead.
+    """
+    import httpx
+    from qdrant_client import AsyncQdrantClient
+    
+    connection = {"url": qdrant_config["url"]} if qdrant_config.get("url") else {
+        "host": qdrant_config.get("host", "localhost"),
+        "port": qdrant_config.get("port", 6333)
+    }
+    return AsyncQdrantClient(
+        **connection,
+        grpc_port=qdrant_config.get("grpc_port", 6334),
+        prefer_grpc=qdrant_config.get("prefer_grpc", False),
+        api_key=qdrant_config.get("api_key"),
+        timeout=qdrant_config.get("timeout", 30),
+        limits=httpx.Limits(
+            max_connections=qdrant_config.get("max_connections", 32),
+            max_keepalive_connections=qdrant_config.get("max_keepalive_connections", 16),
+            keepalive_expiry=qdrant_config.get("keepalive_expiry", 60.0)
+        )
+    )
+
+class StoreClients:
+    """
+    Long-lived Neo4j and Qdrant clients shared by every request of a server
+    
+    Call start() once before serving to open and verify connections, and
+    close() at shutdown.
+    """
+    
+    def __init__(self, neo4j_driver, qdrant_client, config: Optional[Dict[str, Any]] = None):
+        self.neo4j = neo4j_driver
+        self.qdrant = qdrant_client
+        self.config = config or {}
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'StoreClients':
+        return cls(
+            create_neo4j_driver(config.get("neo4j", {})),
+            create_qdrant_client(config.get("qdrant", {})),
+            config
+        )
+    
+    async def start(self):
+        """Verify both servers, pre-open pooled connections and create the collection if missing"""
+        neo4j_config = self.config.get("neo4j", {})
+        qdrant_config = self.config.get("qdrant", {})
+        await asyncio.gather(
+            self._warm_neo4j(neo4j_config.get("database"), neo4j_config.get("warm_connections", 4)),
+            self._ensure_collection(
+                qdrant_config.get("collection_name", "chat_embeddings"),
+                qdrant_config.get("vector_size", 384)
+            )
+        )
+    
+    async def _warm_neo4j(self, database: Optional[str], connections: int):
+        await self.neo4j.verify_connectivity()
+        
+        async def ping():
+            async with self.neo4j.session(database=database) as session:
+                result = await session.run("RETURN 1")
+                await result.consume()
+        
+        # Concurrent sessions each check out a connection, which stays pooled afterwards
+        await asyncio.gather(*(ping() for _ in range(max(0, connections))))
+    
+    async def _ensure_collection(self, name: str, vector_size: int):
+        from qdrant_client import models
+        
+        response = await self.qdrant.get_collections()
+        if any(collection.name == name for collection in response.collections):
+            return
+        await self.qdrant.create_collection(
+            collection_name=name,
+            vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE)
+        )
+    
+    async def close(self):
+        await asyncio.gather(self.neo4j.close(), self.qdrant.close(), return_exceptions=True)
@@ -0,0 +1,271 @@
+from typing import List, Dict, Optional, Set, Tuple
+import asyncio
+
+from ...core.models.conversation import ConversationThread
+
+# Rows per UNWIND statement; larger batches are split inside the same transaction
+DEFAULT_ROWS_PER_STATEMENT = 5000
+
+class BulkGraphWriter:
+    """Write conversation graphs to Neo4j with a few parameterized UNWIND/MERGE statements"""
+    
+    CONSTRAINTS = [
+        "CREATE CONSTRAINT conversation_id IF NOT EXISTS "
+        "FOR (c:Conversation) REQUIRE c.id IS UNIQUE",
+        "CREATE CONSTRAINT message_id IF NOT EXISTS "
+        "FOR (m:Message) REQUIRE m.id IS UNIQUE",
+        "CREATE CONSTRAINT concept_id IF NOT EXISTS "
+        "FOR (c:Concept) REQUIRE c.id IS UNIQUE",
+    ]
+    
+    MERGE_CONVERSATIONS = """
+        UNWIND $rows AS row
+        MERGE (c:Conversation {id: row.id})
+        SET c += row.props
+    """
+    
+    MERGE_MESSAGES = """
+        UNWIND $rows AS row
+        MERGE (m:Message {id: row.id})
+        SET m += row.props
+        WITH m, row
+        MATCH (c:Conversation {id: row.conversation_id})
+        MERGE (m)-[:BELONGS_TO]->(c)
+    """
+    
+    MERGE_REPLIES = """
+        UNWIND $rows AS row
+        MATCH (m:Message {id: row.child_id})
+        MATCH (p:Message {id: row.parent_id})
+        MERGE (m)-[:REPLIES_TO]->(p)
+    """
+    
+    # Representatives are stored before their duplicates: earlier in the same
+    # transaction, or by a batch that completed before the duplicate was found
+    MERGE_DUPLICATES = """
+        UNWIND $rows AS row
+        MATCH (m:Message {id: row.message_id})
+        MATCH (r:Message {id: row.representative_id})
+        MERGE (m)-[d:DUPLICATE_OF]->(r)
+        SET d.similarity = row.similarity
+    """
+    
+    MERGE_CONCEPTS = """
+        UNWIND $rows AS row
+        MERGE (c:Concept {id: row.id})
+        ON CREATE SET c.name = row.name, c.label = row.label
+    """
+    
+    MERGE_MENTIONS = """
+        UNWIND $rows AS row
+        MATCH (m:Message {id: row.message_id})
+        MATCH (c:Concept {id: row.concept_id})
+        MERGE (m)-[r:MENTIONS]->(c)
+        SET r.relevance = row.relevance, r.count = row.count
+    """
+    
+    # Replaces a message's outgoing SIMILAR_TO edges; rows without neighbors only delete
+    REPLACE_SIMILAR_TO = """
+        UNWIND $rows AS row
+        MATCH (m:Message {id: row.id})
+        OPTIONAL MATCH (m)-[old:SIMILAR_TO]->()
+        DELETE old
+        WITH DISTINCT m, row
+        UNWIND row.neighbors AS neighbor
+        MATCH (n:Message {id: neighbor.id})
+        MERGE (m)-[r:SIMILAR_TO]->(n)
+        SET r.score = neighbor.score, r.rank = neighbor.rank
+    """
+    
+    SET_TOPIC_SHIFTS = """
+        UNWIND $rows AS row
+        MATCH (m:Message {id: row.id})
+        SET m.parent_similarity = row.similarity, m.topic_shift = row.topic_shift
+    """
+    
+    def __init__(
+        self,
+        driver,
+        database: Optional[str] = None,
+        rows_per_statement: int = DEFAULT_ROWS_PER_STATEMENT
+    ):
+        """
+        Args:
+            driver: Async Neo4j driver (or a stand-in with the same session API)
+            database: Target database name, or None for the server default
+            rows_per_statement: Maximum rows bound to a single UNWIND statement
+        """
+        self.driver = driver
+        self.database = database
+        self.rows_per_statement = max(1, rows_per_statement)
+        self._constraints_ready = False
+    
+    async def ensure_constraints(self):
+        """Create the uniqueness constraints the MERGE statements rely on"""
+        if self._constraints_ready:
+            return
+        
+        async with self.driver.session(database=self.database) as session:
+            for statement in self.CONSTRAINTS:
+                result = await session.run(statement)
+                await result.consume()
+        
+        self._constraints_ready = True
+    
+    @staticmethod
+    def collect_rows(
+        threads: List[ConversationThread],
+        vector_ids: Dict[str, str],
+        message_filter: Optional[Dict[str, Set[str]]] = None
+    ) -> Dict[str, List[Dict]]:
+        """Gather node and edge rows for a batch of conversations"""
+        message_filter = message_filter or {}
+        conversations = []
+        messages = []
+        replies = []
+        
+        for thread in threads:
+            conversations.append({
+                "id": thread.id,
+                "props": {
+                    "title": thread.title,
+                    "create_time": thread.metadata.get("create_time"),
+                    "update_time": thread.metadata.get("update_time"),
+                    "current_node": thread.metadata.get("current_node")
+                }
+            })
+            
+            message_ids = message_filter.get(thread.id)
+            for msg in thread.traverse_messages():
+                if message_ids is not None and msg.id not in message_ids:
+                    continue
+                
+                messages.append({
+                    "id": msg.id,
+                    "conversation_id": thread.id,
+                    "props": {
+                        "content": msg.content,
+                        "role": msg.role,
+                        "vector_id": vector_ids.get(msg.id),
+                        "timestamp": msg.timestamp.isoformat()
+                    }
+                })
+                
+                if msg.parent_id:
+                    replies.append({"child_id": msg.id, "parent_id": msg.parent_id})
+        
+        return {"conversations": conversations, "messages": messages, "replies": replies}
+    
+    async def write(
+        self,
+        threads: List[ConversationThread],
+        vector_ids: Dict[str, str],
+        message_filter: Optional[Dict[str, Set[str]]] = None,
+        duplicates: Optional[List[Dict]] = None
+    ) -> Dict[str, int]:
+        """
+        Write all nodes and edges for a batch of conversations in one transaction
+        
+        Args:
+            threads: Conversation threads to write
+            vector_ids: message_id -> Qdrant point id
+            message_filter: Optional thread id -> subset of messages to write;
+                threads not listed are written in full
+            duplicates: Optional rows with message_id, representative_id and
+                similarity, written as DUPLICATE_OF edges
+        
+        Returns:
+            Dict with the number of nodes and relationships merged
+        """
+        # Row collection walks every message, so it runs on a worker thread
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(None, self.collect_rows, threads, vector_ids, message_filter)
+        rows["duplicates"] = self.duplicate_rows(duplicates or [])
+        
+        await self.ensure_constraints()
+        async with self.driver.session(database=self.database) as session:
+            await session.execute_write(self._write_rows, rows)
+        
+        return {
+            "nodes": len(rows["conversations"]) + len(rows["messages"]),
+            "relationships": len(rows["messages"]) + len(rows["replies"]) + len(rows["duplicates"])
+        }
+    
+    @staticmethod
+    def duplicate_rows(duplicates: List[Dict]) -> List[Dict]:
+        """One DUPLICATE_OF row per message pair, keeping the best chunk similarity"""
+        pairs: Dict[Tuple[str, str], float] = {}
+        for duplicate in duplicates:
+            pair = (duplicate["message_id"], duplicate["representative_id"])
+            if pair[0] != pair[1]:
+                pairs[pair] = max(pairs.get(pair, 0.0), duplicate["similarity"])
+        return [
+            {"message_id": message_id, "representative_id": representative_id, "similarity": similarity}
+            for (message_id, representative_id), similarity in pairs.items()
+        ]
+    
+    async def write_concepts(self, concepts: List[Dict], mentions: List[Dict]) -> Dict[str, int]:
+        """
+        Merge Concept nodes and the MENTIONS edges pointing at them in one transaction
+        
+        Args:
+            concepts: Rows with id, name and label
+            mentions: Rows with message_id, concept_id, relevance and count
+        
+        Returns:
+            Dict with the number of nodes and relationships merged
+        """
+        if not concepts:
+            return {"nodes": 0, "relationships": 0}
+        
+        await self.ensure_constraints()
+        async with self.driver.session(database=self.database) as session:
+            await session.execute_write(self._run_statements, [
+                (self.MERGE_CONCEPTS, concepts),
+                (self.MERGE_MENTIONS, mentions),
+            ])
+        
+        return {"nodes": len(concepts), "relationships": len(mentions)}
+    
+    async def write_similarities(self, rows: List[Dict]) -> int:
+        """
+        Replace the SIMILAR_TO edges of a block of messages in one transaction
+        
+        Args:
+            rows: Rows with a message id and its neighbors (id, score, rank)
+        
+        Returns:
+            Number of relationships merged
+        """
+        if not rows:
+            return 0
+        
+        await self.ensure_constraints()
+        async with self.driver.session(database=self.database) as session:
+            await session.execute_write(self._run_statements, [(self.REPLACE_SIMILAR_TO, rows)])
+        return sum(len(row["neighbors"]) for row in rows)
+    
+    async def write_topic_shifts(self, rows: List[Dict]):
+        """Set parent_similarity and topic_shift on messages (rows with id, similarity, topic_shift)"""
+        if not rows:
+            return
+        
+        await self.ensure_constraints()
+        async with self.driver.session(database=self.database) as session:
+            await session.execute_write(self._run_statements, [(self.SET_TOPIC_SHIFTS, rows)])
+    
+    async def _write_rows(self, tx, rows: Dict[str, List[Dict]]):
+        """Transaction function; safe to retry because every statement is a MERGE"""
+        await self._run_statements(tx, [
+            (self.MERGE_CONVERSATIONS, rows["conversations"]),
+            (self.MERGE_MESSAGES, rows["messages"]),
+            (self.MERGE_REPLIES, rows["replies"]),
+            (self.MERGE_DUPLICATES, rows.get("duplicates", [])),
+        ])
+    
+    async def _run_statements(self, tx, statements: List[Tuple[str, List[Dict]]]):
+        """Run each statement over its rows in slices of rows_per_statement"""
+        for statement, statement_rows in statements:
+            for start in range(0, len(statement_rows), self.rows_per_statement):
+                result = await tx.run(statement, rows=statement_rows[start:start + self.rows_per_statement])
+                await result.consume()
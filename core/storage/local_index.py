@@ -0,0 +1,330 @@
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+from pathlib import Path
+import json
+import sqlite3
+import threading
+
+import numpy as np
+
+# Rows scored per matrix product; bounds temporary memory during search
+SEARCH_BLOCK_ROWS = 65536
+
+# Keep IN (...) lists below SQLite's default bound-parameter limit
+_MAX_QUERY_PARAMS = 500
+
+def merge_top_k(best_scores: np.ndarray, best_rows: np.ndarray,
+                 block_scores: np.ndarray, block_rows: np.ndarray, k: int):
+    """Merge a (queries x block) score matrix into the running top-k for each query"""
+    scores = np.concatenate([best_scores, block_scores], axis=1)
+    rows = np.concatenate([best_rows, np.broadcast_to(block_rows, block_scores.shape)], axis=1)
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, keep, axis=1)
+        rows = np.take_along_axis(rows, keep, axis=1)
+    return scores, rows
+
+class LocalVectorIndex:
+    """
+    Local vector index backed by a memory-mapped float32 matrix
+    
+    Embeddings live in `vectors.f32` (one row per point) next to a SQLite table
+    mapping point ids to rows and payloads. Top-k queries are answered with
+    blocked NumPy matrix products; vectors are expected to be L2-normalized so
+    the dot product is the cosine similarity. An optional IVF partition
+    (spherical k-means centroids plus per-list row ids) restricts each query to
+    the `nprobe` closest lists for larger corpora. Rows added after the
+    partition was built are always scanned exhaustively.
+    """
+    
+    def __init__(self, path: Path, dim: int, initial_capacity: int = 1024):
+        self.path = Path(path)
+        self.dim = dim
+        self._lock = threading.RLock()
+        self.path.mkdir(parents=True, exist_ok=True)
+        
+        meta = self._load_meta()
+        if meta and meta["dim"] != dim:
+            raise ValueError(f"Index at {self.path} has dimension {meta['dim']}, expected {dim}")
+        self.count = meta.get("count", 0)
+        self._capacity = max(meta.get("capacity", 0), initial_capacity)
+        
+        self._db = sqlite3.connect(str(self.path / "points.sqlite3"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS points ("
+            "row INTEGER PRIMARY KEY, point_id TEXT UNIQUE NOT NULL, payload TEXT)"
+        )
+        self._matrix = None
+        self._open_matrix()
+        self._ivf = self._load_ivf()
+    
+    @classmethod
+    def from_config(cls, index_config: Dict[str, Any], storage_config: Optional[Dict[str, Any]],
+                    dim: int) -> 'LocalVectorIndex':
+        """Create an index from the `local_index` and `storage` config sections"""
+        storage_config = storage_config or {}
+        path = index_config.get("path") or Path(storage_config.get("data_dir", "data")) / "local_index"
+        return cls(path, dim)
+    
+    def _load_meta(self) -> Dict[str, Any]:
+        meta_path = self.path / "meta.json"
+        if not meta_path.is_file():
+            return {}
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _save_meta(self):
+        with open(self.path / "meta.json", 'w', encoding='utf-8') as f:
+            json.dump({"dim": self.dim, "count": self.count, "capacity": self._capacity}, f)
+    
+    def _open_matrix(self):
+        matrix_path = self.path / "vectors.f32"
+        size = self._capacity * self.dim * 4
+        with open(matrix_path, 'ab') as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._matrix = np.memmap(matrix_path, dtype=np.float32, mode='r+',
+                                 shape=(self._capacity, self.dim))
+    
+    def _grow(self, required: int):
+        capacity = self._capacity
+        while capacity < required:
+            capacity *= 2
+        if capacity != self._capacity:
+            self._matrix.flush()
+            self._matrix = None
+            self._capacity = capacity
+            self._open_matrix()
+    
+    @property
+    def vectors(self) -> np.ndarray:
+        """Read-only view of the stored rows"""
+        view = self._matrix[:self.count]
+        view.flags.writeable = False
+        return view
+    
+    def upsert(self, ids: Sequence[str], vectors: Sequence[Sequence[float]],
+               payloads: Optional[Sequence[Dict[str, Any]]] = None):
+        """Insert or overwrite points; existing ids keep their row"""
+        if not len(ids):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(ids), self.dim):
+            raise ValueError(f"Expected vectors of shape ({len(ids)}, {self.dim}), got {vectors.shape}")
+        payloads = payloads if payloads is not None else [None] * len(ids)
+        
+        with self._lock:
+            existing = self._rows_for_ids(ids)
+            rows = np.empty(len(ids), dtype=np.int64)
+            for position, point_id in enumerate(ids):
+                row = existing.get(point_id)
+                if row is None:
+                    row = existing[point_id] = self.count
+                    self.count += 1
+                rows[position] = row
+            
+            self._grow(self.count)
+            self._matrix[rows] = vectors
+            self._db.executemany(
+                "INSERT OR REPLACE INTO points (row, point_id, payload) VALUES (?, ?, ?)",
+                [(int(row), point_id, json.dumps(payload))
+                 for row, point_id, payload in zip(rows, ids, payloads)]
+            )
+            self._db.commit()
+            self._save_meta()
+    
+    def iter_payloads(self, batch_size: int = 10000) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+        """(row, payload) of every stored point in row order, read in batches"""
+        last_row = -1
+        while True:
+            with self._lock:
+                batch = self._db.execute(
+                    "SELECT row, payload FROM points WHERE row > ? ORDER BY row LIMIT ?", (last_row, batch_size)
+                ).fetchall()
+            if not batch:
+                return
+            for row, payload in batch:
+                yield row, json.loads(payload) if payload else None
+            last_row = batch[-1][0]
+    
+    def _rows_for_ids(self, ids: Sequence[str]) -> Dict[str, int]:
+        found = {}
+        unique_ids = list(dict.fromkeys(ids))
+        for start in range(0, len(unique_ids), _MAX_QUERY_PARAMS):
+            chunk = unique_ids[start:start + _MAX_QUERY_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            for point_id, row in self._db.execute(
+                f"SELECT point_id, row FROM points WHERE point_id IN ({placeholders})", chunk
+            ):
+                found[point_id] = row
+        return found
+    
+    def _rows_matching(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Rows whose payload has the given top-level key/value pairs"""
+        clauses = []
+        params = []
+        for key, value in filters.items():
+            clauses.append("json_extract(payload, ?) = ?")
+            params.extend([f"$.{key}", value])
+        rows = self._db.execute(
+            f"SELECT row FROM points WHERE {' AND '.join(clauses)} ORDER BY row", params
+        ).fetchall()
+        return np.fromiter((row for (row,) in rows), dtype=np.int64, count=len(rows))
+    
+    def search(self, queries: Sequence[Sequence[float]], limit: int = 10,
+               filters: Optional[Dict[str, Any]] = None,
+               nprobe: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Find the nearest stored points for a batch of query vectors
+        
+        Args:
+            queries: Query vectors, one per row
+            limit: Number of results per query
+            filters: Optional exact-match payload filters
+            nprobe: IVF lists to scan per query; exhaustive when unset or
+                when no partition has been built
+        
+        Returns:
+            For each query, hits as dicts with id, score and payload, best first
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        
+        with self._lock:
+            if self.count == 0 or limit <= 0:
+                return [[] for _ in range(len(queries))]
+            
+            allowed = self._rows_matching(filters) if filters else None
+            if nprobe and self._ivf is not None:
+                results = [self._search_ivf(query, limit, allowed, nprobe) for query in queries]
+            else:
+                results = list(zip(*self._search_rows(queries, limit, allowed)))
+            
+            return self._resolve(results)
+    
+    def _search_rows(self, queries: np.ndarray, limit: int, rows: Optional[np.ndarray] = None):
+        """Exhaustive top-k over all rows, or over the given candidate rows"""
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        total = self.count if rows is None else len(rows)
+        
+        for start in range(0, total, SEARCH_BLOCK_ROWS):
+            stop = min(start + SEARCH_BLOCK_ROWS, total)
+            if rows is None:
+                block_rows = np.arange(start, stop, dtype=np.int64)
+                block = self._matrix[start:stop]
+            else:
+                block_rows = rows[start:stop]
+                block = self._matrix[block_rows]
+            best_scores, best_rows = merge_top_k(
+                best_scores, best_rows, queries @ block.T, block_rows, limit
+            )
+        
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_rows, order, axis=1)
+    
+    def _search_ivf(self, query: np.ndarray, limit: int, allowed: Optional[np.ndarray], nprobe: int):
+        ivf = self._ivf
+        nprobe = min(nprobe, len(ivf["centroids"]))
+        lists = np.argpartition(-(ivf["centroids"] @ query), nprobe - 1)[:nprobe]
+        offsets = ivf["offsets"]
+        candidates = np.concatenate(
+            [ivf["order"][offsets[index]:offsets[index + 1]] for index in lists]
+            + [np.arange(ivf["rows_indexed"], self.count, dtype=np.int64)]
+        )
+        if allowed is not None:
+            candidates = np.intersect1d(candidates, allowed, assume_unique=True)
+        else:
+            candidates.sort()
+        scores, rows = self._search_rows(query[None, :], limit, candidates)
+        return scores[0], rows[0]
+    
+    def _resolve(self, results) -> List[List[Dict[str, Any]]]:
+        """Attach point ids and payloads to (scores, rows) results"""
+        wanted = sorted({int(row) for _, rows in results for row in rows})
+        records = {}
+        for start in range(0, len(wanted), _MAX_QUERY_PARAMS):
+            chunk = wanted[start:start + _MAX_QUERY_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            for row, point_id, payload in self._db.execute(
+                f"SELECT row, point_id, payload FROM points WHERE row IN ({placeholders})", chunk
+            ):
+                records[row] = (point_id, json.loads(payload) if payload else None)
+        
+        resolved = []
+        for scores, rows in results:
+            hits = []
+            for score, row in zip(scores, rows):
+                point_id, payload = records[int(row)]
+                hits.append({"id": point_id, "score": float(score), "payload": payload})
+            resolved.append(hits)
+        return resolved
+    
+    def build_ivf(self, n_lists: int, iterations: int = 10, sample_size: int = 100000, seed: int = 0):
+        """
+        Partition the stored rows into `n_lists` lists with spherical k-means
+        
+        Centroids are trained on a random sample; every row is then assigned
+        to its closest centroid in blocks.
+        """
+        with self._lock:
+            n_lists = min(n_lists, self.count)
+            if n_lists < 1:
+                return
+            
+            rng = np.random.default_rng(seed)
+            sample_rows = np.sort(rng.choice(self.count, size=min(sample_size, self.count), replace=False))
+            sample = np.asarray(self._matrix[sample_rows])
+            centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+            
+            for _ in range(iterations):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                for index in range(n_lists):
+                    members = sample[assignment == index]
+                    if len(members):
+                        centroid = members.sum(axis=0)
+                        norm = np.linalg.norm(centroid)
+                        if norm > 0:
+                            centroids[index] = centroid / norm
+            
+            assignment = np.empty(self.count, dtype=np.int64)
+            for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+                stop = min(start + SEARCH_BLOCK_ROWS, self.count)
+                assignment[start:stop] = np.argmax(self._matrix[start:stop] @ centroids.T, axis=1)
+            
+            order = np.argsort(assignment, kind='stable')
+            offsets = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+            self._ivf = {
+                "centroids": centroids,
+                "order": order,
+                "offsets": offsets,
+                "rows_indexed": self.count
+            }
+            np.savez(self.path / "ivf.npz", **self._ivf)
+    
+    def maybe_build_ivf(self, n_lists: int, min_rows: int = 50000, stale_fraction: float = 0.1):
+        """Build or rebuild the IVF partition once enough rows are unindexed"""
+        if n_lists <= 0 or self.count < min_rows:
+            return
+        indexed = self._ivf["rows_indexed"] if self._ivf is not None else 0
+        if self.count - indexed > stale_fraction * self.count:
+            self.build_ivf(n_lists)
+    
+    def _load_ivf(self) -> Optional[Dict[str, Any]]:
+        ivf_path = self.path / "ivf.npz"
+        if not ivf_path.is_file():
+            return None
+        with np.load(ivf_path) as data:
+            ivf = {key: data[key] for key in data.files}
+        ivf["rows_indexed"] = int(ivf["rows_indexed"])
+        return ivf
+    
+    def flush(self):
+        """Flush the vector matrix to disk"""
+        with self._lock:
+            self._matrix.flush()
+    
+    def close(self):
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+                self._matrix = None
+            self._db.close()
@@ -0,0 +1,112 @@
+from typing import Dict, Any, Optional, Set
+from pathlib import Path
+import hashlib
+import json
+import os
+
+from ...core.models.conversation import ConversationThread
+
+MANIFEST_VERSION = 2
+
+def conversation_fingerprint(thread: ConversationThread) -> str:
+    """Content hash over a thread's messages, independent of mapping order"""
+    digest = hashlib.sha1()
+    for message_id in sorted(thread.messages):
+        msg = thread.messages[message_id]
+        for value in (msg.id, msg.role, msg.parent_id or "", msg.content):
+            digest.update(value.encode('utf-8'))
+            digest.update(b'\0')
+    return digest.hexdigest()
+
+def message_fingerprints(thread: ConversationThread) -> Dict[str, str]:
+    """Short content hash per message, to find messages edited in place"""
+    fingerprints = {}
+    for message_id, msg in thread.messages.items():
+        digest = hashlib.sha1()
+        for value in (msg.role, msg.parent_id or "", msg.content):
+            digest.update(value.encode('utf-8'))
+            digest.update(b'\0')
+        fingerprints[message_id] = digest.hexdigest()[:16]
+    return fingerprints
+
+class ImportManifest:
+    """
+    Local record of what previous imports wrote
+    
+    For each conversation the manifest keeps the export's `update_time`, a
+    content hash and a hash per stored message, so re-imports can skip
+    unchanged conversations and only process added or edited messages.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+    
+    @property
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self.load()
+        return self._entries
+    
+    def load(self):
+        """Read the manifest from disk unless it is already loaded"""
+        if self._entries is None:
+            self._entries = self._load()
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path.is_file():
+            return {}
+        
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        
+        if data.get("version") != MANIFEST_VERSION:
+            return {}
+        return data.get("conversations", {})
+    
+    def is_unchanged(self, thread: ConversationThread, fingerprint: str) -> bool:
+        """Check whether a thread was already imported in exactly this state"""
+        entry = self.entries.get(thread.id)
+        return (entry is not None
+                and entry.get("update_time") == thread.metadata.get("update_time")
+                and entry.get("content_hash") == fingerprint)
+    
+    def changed_message_ids(self, thread: ConversationThread) -> Optional[Set[str]]:
+        """
+        Determine which messages of a thread were added or edited since the last import
+        
+        Messages keep their id when edited in place, so stored messages are
+        compared by content hash as well.
+        
+        Returns:
+            None if the thread was never imported, otherwise the ids of messages
+            not yet stored in their current state
+        """
+        entry = self.entries.get(thread.id)
+        if entry is None:
+            return None
+        
+        stored = entry.get("message_hashes", {})
+        return {
+            message_id for message_id, fingerprint in message_fingerprints(thread).items()
+            if stored.get(message_id) != fingerprint
+        }
+    
+    def record(self, thread: ConversationThread, fingerprint: str):
+        """Mark a thread as fully imported in its current state"""
+        self.entries[thread.id] = {
+            "update_time": thread.metadata.get("update_time"),
+            "content_hash": fingerprint,
+            "message_hashes": message_fingerprints(thread)
+        }
+    
+    def save(self):
+        """Atomically write the manifest to disk"""
+        if self._entries is None:
+            return
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "conversations": self._entries}, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,139 @@
+from typing import List, Dict, Any, Optional, Tuple
+
+class RecordingResult:
+    """Result stand-in returned by recording sessions and transactions"""
+    
+    def __init__(self, records: Optional[List[Dict[str, Any]]] = None):
+        self._records = records or []
+    
+    async def consume(self):
+        return None
+    
+    async def data(self) -> List[Dict[str, Any]]:
+        return list(self._records)
+    
+    def __aiter__(self):
+        return self._iterate()
+    
+    async def _iterate(self):
+        for record in self._records:
+            yield record
+
+class RecordingTransaction:
+    """Transaction stand-in that appends every statement to its driver's log"""
+    
+    def __init__(self, driver: 'RecordingNeo4jDriver', database: Optional[str]):
+        self._driver = driver
+        self._database = database
+    
+    async def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs) -> RecordingResult:
+        params = dict(parameters or {}, **kwargs)
+        self._driver.statements.append((query, params))
+        return RecordingResult()
+
+class RecordingSession(RecordingTransaction):
+    """Session stand-in supporting auto-commit runs and managed transactions"""
+    
+    async def __aenter__(self) -> 'RecordingSession':
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    async def execute_write(self, transaction_function, *args, **kwargs):
+        self._driver.transactions += 1
+        return await transaction_function(RecordingTransaction(self._driver, self._database), *args, **kwargs)
+    
+    async def execute_read(self, transaction_function, *args, **kwargs):
+        return await transaction_function(RecordingTransaction(self._driver, self._database), *args, **kwargs)
+    
+    async def close(self):
+        pass
+
+class RecordingNeo4jDriver:
+    """
+    Local stand-in for the async Neo4j driver
+    
+    Records every statement and its parameters instead of talking to a server,
+    so graph writes can be inspected in tests, benchmarks and dry runs.
+    """
+    
+    def __init__(self):
+        self.statements: List[Tuple[str, Dict[str, Any]]] = []
+        self.transactions = 0
+    
+    def session(self, database: Optional[str] = None, **kwargs) -> RecordingSession:
+        return RecordingSession(self, database)
+    
+    async def verify_connectivity(self):
+        pass
+    
+    async def close(self):
+        pass
+
+class RecordingPoint:
+    """A point returned by RecordingQdrantClient.scroll"""
+    
+    def __init__(self, point_id: str, vector: Optional[List[float]], payload: Optional[Dict[str, Any]]):
+        self.id = point_id
+        self.vector = vector
+        self.payload = payload
+
+class RecordingQdrantClient:
+    """
+    Local stand-in for the async Qdrant client
+    
+    Keeps upserted points in memory (vectors only when `keep_vectors` is set)
+    and records the size of each upsert and scroll, so vector reads and
+    writes can be inspected and measured without a server.
+    """
+    
+    def __init__(self, keep_vectors: bool = False):
+        self.keep_vectors = keep_vectors
+        self.upserts: List[Tuple[str, int]] = []  # (collection, points)
+        self.scrolls: List[Tuple[str, int]] = []  # (collection, points returned)
+        self.collections: Dict[str, Dict[str, Tuple[Optional[List[float]], Dict[str, Any]]]] = {}
+    
+    async def upsert(self, collection_name: str, points, **kwargs):
+        if hasattr(points, "ids"):
+            ids, vectors, payloads = points.ids, points.vectors, points.payloads or [None] * len(points.ids)
+        else:
+            ids = [point.id for point in points]
+            vectors = [point.vector for point in points]
+            payloads = [point.payload for point in points]
+        
+        collection = self.collections.setdefault(collection_name, {})
+        for point_id, vector, payload in zip(ids, vectors, payloads):
+            collection[str(point_id)] = (list(vector) if self.keep_vectors else None, payload)
+        self.upserts.append((collection_name, len(ids)))
+    
+    async def search(self, collection_name: str, query_vector, limit: int = 10, **kwargs) -> List[Any]:
+        return []
+    
+    async def scroll(
+        self,
+        collection_name: str,
+        limit: int = 10,
+        offset: Optional[str] = None,
+        with_payload: Any = True,
+        with_vectors: bool = False,
+        **kwargs
+    ) -> Tuple[List[RecordingPoint], Optional[str]]:
+        """Points in insertion order, `limit` at a time, resuming from the `offset` point id"""
+        point_ids = list(self.collections.get(collection_name, {}))
+        start = 0 if offset is None else point_ids.index(offset)
+        points = []
+        for point_id in point_ids[start:start + limit]:
+            vector, payload = self.collections[collection_name][point_id]
+            if isinstance(with_payload, list) and payload is not None:
+                payload = {key: payload[key] for key in with_payload if key in payload}
+            points.append(RecordingPoint(point_id, vector if with_vectors else None, payload if with_payload else None))
+        self.scrolls.append((collection_name, len(points)))
+        next_offset = point_ids[start + limit] if start + limit < len(point_ids) else None
+        return points, next_offset
+    
+    def count(self, collection_name: str) -> int:
+        return len(self.collections.get(collection_name, {}))
+    
+    async def close(self):
+        pass
@@ -0,0 +1,440 @@
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+from pathlib import Path
+import json
+import math
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from ...core.models.conversation import ConversationThread, Message
+
+SNAPSHOT_VERSION = 2
+
+# (threads, their semantic units, embeddings aligned with the units, rows of
+# the units left out as near duplicates)
+SnapshotBatch = Tuple[List[ConversationThread], List[Dict], np.ndarray, List[Dict]]
+
+def _mapped(path: Path, dtype, count: int, width: Optional[int] = None) -> np.ndarray:
+    """Read-only memory map of the first `count` rows of a raw column file"""
+    shape = (count,) if width is None else (count, width)
+    if count == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+class _Column:
+    """Append-only fixed-width column stored as raw little-endian values"""
+    
+    def __init__(self, path: Path, dtype, width: Optional[int] = None):
+        self.path = path
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        self.width = width
+        self._file = None
+    
+    @property
+    def row_bytes(self) -> int:
+        return self.dtype.itemsize * (self.width or 1)
+    
+    def open(self, count: int):
+        """Open for appending after the first `count` rows, dropping anything later"""
+        self._file = open(self.path, 'ab')
+        self._file.truncate(count * self.row_bytes)
+    
+    def append(self, values):
+        self._file.write(np.ascontiguousarray(values, dtype=self.dtype).tobytes())
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def load(self, count: int) -> np.ndarray:
+        return _mapped(self.path, self.dtype, count, self.width)
+
+class _Strings:
+    """Decoded view over a string column; None entries have length -1"""
+    
+    def __init__(self, lengths: np.ndarray, data: np.ndarray):
+        self.lengths = lengths
+        self.ends = np.cumsum(np.maximum(lengths, 0))
+        self.data = data
+    
+    def __len__(self) -> int:
+        return len(self.lengths)
+    
+    def __getitem__(self, row: int) -> Optional[str]:
+        length = self.lengths[row]
+        if length < 0:
+            return None
+        end = self.ends[row]
+        return self.data[end - length:end].tobytes().decode('utf-8')
+    
+    def fixed_width(self, rows: Optional[np.ndarray] = None, block_rows: int = 65536) -> np.ndarray:
+        """
+        UTF-8 values of some rows (default: all) as one fixed-width bytes array
+        
+        None becomes b"". Values are gathered from the data file in blocks, so
+        no Python string is created per row.
+        """
+        rows = np.arange(len(self), dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+        lengths = np.maximum(self.lengths[rows], 0)
+        width = max(1, int(lengths.max())) if len(rows) else 1
+        values = np.zeros((len(rows), width), dtype=np.uint8)
+        columns = np.arange(width)
+        for start in range(0, len(rows), block_rows):
+            stop = min(start + block_rows, len(rows))
+            block_lengths = lengths[start:stop, None]
+            present = columns < block_lengths
+            offsets = self.ends[rows[start:stop], None] - block_lengths + columns
+            values[start:stop][present] = self.data[offsets[present]]
+        return values.view(f"S{width}").ravel()
+
+class _StringColumn:
+    """Append-only UTF-8 string column: a length per row plus one data file"""
+    
+    def __init__(self, path: Path):
+        self.lengths = _Column(path.with_name(path.name + ".len"), np.int64)
+        self.data_path = path.with_name(path.name + ".utf8")
+        self._data = None
+    
+    def open(self, count: int):
+        self.lengths.open(count)
+        data_size = int(np.maximum(self.lengths.load(count), 0).sum())
+        self._data = open(self.data_path, 'ab')
+        self._data.truncate(data_size)
+    
+    def append(self, values: Sequence[Optional[str]]):
+        encoded = [None if value is None else value.encode('utf-8') for value in values]
+        self.lengths.append([-1 if value is None else len(value) for value in encoded])
+        self._data.write(b"".join(value for value in encoded if value))
+    
+    def close(self):
+        self.lengths.close()
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+    
+    def load(self, count: int) -> _Strings:
+        lengths = np.asarray(self.lengths.load(count))
+        return _Strings(lengths, _mapped(self.data_path, np.uint8, int(np.maximum(lengths, 0).sum())))
+
+class ImportSnapshot:
+    """
+    On-disk intermediate copy of parsed conversations and their embeddings
+    
+    Conversations, messages, semantic units and near-duplicate units are
+    column-oriented tables, one raw file per column (strings as lengths plus
+    UTF-8 data), and the embeddings are a float32 matrix aligned with the unit
+    rows. Every file is append-only and read back through memory maps.
+    `meta.json` holds the committed row counts, so rows written by an
+    interrupted import are ignored and overwritten by the next one.
+    
+    When a conversation appears again, its latest rows win. Units and
+    duplicates point at the conversation row they were stored with, so a
+    message's units come from the last batch that stored it.
+    """
+    
+    def __init__(self, path: Path, dim: int):
+        self.path = Path(path)
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._open = False
+        
+        self.conversations = {
+            "id": _StringColumn(self.path / "conversations.id"),
+            "title": _StringColumn(self.path / "conversations.title"),
+            "root_id": _StringColumn(self.path / "conversations.root_id"),
+            "current_node": _StringColumn(self.path / "conversations.current_node"),
+            "create_time": _Column(self.path / "conversations.create_time.f8", np.float64),
+            "update_time": _Column(self.path / "conversations.update_time.f8", np.float64),
+            "messages": _Column(self.path / "conversations.messages.i8", np.int64, width=2)
+        }
+        self.messages = {
+            "id": _StringColumn(self.path / "messages.id"),
+            "parent_id": _StringColumn(self.path / "messages.parent_id"),
+            "role": _StringColumn(self.path / "messages.role"),
+            "content": _StringColumn(self.path / "messages.content"),
+            "create_time": _Column(self.path / "messages.create_time.f8", np.float64)
+        }
+        self.units = {
+            "conversation_row": _Column(self.path / "units.conversation_row.i8", np.int64),
+            "conversation_id": _StringColumn(self.path / "units.conversation_id"),
+            "message_id": _StringColumn(self.path / "units.message_id"),
+            "chunk": _Column(self.path / "units.chunk.i8", np.int64, width=3),  # index, start, end
+            "is_chunk": _Column(self.path / "units.is_chunk.u1", np.uint8)
+        }
+        self.duplicates = {
+            "conversation_row": _Column(self.path / "duplicates.conversation_row.i8", np.int64),
+            "message_id": _StringColumn(self.path / "duplicates.message_id"),
+            "representative_id": _StringColumn(self.path / "duplicates.representative_id"),
+            "point_id": _StringColumn(self.path / "duplicates.point_id"),
+            "chunk_index": _Column(self.path / "duplicates.chunk_index.i8", np.int64),
+            "similarity": _Column(self.path / "duplicates.similarity.f8", np.float64)
+        }
+        self.embeddings = _Column(self.path / "embeddings.f4", np.float32, width=dim)
+        
+        self.counts = self._load_meta()
+    
+    @classmethod
+    def from_config(cls, storage_config: Optional[Dict[str, Any]], dim: int) -> 'ImportSnapshot':
+        """Create a snapshot under `storage.data_dir`"""
+        storage_config = storage_config or {}
+        return cls(Path(storage_config.get("data_dir", "data")) / "snapshot", dim)
+    
+    def _tables(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return [
+            ("conversations", self.conversations),
+            ("messages", self.messages),
+            ("units", self.units),
+            ("duplicates", self.duplicates)
+        ]
+    
+    def _load_meta(self) -> Dict[str, int]:
+        empty = {"conversations": 0, "messages": 0, "units": 0, "duplicates": 0}
+        meta_path = self.path / "meta.json"
+        if not meta_path.is_file():
+            return empty
+        
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("version") != SNAPSHOT_VERSION:
+            return empty
+        if meta["dim"] != self.dim:
+            raise ValueError(f"Snapshot at {self.path} has dimension {meta['dim']}, expected {self.dim}")
+        return meta["counts"]
+    
+    def _save_meta(self):
+        tmp_path = self.path / "meta.json.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": SNAPSHOT_VERSION, "dim": self.dim, "counts": self.counts}, f)
+        os.replace(tmp_path, self.path / "meta.json")
+    
+    def __len__(self) -> int:
+        return self.counts["conversations"]
+    
+    def begin(self, reset: bool = False):
+        """
+        Open the snapshot for appending
+        
+        Args:
+            reset: Discard the existing snapshot first, as a full import does
+        """
+        with self._lock:
+            if reset and self.path.exists():
+                shutil.rmtree(self.path)
+                self.counts = {"conversations": 0, "messages": 0, "units": 0, "duplicates": 0}
+            self.path.mkdir(parents=True, exist_ok=True)
+            
+            for table, columns in self._tables():
+                for column in columns.values():
+                    column.open(self.counts[table])
+            self.embeddings.open(self.counts["units"])
+            self._open = True
+    
+    def append(self, threads: Sequence[ConversationThread], semantic_units: Sequence[Dict],
+               vectors: Sequence[Sequence[float]], duplicates: Sequence[Dict] = ()):
+        """
+        Append a stored batch; its threads are written in full
+        
+        Args:
+            threads: Threads of the batch
+            semantic_units: Units that were embedded
+            vectors: Embeddings aligned with `semantic_units`
+            duplicates: Rows of the units left out as near duplicates, with
+                conversation_id, message_id, representative_id, point_id,
+                chunk_index and similarity
+        """
+        conversations = {name: [] for name in self.conversations}
+        messages = {name: [] for name in self.messages}
+        
+        with self._lock:
+            if not self._open:
+                raise RuntimeError("Snapshot is not open; call begin() first")
+            
+            conversation_rows = {
+                thread.id: self.counts["conversations"] + index for index, thread in enumerate(threads)
+            }
+            row = self.counts["messages"]
+            for thread in threads:
+                thread_messages = thread.traverse_messages()
+                conversations["id"].append(thread.id)
+                conversations["title"].append(thread.title)
+                conversations["root_id"].append(thread.root_id)
+                conversations["current_node"].append(thread.metadata.get("current_node"))
+                conversations["create_time"].append(_float(thread.metadata.get("create_time")))
+                conversations["update_time"].append(_float(thread.metadata.get("update_time")))
+                conversations["messages"].append((row, row + len(thread_messages)))
+                row += len(thread_messages)
+                
+                for msg in thread_messages:
+                    messages["id"].append(msg.id)
+                    messages["parent_id"].append(msg.parent_id)
+                    messages["role"].append(msg.role)
+                    messages["content"].append(msg.content)
+                    messages["create_time"].append(_float(msg.create_time))
+            
+            metadata = [unit["metadata"] for unit in semantic_units]
+            units = {
+                "conversation_row": [conversation_rows[meta["conversation_id"]] for meta in metadata],
+                "conversation_id": [meta["conversation_id"] for meta in metadata],
+                "message_id": [meta["message_id"] for meta in metadata],
+                "chunk": [
+                    (meta["chunk"]["index"], meta["chunk"]["start"], meta["chunk"]["end"]) for meta in metadata
+                ],
+                "is_chunk": [meta["type"] == "chunk" for meta in metadata]
+            }
+            duplicate_columns = {
+                "conversation_row": [conversation_rows[duplicate["conversation_id"]] for duplicate in duplicates],
+                **{
+                    name: [duplicate[name] for duplicate in duplicates]
+                    for name in ("message_id", "representative_id", "point_id", "chunk_index", "similarity")
+                }
+            }
+            
+            tables = (conversations, messages, units, duplicate_columns)
+            for (table, columns), values in zip(self._tables(), tables):
+                for name, column in columns.items():
+                    column.append(values[name])
+            self.embeddings.append(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+            
+            self.counts["conversations"] += len(threads)
+            self.counts["messages"] = row
+            self.counts["units"] += len(metadata)
+            self.counts["duplicates"] += len(duplicates)
+    
+    def commit(self):
+        """Close the files and record the rows written so far as committed"""
+        with self._lock:
+            if not self._open:
+                return
+            for _, columns in self._tables():
+                for column in columns.values():
+                    column.close()
+            self.embeddings.close()
+            self._save_meta()
+            self._open = False
+    
+    def iter_batches(self, batch_size: int = 100, context_turns: int = 0) -> Iterator[SnapshotBatch]:
+        """
+        Rebuild threads, semantic units and embeddings from the committed rows
+        
+        Args:
+            batch_size: Conversations per yielded batch
+            context_turns: Preceding messages whose ends form each unit's context text,
+                as in ConversationThread.extract_semantic_units
+        
+        Yields:
+            (threads, units, embeddings, duplicate rows) where embeddings[i]
+            belongs to units[i]; the embeddings are a copy gathered from the
+            memory-mapped matrix
+        """
+        conversations = {name: column.load(self.counts["conversations"]) for name, column in self.conversations.items()}
+        messages = {name: column.load(self.counts["messages"]) for name, column in self.messages.items()}
+        units = {name: column.load(self.counts["units"]) for name, column in self.units.items()}
+        duplicates = {name: column.load(self.counts["duplicates"]) for name, column in self.duplicates.items()}
+        embeddings = self.embeddings.load(self.counts["units"])
+        
+        # Later rows supersede earlier ones for the same conversation
+        conversation_ids = [conversations["id"][row] for row in range(len(conversations["id"]))]
+        latest = {conversation_id: row for row, conversation_id in enumerate(conversation_ids)}
+        
+        # A message's units and duplicate rows all come from the last batch that stored it
+        unit_keys = [
+            (conversation_ids[conversation_row], units["message_id"][row], conversation_row)
+            for row, conversation_row in enumerate(units["conversation_row"].tolist())
+        ]
+        duplicate_keys = [
+            (conversation_ids[conversation_row], duplicates["message_id"][row], conversation_row)
+            for row, conversation_row in enumerate(duplicates["conversation_row"].tolist())
+        ]
+        stored_with: Dict[Tuple[str, str], int] = {}
+        for conversation_id, message_id, conversation_row in unit_keys + duplicate_keys:
+            key = (conversation_id, message_id)
+            stored_with[key] = max(stored_with.get(key, -1), conversation_row)
+        
+        unit_rows: Dict[str, List[int]] = {}
+        for row, (conversation_id, message_id, conversation_row) in enumerate(unit_keys):
+            if stored_with[(conversation_id, message_id)] == conversation_row:
+                unit_rows.setdefault(conversation_id, []).append(row)
+        duplicate_rows: Dict[str, List[int]] = {}
+        for row, (conversation_id, message_id, conversation_row) in enumerate(duplicate_keys):
+            if stored_with[(conversation_id, message_id)] == conversation_row:
+                duplicate_rows.setdefault(conversation_id, []).append(row)
+        
+        rows = list(latest.values())
+        for start in range(0, len(rows), batch_size):
+            threads = []
+            batch_units = []
+            batch_rows = []
+            batch_duplicates = []
+            for row in rows[start:start + batch_size]:
+                thread = self._thread(conversations, messages, row)
+                threads.append(thread)
+                
+                for unit_row in unit_rows.get(thread.id, []):
+                    msg = thread.messages.get(units["message_id"][unit_row])
+                    if msg is None:
+                        continue
+                    index, chunk_start, chunk_end = (int(value) for value in units["chunk"][unit_row])
+                    unit_type = "chunk" if units["is_chunk"][unit_row] else "message"
+                    batch_units.append(
+                        thread.make_unit(msg, unit_type, index, chunk_start, chunk_end, context_turns)
+                    )
+                    batch_rows.append(unit_row)
+                
+                for duplicate_row in duplicate_rows.get(thread.id, []):
+                    message_id = duplicates["message_id"][duplicate_row]
+                    if message_id not in thread.messages:
+                        continue
+                    batch_duplicates.append({
+                        "conversation_id": thread.id,
+                        "message_id": message_id,
+                        "representative_id": duplicates["representative_id"][duplicate_row],
+                        "point_id": duplicates["point_id"][duplicate_row],
+                        "chunk_index": int(duplicates["chunk_index"][duplicate_row]),
+                        "similarity": float(duplicates["similarity"][duplicate_row])
+                    })
+            
+            yield threads, batch_units, np.asarray(embeddings[batch_rows]).reshape(-1, self.dim), batch_duplicates
+    
+    @staticmethod
+    def _thread(conversations: Dict[str, Any], messages: Dict[str, Any], row: int) -> ConversationThread:
+        first, last = (int(value) for value in conversations["messages"][row])
+        
+        children: Dict[str, List[str]] = {}
+        for message_row in range(first, last):
+            parent_id = messages["parent_id"][message_row]
+            if parent_id is not None:
+                children.setdefault(parent_id, []).append(messages["id"][message_row])
+        
+        thread_messages = {}
+        for message_row in range(first, last):
+            message_id = messages["id"][message_row]
+            thread_messages[message_id] = Message(
+                id=message_id,
+                content=messages["content"][message_row],
+                role=messages["role"][message_row],
+                parent_id=messages["parent_id"][message_row],
+                children_ids=children.get(message_id, ()),
+                create_time=_optional(messages["create_time"][message_row])
+            )
+        
+        return ConversationThread(
+            id=conversations["id"][row],
+            title=conversations["title"][row],
+            messages=thread_messages,
+            root_id=conversations["root_id"][row],
+            metadata={
+                "create_time": _optional(conversations["create_time"][row]),
+                "update_time": _optional(conversations["update_time"][row]),
+                "current_node": conversations["current_node"][row]
+            }
+        )
+
+def _float(value) -> float:
+    return math.nan if value is None else float(value)
+
+def _optional(value) -> Optional[float]:
+    value = float(value)
+    return None if math.isnan(value) else value
@@ -1,9 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Generator, Any
+from typing import List, Dict, Generator, Any, Optional
 from pathlib import Path
-import json
 from zipfile import ZipFile
-import tempfile
+import copy
+import io
+import json
+
+from .streaming import iter_json_array
 
 class ChatImporter(ABC):
     """Base class for chat data importers"""
@@ -46,10 +49,33 @@ class ChatImporter(ABC):
             Dict: Global metadata about the export
         """
         pass
+    
+    def progress(self) -> Optional[Dict[str, int]]:
+        """
+        How far the current or last extract_conversations pass has read
+        
+        Returns:
+            Dict with bytes_read, bytes_total and conversations_read, or None
+            if the importer does not track it
+        """
+        return None
 
 class OpenAIExportImporter(ChatImporter):
     """Importer for native OpenAI ChatGPT exports"""
     
+    CONVERSATIONS_MEMBER = 'conversations.json'
+    
+    def __init__(self, metadata_cache_dir: Optional[Path] = None):
+        """
+        Args:
+            metadata_cache_dir: Optional directory for metadata sidecar files.
+                When unset, metadata is only cached in memory and nothing is
+                written to disk.
+        """
+        self.metadata_cache_dir = Path(metadata_cache_dir) if metadata_cache_dir else None
+        self._metadata_cache: Dict[str, Dict[str, Any]] = {}
+        self._progress: Optional[Dict[str, int]] = None
+    
     def validate_source(self, source_path: Path) -> bool:
         """Check if the file is a valid OpenAI export zip"""
         if not source_path.is_file() or source_path.suffix != '.zip':
@@ -57,42 +83,89 @@ class OpenAIExportImporter(ChatImporter):
             
         try:
             with ZipFile(source_path, 'r') as zip_ref:
-                return 'conversations.json' in zip_ref.namelist()
+                return self.CONVERSATIONS_MEMBER in zip_ref.namelist()
         except:
             return False
     
     def extract_conversations(self, source_path: Path) -> Generator[Dict[str, Any], None, None]:
-        """Extract conversations from OpenAI export zip"""
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            # Extract zip contents
-            with ZipFile(source_path, 'r') as zip_ref:
-                zip_ref.extractall(tmp_dir)
-            
-            # Read conversations.json
-            conversations_path = Path(tmp_dir) / 'conversations.json'
-            with open(conversations_path) as f:
-                conversations = json.load(f)
+        """
+        Extract conversations from OpenAI export zip
+        
+        conversations.json is decoded straight from the zip member, so images
+        and attachments in the archive are never read. Metadata is gathered
+        during the same pass and cached once the pass completes, which makes a
+        subsequent extract_metadata call free.
+        """
+        with ZipFile(source_path, 'r') as zip_ref:
+            cache_key = self._cache_key(zip_ref)
+            metadata = self._new_metadata()
+            progress = self._progress = {
+                'bytes_read': 0,
+                'bytes_total': zip_ref.getinfo(self.CONVERSATIONS_MEMBER).file_size,
+                'conversations_read': 0
+            }
             
-            # Yield each conversation
-            for conversation in conversations:
-                if 'mapping' not in conversation:
-                    continue
-                    
-                # Clean and validate conversation data
-                cleaned = {
-                    'mapping': conversation['mapping'],
-                    'title': conversation.get('title', 'Untitled'),
-                    'create_time': conversation.get('create_time'),
-                    'update_time': conversation.get('update_time'),
-                    'root': conversation.get('root'),
-                    'moderation_results': conversation.get('moderation_results', [])
-                }
-                
-                yield cleaned
+            with zip_ref.open(self.CONVERSATIONS_MEMBER) as raw:
+                with io.TextIOWrapper(raw, encoding='utf-8') as f:
+                    for conversation in iter_json_array(f):
+                        self._update_metadata(metadata, conversation)
+                        # Decompressed position; runs ahead of parsing by at most the read buffers
+                        progress['bytes_read'] = raw.tell()
+                        progress['conversations_read'] += 1
+                        
+                        if 'mapping' not in conversation:
+                            continue
+                            
+                        # Clean and validate conversation data
+                        cleaned = {
+                            'id': conversation.get('id') or conversation.get('conversation_id'),
+                            'mapping': conversation['mapping'],
+                            'title': conversation.get('title', 'Untitled'),
+                            'create_time': conversation.get('create_time'),
+                            'update_time': conversation.get('update_time'),
+                            'root': conversation.get('root'),
+                            'current_node': conversation.get('current_node'),
+                            'moderation_results': conversation.get('moderation_results', [])
+                        }
+                        
+                        yield cleaned
+        
+        self._store_metadata(cache_key, metadata)
+    
+    def progress(self) -> Optional[Dict[str, int]]:
+        """Bytes of conversations.json and conversations read by the current or last pass"""
+        return dict(self._progress) if self._progress is not None else None
     
     def extract_metadata(self, source_path: Path) -> Dict[str, Any]:
-        """Extract global metadata from the export"""
-        metadata = {
+        """
+        Extract global metadata from the export
+        
+        Returns the metadata cached by a completed extract_conversations pass
+        (or a sidecar file) when available; otherwise streams the member once.
+        """
+        with ZipFile(source_path, 'r') as zip_ref:
+            cache_key = self._cache_key(zip_ref)
+            cached = self._load_metadata(cache_key)
+            if cached is not None:
+                return cached
+            
+            metadata = self._new_metadata()
+            with zip_ref.open(self.CONVERSATIONS_MEMBER) as raw:
+                with io.TextIOWrapper(raw, encoding='utf-8') as f:
+                    for conversation in iter_json_array(f):
+                        self._update_metadata(metadata, conversation)
+        
+        self._store_metadata(cache_key, metadata)
+        return copy.deepcopy(metadata)
+    
+    def _cache_key(self, zip_ref: ZipFile) -> str:
+        """Content key for conversations.json, read from the zip central directory"""
+        info = zip_ref.getinfo(self.CONVERSATIONS_MEMBER)
+        return f"{info.CRC:08x}-{info.file_size}"
+    
+    @staticmethod
+    def _new_metadata() -> Dict[str, Any]:
+        return {
             'source_type': 'openai_export',
             'import_time': None,
             'conversation_count': 0,
@@ -101,26 +174,42 @@ class OpenAIExportImporter(ChatImporter):
                 'end': None
             }
         }
+    
+    @staticmethod
+    def _update_metadata(metadata: Dict[str, Any], conversation: Dict[str, Any]):
+        """Fold a single raw conversation into the running metadata"""
+        metadata['conversation_count'] += 1
         
-        # Process zip to gather metadata
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            with ZipFile(source_path, 'r') as zip_ref:
-                zip_ref.extractall(tmp_dir)
-                
-            conversations_path = Path(tmp_dir) / 'conversations.json'
-            with open(conversations_path) as f:
-                conversations = json.load(f)
-            
-            metadata['conversation_count'] = len(conversations)
-            
-            # Find date range
-            create_times = []
-            for conv in conversations:
-                if conv.get('create_time'):
-                    create_times.append(conv['create_time'])
-                    
-            if create_times:
-                metadata['date_range']['start'] = min(create_times)
-                metadata['date_range']['end'] = max(create_times)
+        create_time = conversation.get('create_time')
+        if create_time:
+            date_range = metadata['date_range']
+            if date_range['start'] is None or create_time < date_range['start']:
+                date_range['start'] = create_time
+            if date_range['end'] is None or create_time > date_range['end']:
+                date_range['end'] = create_time
+    
+    def _sidecar_path(self, cache_key: str) -> Optional[Path]:
+        if self.metadata_cache_dir is None:
+            return None
+        return self.metadata_cache_dir / f"openai_export_{cache_key}.json"
+    
+    def _load_metadata(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        if cache_key not in self._metadata_cache:
+            sidecar = self._sidecar_path(cache_key)
+            if sidecar is None or not sidecar.is_file():
+                return None
+            try:
+                with open(sidecar, encoding='utf-8') as f:
+                    self._metadata_cache[cache_key] = json.load(f)
+            except (OSError, ValueError):
+                return None
+        return copy.deepcopy(self._metadata_cache[cache_key])
+    
+    def _store_metadata(self, cache_key: str, metadata: Dict[str, Any]):
+        self._metadata_cache[cache_key] = metadata
         
-        return metadata
\ No newline at end of file
+        sidecar = self._sidecar_path(cache_key)
+        if sidecar is not None:
+            sidecar.parent.mkdir(parents=True, exist_ok=True)
+            with open(sidecar, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f)
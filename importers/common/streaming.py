@@ -0,0 +1,97 @@
+import json
+import re
+from typing import Any, Iterator, TextIO
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+def iter_json_array(fp: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Incrementally parse a top-level JSON array, yielding one element at a time
+
+    Only the element currently being decoded is held in memory, so peak memory
+    depends on the largest element rather than on the size of the document.
+    When an element does not fit in the buffered text, the read size doubles
+    until it does, which keeps re-decoding of partial elements amortized linear.
+
+    Args:
+        fp: Text stream positioned at the start of the document
+        chunk_size: Number of characters to read per refill
+
+    Yields:
+        Each decoded element of the top-level array, in order
+
+    Raises:
+        ValueError: If the document is not a well-formed JSON array
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    read_size = chunk_size
+
+    def refill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        more = fp.read(read_size)
+        if not more:
+            eof = True
+            return False
+        buf = buf[pos:] + more
+        pos = 0
+        return True
+
+    # Locate the opening bracket
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos < len(buf):
+            break
+        if not refill():
+            raise ValueError("Expected a JSON array, got an empty document")
+    if buf[pos] != '[':
+        raise ValueError(f"Expected a top-level JSON array, got {buf[pos]!r}")
+    pos += 1
+
+    first = True
+    expect_value = True
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos >= len(buf):
+            if not refill():
+                raise ValueError("Unexpected end of document inside JSON array")
+            continue
+
+        char = buf[pos]
+        if char == ']' and (first or not expect_value):
+            return
+        if not expect_value:
+            if char != ',':
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+            pos += 1
+            expect_value = True
+            continue
+
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Element straddles the buffer boundary: read more and retry
+            if not refill():
+                raise
+            read_size *= 2
+            continue
+
+        # A scalar cut by the buffer boundary still decodes ("12" of "12.5e3"),
+        # so a value only counts once the next character ends it
+        after = _WHITESPACE.match(buf, end).end()
+        if (after >= len(buf) or buf[after] not in ',]') and refill():
+            read_size *= 2
+            continue
+
+        read_size = chunk_size
+        pos = end
+        first = False
+        expect_value = False
+        yield value
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import asyncio
 import json
+import sys
 from pathlib import Path
 
 from modelcontextprotocol import Server, StdioServerTransport
@@ -12,18 +13,20 @@ from modelcontextprotocol.types import (
     McpError,
 )
 
-from ...core.processors.conversation_processor import ConversationProcessor
-from ...core.models.conversation import ConversationThread
+from ...core.processors.jobs import ImportJobManager
+from ...core.storage.clients import load_config
 from ...importers.common.base import OpenAIExportImporter
 
 class ChatAnalysisServer:
     """MCP server for chat analysis operations"""
     
-    def __init__(self):
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config if config is not None else load_config()
+        server_config = self.config.get("mcp_server", {})
         self.server = Server(
             {
-                "name": "chat-analysis-server",
-                "version": "0.1.0",
+                "name": server_config.get("name", "chat-analysis-server"),
+                "version": server_config.get("version", "0.1.0"),
             },
             {
                 "capabilities": {
@@ -32,14 +35,68 @@ class ChatAnalysisServer:
             }
         )
         
-        # Initialize processor with clients
-        self.processor = ConversationProcessor(
-            qdrant_client=None,  # TODO: Initialize from config
-            neo4j_client=None    # TODO: Initialize from config
-        )
+        # The processor, store clients and models are created on first use, so
+        # the server answers list_tools without importing torch or spaCy
+        self.warm_up = server_config.get("warm_up", True)
+        self.clients = None
+        self.processor = None
+        self._processor_lock: Optional[asyncio.Lock] = None  # Created on the serving loop
+        self._warm_up_task: Optional[asyncio.Task] = None
+        
+        # Imports run in the background so other tools stay available
+        self.jobs = ImportJobManager(self._get_processor)
         
         self._setup_tools()
     
+    async def _get_processor(self):
+        """The conversation processor, created and connected on the first call"""
+        if self.processor is not None:
+            return self.processor
+        
+        # Created here rather than in __init__: before Python 3.10 a lock binds
+        # to the event loop current at construction, not the one serving calls
+        if self._processor_lock is None:
+            self._processor_lock = asyncio.Lock()
+        async with self._processor_lock:
+            if self.processor is None:
+                loop = asyncio.get_running_loop()
+                # Importing the processor chain takes long enough to stall other requests
+                clients, processor = await loop.run_in_executor(None, self._create_processor)
+                try:
+                    await clients.start()
+                except BaseException:
+                    processor.close()
+                    await clients.close()
+                    raise
+                self.clients = clients
+                self.processor = processor
+        return self.processor
+    
+    def _create_processor(self):
+        from ...core.processors.conversation_processor import ConversationProcessor
+        from ...core.storage.clients import StoreClients
+        
+        # One pooled client per store, shared by all tool calls
+        clients = StoreClients.from_config(self.config)
+        processor = ConversationProcessor(
+            qdrant_client=clients.qdrant,
+            neo4j_client=clients.neo4j,
+            config=self.config
+        )
+        return clients, processor
+    
+    async def _warm_up(self):
+        """Connect the stores and load the models in the background"""
+        try:
+            processor = await self._get_processor()
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, processor.warm_up)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The first tool call retries and reports the error
+            print(f"Warm-up failed: {e!r}", file=sys.stderr)
+    
     def _setup_tools(self):
         """Set up MCP tools"""
         self.server.set_request_handler(ListToolsRequestSchema, self._handle_list_tools)
@@ -51,7 +108,7 @@ class ChatAnalysisServer:
             "tools": [
                 {
                     "name": "import_conversations",
-                    "description": "Import and analyze chat conversations",
+                    "description": "Start importing chat conversations as a background job and return its job id",
                     "inputSchema": {
                         "type": "object",
                         "properties": {
@@ -63,14 +120,46 @@ class ChatAnalysisServer:
                                 "type": "string",
                                 "enum": ["openai_native", "html", "markdown", "json"],
                                 "description": "Format of the chat export"
+                            },
+                            "wait": {
+                                "type": "boolean",
+                                "description": "Wait for the import to finish and return its statistics",
+                                "default": False
                             }
                         },
                         "required": ["source_path", "format"]
                     }
                 },
+                {
+                    "name": "import_status",
+                    "description": "Progress of an import job: conversations and messages done, rate and ETA",
+                    "inputSchema": {
+                        "type": "object",
+                        "properties": {
+                            "job_id": {
+                                "type": "string",
+                                "description": "Job to report on; omit to list all jobs"
+                            }
+                        }
+                    }
+                },
+                {
+                    "name": "cancel_import",
+                    "description": "Cancel a queued or running import job",
+                    "inputSchema": {
+                        "type": "object",
+                        "properties": {
+                            "job_id": {
+                                "type": "string",
+                                "description": "Job to cancel"
+                            }
+                        },
+                        "required": ["job_id"]
+                    }
+                },
                 {
                     "name": "semantic_search",
-                    "description": "Search conversations by semantic similarity",
+                    "description": "Search conversations by semantic similarity, with thread context",
                     "inputSchema": {
                         "type": "object",
                         "properties": {
@@ -139,6 +228,22 @@ class ChatAnalysisServer:
                         },
                         "required": ["conversation_id"]
                     }
+                },
+                {
+                    "name": "analyze_relationships",
+                    "description": "Link stored messages to similar messages of other conversations and mark topic shifts; runs after pending imports",
+                    "inputSchema": {
+                        "type": "object",
+                        "properties": {}
+                    }
+                },
+                {
+                    "name": "import_metrics",
+                    "description": "Progress, stage throughput, queue depths and store latencies of the current or last import",
+                    "inputSchema": {
+                        "type": "object",
+                        "properties": {}
+                    }
                 }
             ]
         }
@@ -148,19 +253,27 @@ class ChatAnalysisServer:
         try:
             if request.params.name == "import_conversations":
                 return await self._import_conversations(request.params.arguments)
+            elif request.params.name == "import_status":
+                return await self._import_status(request.params.arguments)
+            elif request.params.name == "cancel_import":
+                return await self._cancel_import(request.params.arguments)
             elif request.params.name == "semantic_search":
                 return await self._semantic_search(request.params.arguments)
             elif request.params.name == "analyze_metrics":
                 return await self._analyze_metrics(request.params.arguments)
             elif request.params.name == "extract_concepts":
                 return await self._extract_concepts(request.params.arguments)
+            elif request.params.name == "analyze_relationships":
+                return await self._analyze_relationships(request.params.arguments)
+            elif request.params.name == "import_metrics":
+                return await self._import_metrics(request.params.arguments)
             else:
                 raise McpError(ErrorCode.MethodNotFound, f"Unknown tool: {request.params.name}")
         except Exception as e:
             raise McpError(ErrorCode.InternalError, str(e))
     
     async def _import_conversations(self, args: Dict[str, Any]) -> Dict[str, Any]:
-        """Import and process conversations"""
+        """Submit an import job"""
         source_path = Path(args["source_path"])
         format_type = args["format"]
         
@@ -169,32 +282,100 @@ class ChatAnalysisServer:
         else:
             raise McpError(ErrorCode.InvalidParams, f"Unsupported format: {format_type}")
         
-        stats = await self.processor.process_import(importer, source_path)
-        return {"content": [{"type": "text", "text": json.dumps(stats, indent=2)}]}
+        if not importer.validate_source(source_path):
+            raise McpError(ErrorCode.InvalidParams, f"Invalid source for {format_type}: {source_path}")
+        
+        job = self.jobs.submit(source_path, importer, format_type)
+        if args.get("wait", False):
+            # Shielded: a cancelled tool call leaves the job running
+            await asyncio.shield(job.task)
+            if job.state != "finished":
+                raise McpError(ErrorCode.InternalError, f"Import {job.state}: {job.error or job.id}")
+            return {"content": [{"type": "text", "text": json.dumps(job.stats, indent=2, default=str)}]}
+        return {"content": [{"type": "text", "text": json.dumps(job.progress(), indent=2, default=str)}]}
+    
+    async def _import_status(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Report progress of one or all import jobs"""
+        job_id = (args or {}).get("job_id")
+        if job_id is None:
+            status = [job.progress() for job in self.jobs.jobs()]
+        else:
+            try:
+                status = self.jobs.get(job_id).progress()
+            except KeyError:
+                raise McpError(ErrorCode.InvalidParams, f"Unknown import job: {job_id}")
+        return {"content": [{"type": "text", "text": json.dumps(status, indent=2, default=str)}]}
+    
+    async def _cancel_import(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Cancel an import job and report where it stopped"""
+        try:
+            job = await self.jobs.cancel(args["job_id"])
+        except KeyError:
+            raise McpError(ErrorCode.InvalidParams, f"Unknown import job: {args['job_id']}")
+        return {"content": [{"type": "text", "text": json.dumps(job.progress(), indent=2, default=str)}]}
     
     async def _semantic_search(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Perform semantic search"""
-        # TODO: Implement semantic search using Qdrant
-        pass
+        processor = await self._get_processor()
+        results = await processor.searcher.search(
+            args["query"],
+            limit=args.get("limit", 10),
+            filters=args.get("filters")
+        )
+        return {"content": [{"type": "text", "text": json.dumps(results, indent=2, default=str)}]}
     
     async def _analyze_metrics(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze conversation metrics"""
-        # TODO: Implement metric analysis
-        pass
+        try:
+            processor = await self._get_processor()
+            metrics = await processor.analyze_metrics(args["conversation_id"], args.get("metrics"))
+        except KeyError:
+            raise McpError(ErrorCode.InvalidParams, f"Unknown conversation: {args['conversation_id']}")
+        return {"content": [{"type": "text", "text": json.dumps(metrics, indent=2)}]}
     
     async def _extract_concepts(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Extract and analyze concepts"""
         # TODO: Implement concept extraction
         pass
     
+    async def _analyze_relationships(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Write SIMILAR_TO edges and topic shifts for every stored message"""
+        stats = await self.jobs.run_exclusive(lambda processor: processor.analyze_semantic_relationships())
+        return {"content": [{"type": "text", "text": json.dumps(stats, indent=2)}]}
+    
+    async def _import_metrics(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Report progress and instrumentation of the current or last import"""
+        if self.processor is None:
+            progress = {"state": "idle"}
+        else:
+            progress = self.processor.import_progress()
+        return {"content": [{"type": "text", "text": json.dumps(progress, indent=2, default=str)}]}
+    
     async def run(self):
         """Run the MCP server"""
-        transport = StdioServerTransport()
-        await self.server.connect(transport)
-        print("Chat Analysis MCP server running on stdio", file=sys.stderr)
-
-if __name__ == "__main__":
-    import sys
+        if self.warm_up:
+            self._warm_up_task = asyncio.ensure_future(self._warm_up())
+        try:
+            transport = StdioServerTransport()
+            await self.server.connect(transport)
+            print("Chat Analysis MCP server running on stdio", file=sys.stderr)
+        finally:
+            await self.close()
     
+    async def close(self):
+        """Stop warming up and running imports, then close the store connections and local files"""
+        await self.jobs.close()
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+            await asyncio.gather(self._warm_up_task, return_exceptions=True)
+        if self.processor is not None:
+            self.processor.close()
+        if self.clients is not None:
+            await self.clients.close()
+
+def main():
     server = ChatAnalysisServer()
-    asyncio.run(server.run())
\ No newline at end of file
+    asyncio.run(server.run())
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -2,26 +2,33 @@
 # 
 # Copyright (C)2024 Robin L. M. Cheung. All rights reserved.
 import argparse
+import hashlib
 import json
 import os
-import tempfile
+from collections import deque
 from datetime import datetime, timezone
 from zipfile import ZipFile
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
 import itertools
 from tqdm import tqdm
 
+# Build manifest kept next to the generated pages
+MANIFEST_NAME = ".build_manifest.json"
+
+# Bump when the page template changes so existing pages are regenerated
+RENDER_VERSION = 2
+
 def process_conversations(conversation):
     md = ""
     nodes = conversation['mapping']
     root_id = conversation.get('root', None)
     if root_id is None and nodes:
         root_id = next(iter(nodes))
-    queue = [root_id]
+    queue = deque([root_id])
     messages = []
     
     while queue:
-        node_id = queue.pop(0)
+        node_id = queue.popleft()
         node = nodes[node_id]
         message = node['message']
         author_role = message['author']['role'] if message is not None else None
@@ -39,9 +46,7 @@ def process_conversations(conversation):
     
     return messages
 
-def save_to_html(conversation, messages, output_dir):
-    # Prepare the HTML template
-    html_content = """
+HTML_HEADER = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -49,81 +54,159 @@ def save_to_html(conversation, messages, output_dir):
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Conversation</title>
         <style>
-            body {{
+            body {
                 font-family: Arial, sans-serif;
                 background-color: #f5f5f5;
                 padding: 20px;
-            }}
-            .chat-container {{
+            }
+            .chat-container {
                 max-width: 600px;
                 margin: 0 auto;
                 background: white;
                 padding: 20px;
                 border-radius: 10px;
                 box-shadow: 0 0 10px rgba(0, 0, 0, 0.1);
-            }}
-            .chat-bubble {{
+            }
+            .chat-bubble {
                 padding: 10px 15px;
                 border-radius: 20px;
                 margin-bottom: 10px;
                 display: inline-block;
                 max-width: 80%;
-            }}
-            .user {{
+            }
+            .user {
                 background-color: #daf8cb;
                 margin-right: auto;
-            }}
-            .assistant {{
+            }
+            .assistant {
                 background-color: #f1f0f0;
                 margin-left: auto;
-            }}
-            .timestamp {{
+            }
+            .timestamp {
                 font-size: 0.8em;
                 color: gray;
                 margin-bottom: 5px;
-            }}
-            .speaker {{
+            }
+            .speaker {
                 font-weight: bold;
                 margin-bottom: 5px;
-            }}
+            }
         </style>
     </head>
     <body>
         <div class="chat-container">
     """
+
+HTML_FOOTER = """
+        </div>
+    </body>
+    </html>
+    """
+
+def render_html(messages):
+    # Yield the page in pieces so long chats are never rebuilt by concatenation
+    yield HTML_HEADER
     
     # Add messages with speaker demarcation
     for role, content in messages:
         speaker = "Me" if role == 'Me' else "CG"
-        html_content += f'<div class="speaker">{speaker}:</div>\n'
+        yield f'<div class="speaker">{speaker}:</div>\n'
         if role == 'Me':
-            html_content += f'<div class="chat-bubble user">{content}</div>\n'
+            yield f'<div class="chat-bubble user">{content}</div>\n'
         elif role == 'CG':
-            html_content += f'<div class="chat-bubble assistant">{content}</div>\n'
-
-    # Close HTML content
-    html_content += """
-        </div>
-    </body>
-    </html>
-    """
+            yield f'<div class="chat-bubble assistant">{content}</div>\n'
     
+    yield HTML_FOOTER
+
+def save_to_html(conversation, messages, output_dir, file_name=None):
     # Generate the filename, with fallback for missing title
-    title = conversation.get('title', 'Untitled_Conversation')
-    file_name = sanitize_filename(title) + ".html"
+    if file_name is None:
+        title = conversation.get('title', 'Untitled_Conversation')
+        file_name = sanitize_filename(title) + ".html"
     file_path = os.path.join(output_dir, file_name)
     
     with open(file_path, "w") as f:
-        f.write(html_content)
+        f.writelines(render_html(messages))
     
     return file_name
 
+def convert_conversation(conversation, output_dir, file_name):
+    # Worker entry point: everything a page needs travels with the call
+    messages = process_conversations(conversation)
+    return save_to_html(conversation, messages, output_dir, file_name)
+
+def conversation_key(conversation):
+    # Exports carry a stable id; fall back to title and creation time for older ones
+    return conversation.get('id') or conversation.get('conversation_id') or \
+        f"{conversation.get('title')}|{conversation.get('create_time')}"
+
+def assign_filenames(conversations, previous=None):
+    # Decide names up front so parallel workers never write the same file.
+    # Conversations already in the build manifest keep their earlier name.
+    previous = previous or {}
+    keys = [conversation_key(conversation) for conversation in conversations]
+    file_names = [previous[key]['file'] if key in previous else None for key in keys]
+    used = set(name for name in file_names if name is not None)
+    
+    for index, conversation in enumerate(conversations):
+        if file_names[index] is not None:
+            continue
+        base = sanitize_filename(conversation.get('title') or 'Untitled_Conversation')
+        file_name = base + ".html"
+        suffix = 2
+        while file_name in used:
+            file_name = f"{base} ({suffix}).html"
+            suffix += 1
+        used.add(file_name)
+        file_names[index] = file_name
+    return file_names
+
+def load_build_manifest(output_dir):
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Pages rendered by a different template version are all stale
+    if manifest.get('render_version') != RENDER_VERSION:
+        return {}
+    return manifest
+
+def save_build_manifest(output_dir, manifest):
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+def remove_deleted_pages(output_dir, previous, keys, file_names):
+    # Pages of conversations no longer in the export, unless a current one reuses the name
+    current = set(keys)
+    in_use = set(file_names)
+    removed = 0
+    for key, entry in previous.items():
+        if key in current or entry.get('file') in in_use:
+            continue
+        try:
+            os.remove(os.path.join(output_dir, entry['file']))
+            removed += 1
+        except (OSError, KeyError):
+            pass
+    return removed
+
+def index_signature(conversations, html_files):
+    digest = hashlib.sha1()
+    for conversation, html_file in zip(conversations, html_files):
+        digest.update(f"{conversation.get('title', 'Untitled Conversation')}\0{html_file}\0".encode('utf-8'))
+    return digest.hexdigest()
+
 def sanitize_filename(filename):
     return "".join(c for c in filename if c.isalnum() or c in (' ', '.', '_')).rstrip()
 
 def create_index_html(conversations, output_dir, html_files):
     # Create the index.html file
-    index_content = """
+    parts = ["""
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -131,78 +214,113 @@ def create_index_html(conversations, output_dir, html_files):
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Table of Contents</title>
         <style>
-            body {{
+            body {
                 font-family: Arial, sans-serif;
                 background-color: #f5f5f5;
                 padding: 20px;
-            }}
-            ul {{
+            }
+            ul {
                 list-style-type: none;
                 padding: 0;
-            }}
-            li {{
+            }
+            li {
                 margin: 5px 0;
-            }}
-            a {{
+            }
+            a {
                 text-decoration: none;
                 color: #1a73e8;
-            }}
-            a:hover {{
+            }
+            a:hover {
                 text-decoration: underline;
-            }}
+            }
         </style>
     </head>
     <body>
         <h1>Conversations Index</h1>
         <ul>
-    """
+    """]
     
     for conversation, html_file in zip(conversations, html_files):
         title = conversation.get('title', 'Untitled Conversation')
-        index_content += f'<li><a href="{html_file}">{title}</a></li>\n'
+        parts.append(f'<li><a href="{html_file}">{title}</a></li>\n')
     
-    index_content += """
+    parts.append("""
         </ul>
     </body>
     </html>
-    """
+    """)
     
     with open(os.path.join(output_dir, "index.html"), "w") as f:
-        f.write(index_content)
-
-def main(zip_path):
-    # Create a temporary directory
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        # Unzip the archive to the temporary directory
-        with ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(tmp_dir)
-        # Open the conversations.json file
-        with open(os.path.join(tmp_dir, 'conversations.json')) as f:
+        f.write("".join(parts))
+
+def main(zip_path, workers=None, full_rebuild=False):
+    # Read conversations.json straight from the archive
+    with ZipFile(zip_path, 'r') as zip_ref:
+        with zip_ref.open('conversations.json') as f:
             data = json.load(f)
 
-        # Create output directory for HTML files
-        output_dir = os.path.join(os.getcwd(), "Conversations_HTML")
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Add progress bar and process conversations
-        total_conversations = len(data)
-        html_files = []
-        with ThreadPoolExecutor() as executor:
-            for conversation in tqdm(data, total=total_conversations):
-                messages = process_conversations(conversation)
-                html_file = save_to_html(conversation, messages, output_dir)
-                html_files.append(html_file)
-        
-        # Create the index.html (Table of Contents)
-        create_index_html(data, output_dir, html_files)
+    # Create output directory for HTML files
+    output_dir = os.path.join(os.getcwd(), "Conversations_HTML")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Only new or changed conversations (or missing pages) are regenerated
+    stored = load_build_manifest(output_dir)
+    manifest = {} if full_rebuild else stored
+    previous = manifest.get('conversations', {})
+    keys = [conversation_key(conversation) for conversation in data]
+    file_names = assign_filenames(data, previous)
+    
+    # The manifest below only lists current conversations, so drop the other pages now
+    remove_deleted_pages(output_dir, stored.get('conversations', {}), keys, file_names)
+    stale = []
+    for index, (key, conversation, file_name) in enumerate(zip(keys, data, file_names)):
+        entry = previous.get(key)
+        if (entry is None
+                or entry.get('update_time') != conversation.get('update_time')
+                or not os.path.exists(os.path.join(output_dir, file_name))):
+            stale.append(index)
+
+    # Spread conversations across processes; map() keeps results in index order
+    if stale:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, min(64, len(stale) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                convert_conversation,
+                (data[index] for index in stale),
+                itertools.repeat(output_dir),
+                (file_names[index] for index in stale),
+                chunksize=chunksize
+            )
+            for _ in tqdm(results, total=len(stale)):
+                pass
+    
+    # Create the index.html (Table of Contents) only if its entries changed
+    signature = index_signature(data, file_names)
+    if signature != manifest.get('index_signature') or \
+            not os.path.exists(os.path.join(output_dir, "index.html")):
+        create_index_html(data, output_dir, file_names)
+
+    save_build_manifest(output_dir, {
+        'render_version': RENDER_VERSION,
+        'index_signature': signature,
+        'conversations': {
+            key: {'update_time': conversation.get('update_time'), 'file': file_name}
+            for key, conversation, file_name in zip(keys, data, file_names)
+        }
+    })
+    
+    return len(stale)
 
 if __name__ == "__main__":
     # Create the argument parser
     parser = argparse.ArgumentParser(description="Convert a ChatGPT conversation export into HTML files with a chat/SMS theme.")
     parser.add_argument('zip_file', help="Path to the zip file containing the conversation export.")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes (default: one per CPU).")
+    parser.add_argument('--full', action='store_true', help="Regenerate every page, ignoring the build manifest.")
     
     # Parse the command-line arguments
     args = parser.parse_args()
     
     # Run the main function
-    main(args.zip_file)
+    main(args.zip_file, workers=args.workers, full_rebuild=args.full)
@@ -11,6 +11,9 @@ setup(
         for line in open("requirements.txt")
         if line.strip() and not line.startswith("#")
     ],
+    extras_require={
+        "dev": ["pytest>=7.0"],
+    },
     entry_points={
         "console_scripts": [
             "chat-analysis-server=mcp_modules.analysis.chat_analysis_server:main",
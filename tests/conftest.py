@@ -0,0 +1,106 @@
+"""
+Shared test setup
+
+The modules use package-relative imports, so the repository is registered
+as the `chat_analyzer` package and tests import everything through it.
+"""
+from pathlib import Path
+import importlib.machinery
+import importlib.util
+import json
+import sys
+import zipfile
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+PACKAGE = "chat_analyzer"
+
+if PACKAGE not in sys.modules:
+    _spec = importlib.machinery.ModuleSpec(PACKAGE, None, is_package=True)
+    _spec.submodule_search_locations = [str(ROOT)]
+    sys.modules[PACKAGE] = importlib.util.module_from_spec(_spec)
+
+def export_conversation(conversation_id: str, texts, current_node=None, branches=None):
+    """
+    A conversation in the ChatGPT export format
+    
+    `texts` form one reply chain under a message-less root; `branches` maps a
+    chain index to extra texts replying to that message as alternative turns.
+    """
+    mapping = {"root": {"id": "root", "message": None, "parent": None, "children": []}}
+    
+    def add(node_id, parent_id, index, text):
+        mapping[node_id] = {
+            "id": node_id,
+            "parent": parent_id,
+            "children": [],
+            "message": {
+                "id": node_id,
+                "author": {"role": "user" if index % 2 == 0 else "assistant"},
+                "create_time": 1000.0 + index,
+                "content": {"content_type": "text", "parts": [text]}
+            }
+        }
+        mapping[parent_id]["children"].append(node_id)
+    
+    parent_id = "root"
+    for index, text in enumerate(texts):
+        node_id = f"{conversation_id}-m{index}"
+        add(node_id, parent_id, index, text)
+        parent_id = node_id
+    
+    for index, extra in (branches or {}).items():
+        for offset, text in enumerate(extra):
+            add(f"{conversation_id}-m{index}-b{offset}", f"{conversation_id}-m{index}", index + 1, text)
+    
+    return {
+        "id": conversation_id,
+        "title": f"Conversation {conversation_id}",
+        "create_time": 1000.0,
+        "update_time": 1000.0 + len(texts),
+        "mapping": mapping,
+        "current_node": current_node or parent_id
+    }
+
+@pytest.fixture
+def conversation():
+    """Factory for export-format conversations (see export_conversation)"""
+    return export_conversation
+
+@pytest.fixture
+def write_export(tmp_path):
+    """Write conversations as an export zip under tmp_path and return its path"""
+    def write(conversations, name="export.zip") -> Path:
+        path = tmp_path / name
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr("conversations.json", json.dumps(conversations))
+        return path
+    
+    return write
+
+@pytest.fixture
+def processor_config(tmp_path):
+    """Processor config that runs without model downloads or servers"""
+    return {
+        "qdrant": {"vector_size": 16},
+        "embeddings": {"cache_enabled": False, "batch_size": 8},
+        "analysis": {"extract_concepts": False, "tokenizer": "approximate"},
+        "import": {"max_batch_size": 4, "threads": 2},
+        "storage": {"data_dir": str(tmp_path / "data"), "cache_dir": str(tmp_path / "cache")}
+    }
+
+@pytest.fixture
+def make_processor(processor_config):
+    """Build processors writing to a recording Neo4j driver, with a model-free encoder"""
+    from chat_analyzer.benchmarks.import_benchmark import HashingEncoder
+    from chat_analyzer.core.processors.conversation_processor import ConversationProcessor
+    from chat_analyzer.core.storage.recording import RecordingNeo4jDriver
+    
+    def make(config=None, neo4j=None):
+        config = config or processor_config
+        processor = ConversationProcessor(None, neo4j or RecordingNeo4jDriver(), config)
+        processor.encoder = HashingEncoder(config["qdrant"]["vector_size"], config["embeddings"]["batch_size"])
+        return processor
+    
+    return make
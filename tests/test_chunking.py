@@ -0,0 +1,75 @@
+import re
+
+import pytest
+
+from chat_analyzer.core.analysis.chunking import TextChunker, segment_text
+
+_TOKEN = re.compile(r'\w+|[^\w\s]')
+
+def tokens(text: str) -> int:
+    return len(_TOKEN.findall(text))
+
+@pytest.fixture
+def chunker():
+    return TextChunker(chunk_size=20, overlap=5, tokenizer="approximate")
+
+def sentences(count: int, words: int = 6) -> str:
+    return " ".join(
+        " ".join(f"s{index}w{word}" for word in range(words)) + "." for index in range(count)
+    )
+
+def test_segments_paragraphs_sentences_and_code_lines():
+    text = "First one. Second one.\n\nNext paragraph.\n```\nline a\nline b\n```\nAfter."
+    blocks = [[text[start:end] for start, end in block] for block in segment_text(text)]
+    
+    assert blocks == [
+        ["First one.", "Second one."],
+        ["Next paragraph."],
+        ["```", "line a", "line b", "```"],
+        ["After."],
+    ]
+
+def test_short_texts_are_a_single_span(chunker):
+    assert chunker.split(["short", ""]) == [[(0, 5)], [(0, 0)]]
+
+def test_chunks_respect_the_token_limit_and_cover_the_text(chunker):
+    text = sentences(12)
+    spans = chunker.split([text])[0]
+    
+    assert len(spans) > 1
+    assert all(tokens(text[start:end]) <= chunker.chunk_size for start, end in spans)
+    assert spans[0][0] == 0
+    assert spans[-1][1] == len(text)
+    # Consecutive chunks overlap or touch, so nothing is dropped
+    assert all(following[0] <= previous[1] + 1 for previous, following in zip(spans, spans[1:]))
+
+def test_chunks_start_and_end_on_sentence_boundaries(chunker):
+    text = sentences(12)
+    for start, end in chunker.split([text])[0]:
+        assert text[start:end].startswith("s")
+        assert text[start:end].endswith(".")
+
+def test_overlap_repeats_trailing_sentences():
+    chunker = TextChunker(chunk_size=20, overlap=8, tokenizer="approximate")
+    text = sentences(6)  # 7 tokens per sentence
+    first, second = chunker.split([text])[0][:2]
+    
+    assert second[0] < first[1]
+    assert tokens(text[second[0]:first[1]]) <= chunker.overlap
+
+def test_oversized_sentences_are_split_into_token_windows(chunker):
+    text = " ".join(f"w{index}" for index in range(70))
+    spans = chunker.split([text])[0]
+    
+    assert [tokens(text[start:end]) for start, end in spans] == [20, 20, 20, 20, 10]
+    assert text[spans[1][0]:].startswith("w15 ")
+
+def test_batches_match_single_texts(chunker):
+    texts = [sentences(9), "tiny", sentences(4, words=3)]
+    assert chunker.split(texts) == [chunker.split([text])[0] for text in texts]
+
+def test_from_config_leaves_room_for_special_tokens():
+    chunker = TextChunker.from_config({"chunk_size": 512, "overlap": 400}, {"max_length": 256})
+    
+    assert chunker.chunk_size == 254
+    assert chunker.overlap == 127
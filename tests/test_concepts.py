@@ -0,0 +1,161 @@
+import asyncio
+
+import numpy as np
+
+from chat_analyzer.core.analysis.concepts import ConceptRegistry
+
+# Surface forms embedded as fixed directions; "neural nets" is close to "neural network"
+VECTORS = {
+    "neural network": [1.0, 0.0, 0.0],
+    "neural nets": [0.99, 0.1, 0.0],
+    "python": [0.0, 1.0, 0.0],
+    "gardening": [0.0, 0.0, 1.0]
+}
+
+async def embed(texts):
+    return [VECTORS[text] for text in texts]
+
+async def embed_lower(texts):
+    return [VECTORS[text.lower()] for text in texts]
+
+def resolve(registry, *keys):
+    return asyncio.run(registry.resolve({key: (key, None) for key in keys}, embed))
+
+def test_similar_keys_merge_into_the_first_concept():
+    registry = ConceptRegistry(0.9)
+    first = resolve(registry, "neural network", "python")
+    second = resolve(registry, "neural nets")
+    
+    assert second["neural nets"] == first["neural network"]
+    assert first["python"] != first["neural network"]
+    assert len(registry) == 2
+
+def test_saved_registry_merges_later_keys_the_same_way(tmp_path):
+    path = tmp_path / "concepts.npz"
+    registry = ConceptRegistry(0.9, path)
+    first = resolve(registry, "neural network", "python")
+    registry.save()
+    
+    # A later import starts from the saved registry instead of an empty one
+    reloaded = ConceptRegistry(0.9, path)
+    second = resolve(reloaded, "neural nets", "gardening", "python")
+    
+    assert second["neural nets"] == first["neural network"]
+    assert second["python"] == first["python"]
+    assert reloaded.describe(first["neural network"]) == ("neural network", None)
+    assert len(reloaded) == 3
+
+def test_load_restores_names_labels_and_vectors(tmp_path):
+    path = tmp_path / "concepts.npz"
+    registry = ConceptRegistry(0.9, path)
+    asyncio.run(registry.resolve({"python": ("Python", "LANGUAGE"), "gardening": ("gardening", None)}, embed_lower))
+    registry.save()
+    
+    reloaded = ConceptRegistry(0.9, path)
+    reloaded.load()
+    
+    assert reloaded._ids == registry._ids
+    assert reloaded.describe(registry._ids["python"]) == ("Python", "LANGUAGE")
+    assert reloaded.describe(registry._ids["gardening"]) == ("gardening", None)
+    np.testing.assert_array_equal(reloaded._matrix[:len(reloaded)], registry._matrix[:len(registry)])
+
+def test_missing_file_starts_empty(tmp_path):
+    registry = ConceptRegistry(0.9, tmp_path / "missing.npz")
+    registry.load()
+    registry.save()  # Nothing to write yet
+    
+    assert len(registry) == 0
+    assert not (tmp_path / "missing.npz").exists()
+
+class StubToken:
+    def __init__(self, text):
+        self.text = text
+        self.pos_ = "DET" if text.lower() == "the" else "NOUN"
+        self.is_stop = text.lower() in ("the", "and", "with")
+        self.like_num = text.isdigit()
+
+class StubSpan:
+    def __init__(self, doc, start, end, label_=None):
+        self.doc, self.start, self.end, self.label_ = doc, start, end, label_
+    
+    @property
+    def text(self):
+        return " ".join(token.text for token in self.doc.tokens[self.start:self.end])
+    
+    def __iter__(self):
+        return iter(self.doc.tokens[self.start:self.end])
+
+class StubDoc:
+    """Capitalized words are entities; a preceding "the" is included so it gets trimmed"""
+    
+    def __init__(self, text):
+        self.tokens = [StubToken(word) for word in text.split()]
+        self.ents = []
+        for index, token in enumerate(self.tokens):
+            if token.text[0].isupper() and token.text.lower() != "the":
+                start = index - 1 if index and self.tokens[index - 1].text.lower() == "the" else index
+                self.ents.append(StubSpan(self, start, index + 1, "PRODUCT"))
+    
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return StubSpan(self, item.start, item.stop)
+        return self.tokens[item]
+    
+    def has_annotation(self, name):
+        return False
+
+class StubNLP:
+    def pipe(self, texts, batch_size, n_process):
+        return (StubDoc(text) for text in texts)
+
+def naive_select(mentions, max_per_message, min_relevance):
+    """Scalar TF-IDF relevance, as documented on ConceptExtractor.select"""
+    n_messages = len(mentions)
+    df = {}
+    for _, message_mentions in mentions:
+        for key, *_ in message_mentions:
+            df[key] = df.get(key, 0) + 1
+    
+    selected = []
+    for message_id, message_mentions in mentions:
+        if not message_mentions:
+            continue
+        max_count = max(count for *_, count in message_mentions)
+        scored = []
+        for key, name, label, count in message_mentions:
+            idf = (np.log((1 + n_messages) / (1 + df[key])) + 1) / (np.log(1 + n_messages) + 1)
+            scored.append((message_id, key, name, label, (0.5 + 0.5 * count / max_count) * idf, count))
+        scored.sort(key=lambda mention: -mention[4])
+        selected.extend(mention for mention in scored[:max_per_message] if mention[4] >= min_relevance)
+    return selected
+
+def test_select_matches_a_per_message_tfidf(monkeypatch, conversation):
+    from chat_analyzer.core.analysis import concepts
+    from chat_analyzer.core.analysis.concepts import ConceptExtractor
+    from chat_analyzer.core.models.conversation import ConversationThread
+    
+    monkeypatch.setitem(concepts._PIPELINES, "stub", StubNLP())
+    thread = ConversationThread.from_export_mapping(conversation("a", [
+        "Python with NumPy and the Python docs",
+        "Rust and Python",
+        "the Python Python Python 42",
+        "no entities here",
+        "Haskell Rust Go Zig"
+    ]))
+    extractor = ConceptExtractor("stub", min_relevance=0.55, max_concepts_per_message=2)
+    mentions = extractor.extract([thread])
+    
+    # "the Python" is trimmed to the same key as "Python"
+    assert dict(mentions)["a-m2"] == [("python", "Python", "PRODUCT", 3)]
+    assert dict(mentions)["a-m3"] == []
+    
+    selected = extractor.select(mentions)
+    expected = naive_select(mentions, 2, 0.55)
+    assert [row[:4] + row[5:] for row in selected] == [row[:4] + row[5:] for row in expected]
+    np.testing.assert_allclose([row[4] for row in selected], [row[4] for row in expected])
+    
+    # Common "python" falls below the threshold; a-m4 keeps its two rarest keys
+    assert [(row[0], row[1]) for row in selected] == [
+        ("a-m0", "numpy"), ("a-m1", "rust"), ("a-m4", "haskell"), ("a-m4", "zig")
+    ]
+    assert extractor.select([]) == [] and extractor.select([("a-m3", [])]) == []
@@ -0,0 +1,85 @@
+import asyncio
+import copy
+import pickle
+
+from chat_analyzer.core.models.conversation import (
+    CONTEXT_TURN_CHARS, ConversationThread, Message, embedding_text, unit_text
+)
+from chat_analyzer.importers.common.base import OpenAIExportImporter
+
+def test_timestamps_are_always_timezone_aware():
+    exported = Message("a", "text", "user", create_time=1700000000.0)
+    missing = Message("b", "text", "user")
+    
+    assert exported.timestamp.tzinfo is not None
+    assert missing.timestamp.tzinfo is not None
+    assert sorted([missing.timestamp, exported.timestamp])[0] == exported.timestamp
+
+def test_messages_pickle_with_their_state():
+    msg = Message("a", "text", "assistant", parent_id="p", children_ids=["c"], create_time=5.0)
+    msg.metadata["k"] = "v"
+    
+    copy = pickle.loads(pickle.dumps(msg))
+    
+    assert (copy.id, copy.content, copy.role, copy.parent_id) == ("a", "text", "assistant", "p")
+    assert copy.children_ids == ("c",)
+    assert copy.timestamp == msg.timestamp
+    assert copy.metadata == {"k": "v"}
+
+def test_parses_export_mapping_and_skips_the_placeholder_root(conversation):
+    thread = ConversationThread.from_export_mapping(conversation("c", ["q", "a", "q2"]))
+    
+    assert thread.id == "c"
+    assert thread.root_id == "c-m0"
+    assert [msg.id for msg in thread.traverse_messages()] == ["c-m0", "c-m1", "c-m2"]
+    assert thread.messages["c-m2"].parent_id == "c-m1"
+    assert [msg.role for msg in thread.traverse_messages()] == ["user", "assistant", "user"]
+
+def test_semantic_units_reference_message_content(conversation):
+    thread = ConversationThread.from_export_mapping(conversation("c", ["question", "answer"]))
+    
+    units = thread.extract_semantic_units(message_ids={"c-m1"})
+    
+    assert len(units) == 1
+    assert unit_text(units[0]) == "answer"
+    assert units[0]["metadata"]["chunk"] == {"index": 0, "start": 0, "end": 6}
+    assert units[0]["metadata"]["context"]["parent_id"] == "c-m0"
+
+def test_context_turns_are_embedded_after_the_unit_text(conversation):
+    long_answer = "background " * 100 + "hi, what can I do for you"
+    thread = ConversationThread.from_export_mapping(
+        conversation("c", ["hello", long_answer, "sort a list", "use sorted()"], branches={2: ["an edit"]})
+    )
+    
+    units = {unit["metadata"]["message_id"]: unit for unit in thread.extract_semantic_units(context_turns=2)}
+    context = units["c-m3"]["metadata"]["context"]["text"]
+    assert context == f"assistant: {long_answer[-CONTEXT_TURN_CHARS:]}\nuser: sort a list"
+    assert embedding_text(units["c-m3"]) == f"use sorted()\n\n{context}"
+    
+    # A sibling branch has the same preceding turns; the first message has none
+    assert units["c-m2-b0"]["metadata"]["context"]["text"] == context
+    assert units["c-m1"]["metadata"]["context"]["text"] == "user: hello"
+    assert "text" not in units["c-m0"]["metadata"]["context"]
+    assert embedding_text(units["c-m0"]) == unit_text(units["c-m0"]) == "hello"
+    
+    assert "text" not in thread.extract_semantic_units()[2]["metadata"]["context"]
+
+def test_imports_embed_units_with_their_context(conversation, write_export, processor_config, make_processor):
+    config = copy.deepcopy(processor_config)
+    config["analysis"]["context_turns"] = 1
+    processor = make_processor(config)
+    
+    embedded = []
+    generate = processor._generate_embeddings
+    
+    async def record(texts):
+        embedded.extend(texts)
+        return await generate(texts)
+    processor._generate_embeddings = record
+    
+    export = write_export([conversation("a", ["what is 2 + 2", "four"]), conversation("b", ["name a number", "four"])])
+    asyncio.run(processor.process_import(OpenAIExportImporter(), export))
+    processor.close()
+    
+    # The same answer to different questions is embedded differently
+    assert "four\n\nuser: what is 2 + 2" in embedded and "four\n\nuser: name a number" in embedded
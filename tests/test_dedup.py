@@ -0,0 +1,172 @@
+import asyncio
+import copy
+
+import pytest
+
+from chat_analyzer.core.analysis.dedup import NearDuplicateIndex
+from chat_analyzer.importers.common.base import OpenAIExportImporter
+
+TEXT = "the quick brown fox jumps over the lazy dog near the river bank today"
+NEAR = "the quick brown fox jumps over the lazy dog near the river bank today!"
+OTHER = "completely unrelated words about compilers and register allocation passes"
+
+@pytest.fixture
+def index_path(tmp_path):
+    return tmp_path / "near_duplicates.sqlite3"
+
+def test_near_duplicates_match_the_first_text_of_their_group():
+    index = NearDuplicateIndex(threshold=0.8)
+    matches = index.find_or_add(
+        [TEXT, NEAR, OTHER, NEAR], ["user", "user", "user", "assistant"], ["a", "b", "c", "d"]
+    )
+    
+    assert matches[0] is None and matches[2] is None
+    assert matches[1][0] == "a" and matches[1][1] >= 0.8
+    assert matches[3] is None  # Other group
+    assert len(index) == 3
+
+def test_pending_representatives_only_match_their_own_batch():
+    index = NearDuplicateIndex(threshold=0.8)
+    assert index.find_or_add([TEXT], ["user"], ["a"], batch=1) == [None]
+    
+    # Batch 1 is not stored yet, so batch 2 cannot link to it
+    assert index.find_or_add([NEAR], ["user"], ["b"], batch=2) == [None]
+    assert index.find_or_add([NEAR], ["user"], ["c"], batch=1)[0][0] == "a"
+    
+    index.commit(1)
+    assert index.find_or_add([NEAR], ["user"], ["d"], batch=3)[0][0] == "a"
+
+def test_a_pending_representative_does_not_hide_one_of_the_same_batch():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.find_or_add([TEXT], ["user"], ["a"], batch=1)
+    
+    # Batch 1 owns every bucket of TEXT, yet batch 2's copies still find each other
+    matches = index.find_or_add([TEXT, NEAR], ["user", "user"], ["b", "c"], batch=2)
+    assert matches[0] is None and matches[1][0] == "b"
+
+def test_discarded_representatives_are_never_matched():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.find_or_add([TEXT], ["user"], ["a"], batch=1)
+    index.discard(1)
+    index.commit(1)
+    assert index.find_or_add([NEAR], ["user"], ["b"]) == [None]
+    
+    # Discarding after a commit changes nothing
+    index.discard(1)
+    assert index.find_or_add([TEXT], ["user"], ["c"])[0][0] == "b"
+
+def test_committed_representatives_survive_reopening(index_path):
+    index = NearDuplicateIndex(threshold=0.8, path=index_path)
+    index.find_or_add([TEXT], ["user"], [("m1", "p1")], batch="stored")
+    index.find_or_add([OTHER], ["user"], [("m2", "p2")], batch="failed")
+    index.commit("stored")
+    index.close()
+    
+    reopened = NearDuplicateIndex(threshold=0.8, path=index_path)
+    try:
+        matches = reopened.find_or_add([NEAR, OTHER], ["user", "user"], [("m3", "p3"), ("m4", "p4")])
+        assert matches[0][0] == ("m1", "p1")
+        assert matches[1] is None  # Never committed, so never saved
+    finally:
+        reopened.close()
+
+def test_stored_signatures_are_bounded_and_tied_to_the_hash_parameters(index_path):
+    texts = [f"message number {index} about topic {index * 7} and more words {index}" for index in range(5)]
+    index = NearDuplicateIndex(threshold=0.9, path=index_path, max_signatures=3)
+    index.find_or_add(texts, ["user"] * 5, list(range(5)))
+    index.close()
+    
+    reopened = NearDuplicateIndex(threshold=0.9, path=index_path, max_signatures=3)
+    matches = reopened.find_or_add(texts, ["user"] * 5, list(range(10, 15)))
+    reopened.close()
+    assert [match and match[0] for match in matches] == [None, None, 2, 3, 4]
+    
+    other_seed = NearDuplicateIndex(threshold=0.9, path=index_path, seed=2)
+    try:
+        assert other_seed.find_or_add(texts[-1:], ["user"], [99]) == [None]
+    finally:
+        other_seed.close()
+
+def duplicate_rows(processor):
+    return [
+        (query, row) for query, params in processor.neo4j.statements
+        if "DUPLICATE_OF" in query for row in params["rows"]
+    ]
+
+def test_duplicates_link_to_stored_representatives_across_imports(
+    conversation, write_export, processor_config, make_processor
+):
+    config = copy.deepcopy(processor_config)
+    config["deduplication"] = {"enabled": True, "threshold": 0.8}
+    importer = OpenAIExportImporter()
+    
+    processor = make_processor(config)
+    stats = asyncio.run(processor.process_import(importer, write_export([
+        conversation("a", [TEXT, OTHER]),
+        conversation("b", [NEAR, "a reply that shares nothing with the other messages"])
+    ], "v1.zip")))
+    processor.close()
+    assert stats["duplicate_units"] == 1
+    
+    # The representative is matched, never merged as a bare node
+    (query, row), = duplicate_rows(processor)
+    assert "MERGE (r:Message" not in query and "MATCH (r:Message {id: row.representative_id})" in query
+    assert (row["message_id"], row["representative_id"]) == ("b-m0", "a-m0")
+    written = [
+        row["id"] for query, params in processor.neo4j.statements
+        if "MERGE (m:Message" in query for row in params["rows"]
+    ]
+    assert "a-m0" in written
+    
+    # After a restart the stored signatures still find the duplicate
+    processor = make_processor(config)
+    stats = asyncio.run(processor.process_import(importer, write_export([
+        conversation("a", [TEXT, OTHER]),
+        conversation("b", [NEAR, "a reply that shares nothing with the other messages"]),
+        conversation("c", [TEXT + "?"])
+    ], "v2.zip")))
+    processor.close()
+    assert stats["conversations_skipped"] == 2
+    assert stats["duplicate_units"] == 1
+    (_, row), = duplicate_rows(processor)
+    assert (row["message_id"], row["representative_id"]) == ("c-m0", "a-m0")
+
+def test_duplicates_within_a_batch_are_found_while_another_batch_is_in_flight(
+    conversation, write_export, processor_config, make_processor
+):
+    config = copy.deepcopy(processor_config)
+    config["deduplication"] = {"enabled": True, "threshold": 0.8}
+    
+    # Batches of 4 conversations with 2 store workers: the second batch may be
+    # split before the first one is committed, and its copies must still match
+    question = "how do I reverse a linked list in place without allocating new nodes"
+    answer = "walk the list once and point every node at its predecessor, then return the old tail"
+    export = write_export([conversation(f"c{index}", [question, answer]) for index in range(6)])
+    processor = make_processor(config)
+    stats = asyncio.run(processor.process_import(OpenAIExportImporter(), export))
+    processor.close()
+    assert stats["duplicate_units"] in (8, 10)
+    
+    written = {
+        row["id"] for query, params in processor.neo4j.statements
+        if "MERGE (m:Message" in query for row in params["rows"]
+    }
+    assert {row["representative_id"] for _, row in duplicate_rows(processor)} <= written
+
+def test_a_failed_batch_leaves_nothing_pending(conversation, write_export, processor_config, make_processor):
+    config = copy.deepcopy(processor_config)
+    config["deduplication"] = {"enabled": True, "threshold": 0.8}
+    processor = make_processor(config)
+    
+    async def fail(*args, **kwargs):
+        raise RuntimeError("neo4j is down")
+    processor._create_graph_structure = fail
+    
+    export = write_export([conversation(f"c{index}", [TEXT, f"reply {index}"]) for index in range(6)])
+    with pytest.raises(RuntimeError):
+        asyncio.run(processor.process_import(OpenAIExportImporter(), export))
+    processor.close()
+    assert processor.deduplicator._pending == {} and processor.deduplicator._pending_batch == {}
+    
+    # The text was never stored, so the next import keeps its own copy
+    assert processor.deduplicator.find_or_add([NEAR], ["user"], ["x"]) == [None]
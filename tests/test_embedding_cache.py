@@ -0,0 +1,60 @@
+import pytest
+
+from chat_analyzer.core.embeddings.cache import EmbeddingCache, normalize_text
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite3", model_name="test-model")
+    yield cache
+    cache.close()
+
+def test_normalize_text_collapses_whitespace_and_unicode_forms():
+    assert normalize_text("  café \n\t au lait ") == "café au lait"
+
+def test_splits_batches_into_hits_and_misses(cache):
+    cache.put_many(["alpha", "beta"], [[1.0, 2.0], [3.0, 4.0]])
+    
+    hits, misses = cache.get_many(["beta", "gamma", " alpha  ", "beta"])
+    
+    assert hits == {0: [3.0, 4.0], 2: [1.0, 2.0], 3: [3.0, 4.0]}
+    assert misses == [1]
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_keys_depend_on_the_model(tmp_path, cache):
+    other = EmbeddingCache(tmp_path / "embeddings.sqlite3", model_name="other-model")
+    assert other.key("text") != cache.key("text")
+    assert cache.key("text") == cache.key(" text ")
+
+def test_entries_survive_reopening(tmp_path, cache):
+    cache.put_many(["persisted"], [[0.5, 0.25]])
+    cache.close()
+    
+    reopened = EmbeddingCache(tmp_path / "embeddings.sqlite3", model_name="test-model")
+    try:
+        assert reopened.get_many(["persisted"]) == ({0: [0.5, 0.25]}, [])
+    finally:
+        reopened.close()
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    # Each 4-float entry takes about 32 + 16 + 64 bytes, so four fit but five do not
+    cache = EmbeddingCache(tmp_path / "lru.sqlite3", model_name="m", max_size=500)
+    try:
+        for index in range(4):
+            cache.put_many([f"text {index}"], [[float(index)] * 4])
+        cache.get_many(["text 0"])  # Make the oldest entry the most recently used
+        cache.put_many(["text 4"], [[4.0] * 4])
+        
+        hits, misses = cache.get_many([f"text {index}" for index in range(5)])
+        assert 0 in hits and 4 in hits
+        assert 1 in misses
+        assert cache._total_size <= cache.max_size
+    finally:
+        cache.close()
+
+def test_replacing_an_entry_does_not_count_it_twice(cache):
+    cache.put_many(["same"], [[1.0]])
+    size = cache._total_size
+    cache.put_many(["same"], [[2.0]])
+    
+    assert cache._total_size == size
+    assert cache.get_many(["same"])[0] == {0: [2.0]}
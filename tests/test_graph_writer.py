@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from chat_analyzer.core.models.conversation import ConversationThread, Message
+from chat_analyzer.core.storage.graph_writer import BulkGraphWriter
+from chat_analyzer.core.storage.recording import RecordingNeo4jDriver
+
+def make_thread(thread_id: str, turns: int) -> ConversationThread:
+    ids = [f"{thread_id}-m{index}" for index in range(turns)]
+    messages = {
+        message_id: Message(
+            id=message_id,
+            content=f"message {index}",
+            role="user" if index % 2 == 0 else "assistant",
+            parent_id=ids[index - 1] if index else None,
+            children_ids=(ids[index + 1],) if index + 1 < turns else (),
+            create_time=1000.0 + index
+        )
+        for index, message_id in enumerate(ids)
+    }
+    return ConversationThread(id=thread_id, title=f"Thread {thread_id}", messages=messages, root_id=ids[0])
+
+def write_statements(driver: RecordingNeo4jDriver):
+    """Statements run inside write transactions, without the constraint setup"""
+    return [(query, params) for query, params in driver.statements if "CONSTRAINT" not in query]
+
+@pytest.fixture
+def threads():
+    return [make_thread("a", 5), make_thread("b", 3)]
+
+def test_one_transaction_with_one_statement_per_kind(threads):
+    driver = RecordingNeo4jDriver()
+    writer = BulkGraphWriter(driver)
+    
+    written = asyncio.run(writer.write(threads, {"a-m0": "vector-a"}))
+    
+    assert driver.transactions == 1
+    statements = write_statements(driver)
+    assert [query for query, _ in statements] == [
+        BulkGraphWriter.MERGE_CONVERSATIONS,
+        BulkGraphWriter.MERGE_MESSAGES,
+        BulkGraphWriter.MERGE_REPLIES,
+    ]
+    conversations, messages, replies = (params["rows"] for _, params in statements)
+    assert [row["id"] for row in conversations] == ["a", "b"]
+    assert len(messages) == 8
+    assert len(replies) == 6
+    assert written == {"nodes": 10, "relationships": 14}
+
+def test_rows_carry_properties_and_vector_ids(threads):
+    driver = RecordingNeo4jDriver()
+    asyncio.run(BulkGraphWriter(driver).write(threads, {"a-m0": "vector-a"}))
+    
+    messages = {row["id"]: row for row in write_statements(driver)[1][1]["rows"]}
+    assert messages["a-m0"]["conversation_id"] == "a"
+    assert messages["a-m0"]["props"]["vector_id"] == "vector-a"
+    assert messages["a-m1"]["props"]["vector_id"] is None
+    assert messages["b-m1"]["props"]["role"] == "assistant"
+    assert {"child_id": "a-m1", "parent_id": "a-m0"} in write_statements(driver)[2][1]["rows"]
+
+def test_large_batches_are_split_into_statements_of_bounded_size():
+    driver = RecordingNeo4jDriver()
+    writer = BulkGraphWriter(driver, rows_per_statement=4)
+    
+    asyncio.run(writer.write([make_thread("long", 10)], {}))
+    
+    assert driver.transactions == 1
+    message_batches = [
+        params["rows"] for query, params in write_statements(driver)
+        if query == BulkGraphWriter.MERGE_MESSAGES
+    ]
+    assert [len(rows) for rows in message_batches] == [4, 4, 2]
+    assert [row["id"] for rows in message_batches for row in rows] == [f"long-m{index}" for index in range(10)]
+
+def test_message_filter_limits_written_messages(threads):
+    driver = RecordingNeo4jDriver()
+    asyncio.run(BulkGraphWriter(driver).write(threads, {}, {"a": {"a-m3", "a-m4"}}))
+    
+    messages = write_statements(driver)[1][1]["rows"]
+    assert sorted(row["id"] for row in messages) == ["a-m3", "a-m4", "b-m0", "b-m1", "b-m2"]
+
+def test_writes_are_idempotent_merges(threads):
+    driver = RecordingNeo4jDriver()
+    writer = BulkGraphWriter(driver)
+    
+    asyncio.run(writer.write(threads, {}))
+    first = write_statements(driver)
+    asyncio.run(writer.write(threads, {}))
+    
+    # Writing the same batch again sends identical MERGE statements and rows
+    assert write_statements(driver)[len(first):] == first
+    for query, _ in first:
+        assert "MERGE" in query
+        assert "CREATE" not in query
+    
+    # Constraints backing the MERGEs are only created once per writer
+    constraints = [query for query, _ in driver.statements if "CONSTRAINT" in query]
+    assert constraints == BulkGraphWriter.CONSTRAINTS
+
+def test_concepts_are_written_in_one_transaction():
+    driver = RecordingNeo4jDriver()
+    concepts = [{"id": "c1", "name": "neo4j", "label": None}]
+    mentions = [{"message_id": "m1", "concept_id": "c1", "relevance": 0.9, "count": 2}]
+    
+    written = asyncio.run(BulkGraphWriter(driver).write_concepts(concepts, mentions))
+    
+    assert driver.transactions == 1
+    assert [params["rows"] for _, params in write_statements(driver)] == [concepts, mentions]
+    assert written == {"nodes": 1, "relationships": 1}
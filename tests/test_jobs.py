@@ -0,0 +1,79 @@
+import asyncio
+
+from chat_analyzer.core.processors.jobs import ImportJobManager
+from chat_analyzer.importers.common.base import OpenAIExportImporter
+
+class SlowProcessor:
+    """Records how many imports overlap"""
+    
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+    
+    async def process_import(self, importer, source_path):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return {"conversations_processed": 1}
+    
+    def import_progress(self):
+        return {"counters": {"conversations_processed": 1}}
+
+def test_jobs_run_one_at_a_time_on_a_loop_started_after_construction():
+    processor = SlowProcessor()
+    
+    async def get_processor():
+        return processor
+    
+    # Constructed outside any event loop, as the MCP server does before serving
+    manager = ImportJobManager(get_processor)
+    
+    async def run():
+        jobs = [
+            manager.submit(f"export-{index}.zip", OpenAIExportImporter(), "openai") for index in range(3)
+        ]
+        await asyncio.gather(*(job.task for job in jobs))
+        return jobs
+    
+    jobs = asyncio.run(run())
+    assert [job.state for job in jobs] == ["finished"] * 3
+    assert processor.max_running == 1
+
+def test_cancelled_jobs_report_their_state():
+    processor = SlowProcessor()
+    
+    async def get_processor():
+        return processor
+    
+    manager = ImportJobManager(get_processor)
+    
+    async def run():
+        first = manager.submit("first.zip", OpenAIExportImporter(), "openai")
+        second = manager.submit("second.zip", OpenAIExportImporter(), "openai")
+        await asyncio.sleep(0)  # Let the second job start waiting for the first
+        await manager.cancel(second.id)
+        await first.task
+        return first, second
+    
+    first, second = asyncio.run(run())
+    assert first.state == "finished"
+    assert second.state == "cancelled"
+
+def test_exclusive_operations_wait_for_submitted_imports():
+    processor = SlowProcessor()
+    
+    async def get_processor():
+        return processor
+    
+    manager = ImportJobManager(get_processor)
+    
+    async def operation(current):
+        assert current is processor and processor.running == 0
+        return [job.state for job in manager.jobs()]
+    
+    async def run():
+        manager.submit("export.zip", OpenAIExportImporter(), "openai")
+        return await manager.run_exclusive(operation)
+    
+    assert asyncio.run(run()) == ["finished"]
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from chat_analyzer.core.storage.local_index import LocalVectorIndex
+
+DIM = 16
+
+def unit_vectors(count: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def clustered_vectors(count: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Points scattered around a few directions, the shape IVF partitions well"""
+    rng = np.random.default_rng(seed)
+    centers = unit_vectors(clusters, seed + 1)
+    vectors = centers[rng.integers(0, clusters, size=count)] + 0.15 * rng.standard_normal((count, DIM))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def ids_of(hits):
+    return [hit["id"] for hit in hits]
+
+@pytest.fixture
+def index(tmp_path):
+    index = LocalVectorIndex(tmp_path / "index", DIM, initial_capacity=8)
+    yield index
+    index.close()
+
+def test_search_returns_the_exact_top_k(index):
+    vectors = unit_vectors(100)
+    index.upsert([f"p{row}" for row in range(100)], vectors, [{"row": row} for row in range(100)])
+    queries = unit_vectors(5, seed=1)
+    
+    results = index.search(queries, limit=7)
+    for query, hits in zip(queries, results):
+        expected = np.argsort(-(vectors @ query))[:7]
+        assert ids_of(hits) == [f"p{row}" for row in expected]
+        assert [hit["payload"]["row"] for hit in hits] == expected.tolist()
+        np.testing.assert_allclose([hit["score"] for hit in hits], (vectors @ query)[expected], rtol=1e-5)
+
+def test_upsert_overwrites_existing_points_in_place(index):
+    vectors = unit_vectors(3)
+    index.upsert(["a", "b", "c"], vectors, [{"v": 1}] * 3)
+    index.upsert(["b"], vectors[:1], [{"v": 2}])
+    
+    assert index.count == 3
+    hits = index.search(vectors[0], limit=2)[0]
+    assert sorted(ids_of(hits)) == ["a", "b"]
+    assert {hit["id"]: hit["payload"]["v"] for hit in hits} == {"a": 1, "b": 2}
+    
+    with pytest.raises(ValueError):
+        index.upsert(["d"], np.zeros((1, DIM + 1)))
+
+def test_filters_restrict_results_to_matching_payloads(index):
+    vectors = unit_vectors(60)
+    payloads = [{"conversation_id": f"c{row % 3}", "role": "user" if row % 2 else "assistant"} for row in range(60)]
+    index.upsert([f"p{row}" for row in range(60)], vectors, payloads)
+    query = unit_vectors(1, seed=2)[0]
+    
+    hits = index.search(query, limit=5, filters={"conversation_id": "c1", "role": "user"})[0]
+    allowed = [row for row in range(60) if row % 3 == 1 and row % 2]
+    expected = sorted(allowed, key=lambda row: -float(vectors[row] @ query))[:5]
+    assert ids_of(hits) == [f"p{row}" for row in expected]
+    assert index.search(query, limit=5, filters={"conversation_id": "missing"})[0] == []
+
+def test_ivf_recall_against_exact_search(index):
+    vectors = clustered_vectors(2000, clusters=16)
+    index.upsert([f"p{row}" for row in range(2000)], vectors)
+    index.build_ivf(16)
+    queries = clustered_vectors(50, clusters=16, seed=3)
+    
+    exact = [set(ids_of(hits)) for hits in index.search(queries, limit=10)]
+    
+    def recall(nprobe):
+        approximate = index.search(queries, limit=10, nprobe=nprobe)
+        return np.mean([len(exact[q] & set(ids_of(hits))) / 10 for q, hits in enumerate(approximate)])
+    
+    assert recall(16) == 1.0  # Probing every list scans every row
+    assert recall(4) >= 0.9
+    assert recall(1) < recall(4)
+    
+    # Rows added after the partition are always scanned
+    index.upsert(["late"], queries[:1])
+    assert index.search(queries[0], limit=1, nprobe=1)[0][0]["id"] == "late"
+
+def test_maybe_build_ivf_waits_for_enough_unindexed_rows(index):
+    index.upsert([f"p{row}" for row in range(100)], unit_vectors(100))
+    index.maybe_build_ivf(4, min_rows=200)
+    assert index._ivf is None
+    
+    index.maybe_build_ivf(4, min_rows=50)
+    assert index._ivf["rows_indexed"] == 100
+    
+    index.upsert(["p100", "p101"], unit_vectors(2, seed=1))
+    index.maybe_build_ivf(4, min_rows=50, stale_fraction=0.1)
+    assert index._ivf["rows_indexed"] == 100  # 2% unindexed is not worth a rebuild
+
+def test_reopened_index_serves_the_flushed_rows(tmp_path):
+    vectors = unit_vectors(40)
+    index = LocalVectorIndex(tmp_path / "index", DIM, initial_capacity=8)
+    index.upsert([f"p{row}" for row in range(40)], vectors, [{"row": row} for row in range(40)])
+    index.build_ivf(4)
+    index.flush()
+    expected = index.search(vectors[:3], limit=5, nprobe=2)
+    index.close()
+    
+    reopened = LocalVectorIndex(tmp_path / "index", DIM)
+    try:
+        assert reopened.count == 40
+        np.testing.assert_array_equal(reopened.vectors, vectors)
+        assert reopened.search(vectors[:3], limit=5, nprobe=2) == expected
+        assert [payload["row"] for _, payload in reopened.iter_payloads(batch_size=7)] == list(range(40))
+    finally:
+        reopened.close()
+    
+    with pytest.raises(ValueError):
+        LocalVectorIndex(tmp_path / "index", DIM * 2)
@@ -0,0 +1,66 @@
+import asyncio
+
+from chat_analyzer.core.models.conversation import ConversationThread
+from chat_analyzer.core.storage.manifest import ImportManifest, conversation_fingerprint
+from chat_analyzer.importers.common.base import OpenAIExportImporter
+
+def thread_of(data) -> ConversationThread:
+    return ConversationThread.from_export_mapping(data)
+
+def test_unknown_threads_are_processed_in_full(tmp_path, conversation):
+    manifest = ImportManifest(tmp_path / "manifest.json")
+    thread = thread_of(conversation("c", ["hello", "hi"]))
+    
+    assert not manifest.is_unchanged(thread, conversation_fingerprint(thread))
+    assert manifest.changed_message_ids(thread) is None
+
+def test_recorded_threads_are_unchanged_after_reloading(tmp_path, conversation):
+    manifest = ImportManifest(tmp_path / "manifest.json")
+    thread = thread_of(conversation("c", ["hello", "hi"]))
+    manifest.record(thread, conversation_fingerprint(thread))
+    manifest.save()
+    
+    reloaded = ImportManifest(tmp_path / "manifest.json")
+    assert reloaded.is_unchanged(thread, conversation_fingerprint(thread))
+    assert reloaded.changed_message_ids(thread) == set()
+
+def test_added_messages_are_changed(tmp_path, conversation):
+    manifest = ImportManifest(tmp_path / "manifest.json")
+    thread = thread_of(conversation("c", ["hello", "hi"]))
+    manifest.record(thread, conversation_fingerprint(thread))
+    
+    grown = thread_of(conversation("c", ["hello", "hi", "how are you?"]))
+    assert manifest.changed_message_ids(grown) == {"c-m2"}
+
+def test_messages_edited_in_place_are_changed(tmp_path, conversation):
+    manifest = ImportManifest(tmp_path / "manifest.json")
+    thread = thread_of(conversation("c", ["hello", "hi", "bye"]))
+    manifest.record(thread, conversation_fingerprint(thread))
+    
+    edited = thread_of(conversation("c", ["hello", "hi there", "bye"]))
+    assert not manifest.is_unchanged(edited, conversation_fingerprint(edited))
+    assert manifest.changed_message_ids(edited) == {"c-m1"}
+
+def test_reimport_rewrites_edited_messages(tmp_path, conversation, write_export, processor_config, make_processor):
+    importer = OpenAIExportImporter()
+    original = [conversation("a", ["one", "two", "three"]), conversation("b", ["four", "five"])]
+    asyncio.run(make_processor().process_import(importer, write_export(original, "v1.zip")))
+    
+    # A restart followed by an import where one message was edited but kept its id
+    edited = [conversation("a", ["one", "two (edited)", "three"]), conversation("b", ["four", "five"])]
+    processor = make_processor()
+    stats = asyncio.run(processor.process_import(importer, write_export(edited, "v2.zip")))
+    
+    assert stats["conversations_skipped"] == 1
+    assert stats["conversations_updated"] == 1
+    assert stats["messages_processed"] == 1
+    assert stats["vectors_created"] == 1
+    messages = [
+        row for query, params in processor.neo4j.statements if "MERGE (m:Message" in query
+        for row in params["rows"]
+    ]
+    assert [(row["id"], row["props"]["content"]) for row in messages] == [("a-m1", "two (edited)")]
+    
+    # The edit is recorded, so a third import skips everything
+    stats = asyncio.run(make_processor().process_import(importer, write_export(edited, "v3.zip")))
+    assert stats["conversations_skipped"] == 2
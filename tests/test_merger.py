@@ -0,0 +1,46 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("tqdm")
+
+from chat_analyzer import mergerv10
+
+def pages(output_dir):
+    return sorted(name for name in os.listdir(output_dir) if name.endswith(".html") and name != "index.html")
+
+def test_rebuilds_only_regenerate_changed_pages(monkeypatch, tmp_path, conversation, write_export):
+    monkeypatch.chdir(tmp_path)
+    output_dir = tmp_path / "Conversations_HTML"
+    export = [conversation(f"c{index}", [f"question {index}", f"answer {index}"]) for index in range(20)]
+    
+    assert mergerv10.main(write_export(export), workers=2) == 20
+    assert len(pages(output_dir)) == 20
+    assert mergerv10.main(write_export(export), workers=2) == 0
+    
+    export[3]["update_time"] += 1
+    export[3]["mapping"]["c3-m1"]["message"]["content"]["parts"] = ["edited answer"]
+    assert mergerv10.main(write_export(export), workers=2) == 1
+    assert "edited answer" in (output_dir / "Conversation c3.html").read_text()
+    
+    # A missing page is regenerated even though the manifest lists it
+    (output_dir / "Conversation c5.html").unlink()
+    assert mergerv10.main(write_export(export), workers=2) == 1
+
+def test_conversations_removed_from_the_export_lose_their_pages(monkeypatch, tmp_path, conversation, write_export):
+    monkeypatch.chdir(tmp_path)
+    output_dir = tmp_path / "Conversations_HTML"
+    export = [conversation(f"c{index}", [f"question {index}"]) for index in range(4)]
+    mergerv10.main(write_export(export), workers=1)
+    
+    assert mergerv10.main(write_export(export[1:]), workers=1) == 0
+    assert pages(output_dir) == ["Conversation c1.html", "Conversation c2.html", "Conversation c3.html"]
+    with open(output_dir / mergerv10.MANIFEST_NAME) as f:
+        assert sorted(json.load(f)["conversations"]) == ["c1", "c2", "c3"]
+    assert "c0.html" not in (output_dir / "index.html").read_text()
+    
+    # A full rebuild still prunes, and a new conversation may reuse a freed name
+    export[0]["id"] = "c0-again"
+    assert mergerv10.main(write_export(export[:1]), workers=1, full_rebuild=True) == 1
+    assert pages(output_dir) == ["Conversation c0.html"]
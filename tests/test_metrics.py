@@ -0,0 +1,149 @@
+import asyncio
+import copy
+import threading
+
+import numpy as np
+
+from chat_analyzer.core.analysis.metrics import MessageTable, MessageTableBuilder, MetricsEngine
+from chat_analyzer.core.models.conversation import ConversationThread
+from chat_analyzer.importers.common.base import OpenAIExportImporter
+
+from test_concepts import StubNLP
+
+def thread_of(data) -> ConversationThread:
+    return ConversationThread.from_export_mapping(data)
+
+def assert_same_table(table: MessageTable, expected: MessageTable):
+    assert sorted(table.conversation_ids) == sorted(expected.conversation_ids)
+    for conversation_id in expected.conversation_ids:
+        code, expected_code = table.code(conversation_id), expected.code(conversation_id)
+        rows = slice(table.offsets[code], table.offsets[code + 1])
+        expected_rows = slice(expected.offsets[expected_code], expected.offsets[expected_code + 1])
+        
+        assert table.message_ids[rows] == expected.message_ids[expected_rows]
+        parents = [table.message_ids[row] if row >= 0 else None for row in table.parent[rows]]
+        expected_parents = [
+            expected.message_ids[row] if row >= 0 else None for row in expected.parent[expected_rows]
+        ]
+        assert parents == expected_parents
+        for column in ("role", "timestamp", "depth", "length"):
+            np.testing.assert_array_equal(getattr(table, column)[rows], getattr(expected, column)[expected_rows])
+        
+        topics = [table.topics[code] if code >= 0 else None for code in table.topic[rows]]
+        expected_topics = [expected.topics[code] if code >= 0 else None for code in expected.topic[expected_rows]]
+        assert topics == expected_topics
+
+def test_incremental_builds_match_a_full_build(conversation):
+    builder = MessageTableBuilder()
+    builder.add_many([
+        thread_of(conversation("a", ["1", "2", "3"], branches={1: ["x"]})),
+        thread_of(conversation("b", ["4"]))
+    ])
+    first = builder.build()
+    assert builder.build() is first
+    
+    # Replace a, drop b (no messages left) and add c
+    a = thread_of(conversation("a", ["1", "2 edited", "3", "4"]))
+    c = thread_of(conversation("c", ["5", "6"]))
+    builder.add_many([a, c, ConversationThread(id="b", title="", messages={}, root_id=None, metadata={})])
+    
+    assert builder.dirty
+    assert_same_table(builder.build(), MessageTable.from_threads([a, c]))
+
+def test_saved_table_is_loaded_before_new_conversations(tmp_path, conversation):
+    a = thread_of(conversation("a", ["1", "2", "3"]))
+    b = thread_of(conversation("b", ["4", "5"]))
+    builder = MessageTableBuilder(path=tmp_path / "table.npz")
+    builder.add_many([a, b])
+    builder.save()
+    
+    b_grown = thread_of(conversation("b", ["4", "5", "6"]))
+    reloaded = MessageTableBuilder(path=tmp_path / "table.npz")
+    reloaded.add(b_grown)
+    
+    assert_same_table(reloaded.build(), MessageTable.from_threads([a, b_grown]))
+    metrics = MetricsEngine(reloaded.build()).conversation_metrics("a", ["message_frequency"])
+    assert metrics["message_frequency"]["messages"] == 3
+
+def test_metrics_cover_skipped_conversations_after_a_restart(conversation, write_export, make_processor):
+    importer = OpenAIExportImporter()
+    export = [conversation("a", ["one", "two", "three"]), conversation("b", ["four", "five"])]
+    asyncio.run(make_processor().process_import(importer, write_export(export, "v1.zip")))
+    
+    # After a restart the unchanged conversation a is skipped, b gains a message
+    export[1] = conversation("b", ["four", "five", "six"])
+    processor = make_processor()
+    stats = asyncio.run(processor.process_import(importer, write_export(export, "v2.zip")))
+    assert stats["conversations_skipped"] == 1
+    
+    metrics = asyncio.run(processor.analyze_metrics("a", ["message_frequency"]))
+    assert metrics["message_frequency"]["messages"] == 3
+    metrics = asyncio.run(processor.analyze_metrics("b", ["message_frequency"]))
+    assert metrics["message_frequency"]["messages"] == 3
+    
+    # A fresh processor answers from the saved table without importing
+    metrics = asyncio.run(make_processor().analyze_metrics("a", ["conversation_depth"]))
+    assert metrics["conversation_depth"]["max_depth"] == 2
+
+def test_topic_diversity_from_each_message_s_main_concept(conversation):
+    # m0 -> m1 -> m2 -> m3, with m1-b0 as a second reply to m1
+    thread = thread_of(conversation("a", ["q", "a", "q", "a"], branches={1: ["retry"]}))
+    topics = {"a-m0": "sql", "a-m1": "sql", "a-m2": "rust", "a-m3": None, "a-m1-b0": "sql"}
+    other = thread_of(conversation("b", ["no concepts"]))
+    engine = MetricsEngine(MessageTable.from_threads([thread, other], topics))
+    
+    diversity = engine.conversation_metrics("a", ["topic_diversity"])["topic_diversity"]
+    assert diversity["messages_with_topic"] == 4
+    assert diversity["distinct_topics"] == 2
+    assert diversity["topic_entropy_bits"] == -(0.75 * np.log2(0.75) + 0.25 * np.log2(0.25))
+    
+    # m0->m1, m1->m2 and m1->m1-b0 both have topics; m2->m3 does not
+    assert diversity["topic_shifts"] == 1
+    assert diversity["topic_shift_rate"] == 1 / 3
+    
+    empty = engine.conversation_metrics("b", ["topic_diversity"])["topic_diversity"]
+    assert empty["messages_with_topic"] == 0 and empty["topic_entropy_bits"] is None
+    
+    # Without concepts there is nothing to measure
+    plain = MetricsEngine(MessageTable.from_threads([thread]))
+    assert plain.conversation_metrics("a", ["topic_diversity"]) == {"topic_diversity": None}
+
+def test_messages_not_analyzed_again_keep_their_topic(tmp_path, conversation):
+    builder = MessageTableBuilder(path=tmp_path / "table.npz")
+    builder.add(thread_of(conversation("a", ["q", "a"])), {"a-m0": "sql", "a-m1": "rust"})
+    builder.save()
+    
+    # An incremental import only analyzes the added message
+    grown = thread_of(conversation("a", ["q", "a", "q again"]))
+    reloaded = MessageTableBuilder(path=tmp_path / "table.npz")
+    reloaded.add(grown, {"a-m2": None})
+    
+    assert_same_table(
+        reloaded.build(), MessageTable.from_threads([grown], {"a-m0": "sql", "a-m1": "rust", "a-m2": None})
+    )
+
+def test_imports_fill_topic_diversity_and_save_off_the_event_loop(
+    monkeypatch, conversation, write_export, processor_config, make_processor
+):
+    from chat_analyzer.core.analysis import concepts
+    
+    monkeypatch.setitem(concepts._PIPELINES, "stub", StubNLP())
+    config = copy.deepcopy(processor_config)
+    config["analysis"].update({"extract_concepts": True, "concept_model": "stub", "min_concept_relevance": 0.0})
+    processor = make_processor(config)
+    
+    save = processor.table_builder.save
+    saved_on = []
+    
+    def record_save():
+        saved_on.append(threading.current_thread())
+        save()
+    
+    monkeypatch.setattr(processor.table_builder, "save", record_save)
+    export = write_export([conversation("a", ["Python and Rust", "Rust with Cargo", "Gardening tips"])])
+    asyncio.run(processor.process_import(OpenAIExportImporter(), export))
+    
+    assert saved_on and threading.main_thread() not in saved_on
+    diversity = asyncio.run(processor.analyze_metrics("a", ["topic_diversity"]))["topic_diversity"]
+    assert diversity["messages_with_topic"] == 3
+    assert diversity["distinct_topics"] >= 2
@@ -0,0 +1,57 @@
+import asyncio
+import copy
+import json
+
+import numpy as np
+
+from chat_analyzer.importers.common.base import OpenAIExportImporter
+
+from conftest import PACKAGE, ROOT
+
+def import_with(processor_config, make_processor, export, name, parse_processes):
+    config = copy.deepcopy(processor_config)
+    data_dir = f"{config['storage']['data_dir']}-{name}"
+    config["storage"]["data_dir"] = data_dir
+    config["import"].update({"parse_processes": parse_processes, "parse_chunk_size": 3})
+    config["analysis"].update({"chunk_size": 64, "overlap": 16})
+    config["local_index"] = {"enabled": True}
+    
+    processor = make_processor(config)
+    try:
+        stats = asyncio.run(processor.process_import(OpenAIExportImporter(), export))
+        index = processor.local_index
+        points = {
+            (payload["message_id"], payload["chunk"]["index"]): (payload, index.vectors[row].tolist())
+            for row, payload in index.iter_payloads()
+        }
+    finally:
+        processor.close()
+    
+    with open(f"{data_dir}/import_manifest.json", encoding='utf-8') as f:
+        manifest = json.load(f)["conversations"]
+    return stats, points, manifest
+
+def test_process_pool_parsing_matches_in_process_parsing(
+    monkeypatch, tmp_path, conversation, write_export, processor_config, make_processor
+):
+    # Spawned workers import the package by name, so make it importable from a path
+    (tmp_path / "path").mkdir()
+    (tmp_path / "path" / PACKAGE).symlink_to(ROOT, target_is_directory=True)
+    monkeypatch.syspath_prepend(str(tmp_path / "path"))
+    
+    export = write_export([
+        conversation(f"c{index}", [f"question {index}", f"answer {index} " * 200, "thanks"], branches={0: ["retry"]})
+        for index in range(7)
+    ])
+    
+    in_process = import_with(processor_config, make_processor, export, "serial", 0)
+    pooled = import_with(processor_config, make_processor, export, "pooled", 2)
+    
+    assert pooled[0]["conversations_processed"] == in_process[0]["conversations_processed"] == 7
+    assert pooled[0]["vectors_created"] == in_process[0]["vectors_created"]
+    assert pooled[1].keys() == in_process[1].keys()
+    assert any(chunk_index > 0 for _, chunk_index in pooled[1])  # Long answers were split
+    for point_id, (payload, vector) in in_process[1].items():
+        assert pooled[1][point_id][0] == payload
+        np.testing.assert_allclose(pooled[1][point_id][1], vector)
+    assert pooled[2] == in_process[2]
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from chat_analyzer.core.models.conversation import ConversationThread, Message, ThreadPathIndex
+from chat_analyzer.importers.common.base import OpenAIExportImporter
+
+def random_parents(count: int, seed: int) -> dict:
+    """Tree of `count` messages, each replying to a random earlier one"""
+    rng = random.Random(seed)
+    parents = {"m0": None}
+    for index in range(1, count):
+        parents[f"m{index}"] = f"m{rng.randrange(index)}"
+    return parents
+
+def messages_of(parents: dict) -> dict:
+    children = {}
+    for name, parent in parents.items():
+        if parent is not None:
+            children.setdefault(parent, []).append(name)
+    return {
+        name: Message(
+            id=name,
+            content=f"text of {name}",
+            role="user",
+            parent_id=parent,
+            children_ids=children.get(name, ()),
+            create_time=1000.0
+        )
+        for name, parent in parents.items()
+    }
+
+def naive_path(parents: dict, name: str) -> list:
+    """Messages from the root down to `name`, by walking parent links"""
+    path = []
+    while name is not None:
+        path.append(name)
+        name = parents[name]
+    return path[::-1]
+
+@pytest.mark.parametrize("seed", range(5))
+def test_queries_match_a_naive_parent_walk(seed):
+    parents = random_parents(60, seed)
+    index = ThreadPathIndex(messages_of(parents), "m0")
+    paths = {name: naive_path(parents, name) for name in parents}
+    names = list(parents)
+    
+    for a in names:
+        assert index.depth_of(a) == len(paths[a]) - 1
+        assert index.path_ids(a) == paths[a]
+        assert index.ancestor_ids(a, limit=3) == paths[a][:-1][-3:]
+        assert sorted(index.descendant_ids(a)) == sorted(name for name in names if a in paths[name][:-1])
+        for k in range(len(paths[a])):
+            assert index.kth_ancestor(a, k) == paths[a][-1 - k]
+        for b in names:
+            assert index.is_ancestor(a, b) == (a in paths[b])
+            assert index.same_branch(a, b) == (a in paths[b] or b in paths[a])
+            common = [x for x, y in zip(paths[a], paths[b]) if x == y]
+            assert index.common_ancestor(a, b) == common[-1]
+
+def test_current_node_selects_the_active_branch():
+    parents = {"r": None, "a": "r", "b": "a", "c": "a", "d": "c", "e": "b"}
+    thread = ConversationThread(
+        id="t", title="t", messages=messages_of(parents), root_id="r", metadata={"current_node": "e"}
+    )
+    
+    # e sits under a's first child, not the latest regeneration
+    assert thread.active_leaf_id == "e"
+    assert [message.id for message in thread.active_path()] == ["r", "a", "b", "e"]
+    assert [name for name in parents if thread.is_active(name)] == ["r", "a", "b", "e"]
+    assert thread.path_index.active_path_ids() is thread.path_index.active_path_ids()
+
+@pytest.mark.parametrize("current_node", [None, "gone"])
+def test_without_a_known_current_node_the_last_children_are_followed(current_node):
+    parents = {"r": None, "a": "r", "b": "a", "c": "a", "d": "c", "e": "b"}
+    thread = ConversationThread(
+        id="t", title="t", messages=messages_of(parents), root_id="r", metadata={"current_node": current_node}
+    )
+    
+    assert thread.active_leaf_id == "d"
+    assert [message.id for message in thread.active_path()] == ["r", "a", "c", "d"]
+    assert not thread.is_active("b") and thread.is_active("c")
+
+def test_imported_threads_keep_the_exported_current_node(conversation, write_export):
+    source = write_export([
+        conversation("a", ["one", "two", "three"], current_node="a-m1-b0", branches={1: ["other"]})
+    ])
+    data, = OpenAIExportImporter().extract_conversations(source)
+    thread = ConversationThread.from_export_mapping(data)
+    
+    assert thread.metadata["current_node"] == "a-m1-b0"
+    assert thread.active_leaf_id == "a-m1-b0"
+    assert thread.is_active("a-m1") and not thread.is_active("a-m2")
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from chat_analyzer.importers.common.base import OpenAIExportImporter
+
+def test_import_counts_every_conversation(conversation, write_export, make_processor):
+    export = write_export([conversation(f"c{index}", ["question", "answer", "follow-up"]) for index in range(10)])
+    processor = make_processor()
+    
+    stats = asyncio.run(processor.process_import(OpenAIExportImporter(), export))
+    
+    assert stats["conversations_processed"] == 10
+    assert stats["messages_processed"] == 30
+    assert stats["vectors_created"] == 30
+    assert processor.import_progress()["state"] == "finished"
+
+def test_cpu_bound_stages_leave_the_event_loop_responsive(
+    monkeypatch, conversation, write_export, make_processor
+):
+    processor = make_processor()
+    original_split = processor.chunker.split
+    
+    def slow_split(texts):
+        time.sleep(0.2)  # Stands in for tokenizing a large batch
+        return original_split(texts)
+    
+    monkeypatch.setattr(processor.chunker, "split", slow_split)
+    export = write_export([conversation(f"c{index}", ["question", "answer"]) for index in range(8)])
+    
+    async def run():
+        gaps = []
+        import_task = asyncio.ensure_future(processor.process_import(OpenAIExportImporter(), export))
+        last = time.perf_counter()
+        while not import_task.done():
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+        await import_task
+        return gaps
+    
+    gaps = asyncio.run(run())
+    assert max(gaps) < 0.15
@@ -0,0 +1,167 @@
+import asyncio
+import copy
+
+from chat_analyzer.core.analysis.search import HybridSearcher, LRUCache
+from chat_analyzer.core.storage.recording import RecordingResult
+from chat_analyzer.importers.common.base import OpenAIExportImporter
+
+def hit(message_id, conversation_id, score, chunk=None):
+    return {
+        "id": f"point-{message_id}",
+        "score": score,
+        "payload": {
+            "message_id": message_id,
+            "conversation_id": conversation_id,
+            "role": "user",
+            "chunk": chunk,
+            "context": {"title": f"title of {conversation_id}"}
+        }
+    }
+
+class StubProcessor:
+    """Counts embedding calls and serves fixed vector hits"""
+    
+    def __init__(self, hits):
+        self.hits = hits
+        self.embedded = []
+        self.searches = 0
+    
+    async def _generate_embedding(self, text):
+        self.embedded.append(text)
+        return [1.0, 0.0]
+    
+    async def search_vectors(self, query, limit=10, filters=None, vector=None):
+        self.searches += 1
+        return self.hits[:limit]
+
+class StubTransaction:
+    def __init__(self, records):
+        self.records = records
+    
+    async def run(self, query, **params):
+        return RecordingResult([self.records[key] for key in params["message_ids"] if key in self.records])
+
+class StubDriver:
+    """Async driver answering the context read from fixed records"""
+    
+    def __init__(self, records):
+        self.records = records
+    
+    def session(self, database=None):
+        return self
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    async def execute_read(self, transaction_function, *args):
+        return await transaction_function(StubTransaction(self.records), *args)
+
+def test_hits_are_boosted_by_other_hits_in_their_conversation():
+    hits = [
+        hit("a1", "a", 0.90),
+        hit("b1", "b", 0.85),
+        hit("a1", "a", 0.80),  # A second chunk of a1 only counts once
+        hit("b2", "b", 0.84),
+        hit("c1", "c", 0.20)
+    ]
+    searcher = HybridSearcher(StubProcessor(hits), None, graph_weight=0.1)
+    results = asyncio.run(searcher.search("query", limit=3))
+    
+    # b1 gains 0.084 from b2 and passes a1, which has no other hit
+    assert [result["message_id"] for result in results] == ["b1", "b2", "a1"]
+    assert results[0]["score"] == 0.85 + 0.1 * 0.84
+    assert results[0]["vector_score"] == 0.85
+    assert results[2]["score"] == 0.90
+    assert results[2]["title"] == "title of a"
+
+def test_graph_context_supplies_the_chunk_text_and_thread():
+    records = {
+        "a1": {
+            "message_id": "a1",
+            "content": "0123456789",
+            "timestamp": 1000.0,
+            "conversation": {"id": "a", "title": "Stored title"},
+            "parent": {"id": "a0", "role": "assistant", "content": "earlier"},
+            "replies": [{"id": "a2", "role": "assistant", "content": "later"}]
+        }
+    }
+    hits = [hit("a1", "a", 0.9, chunk={"index": 1, "start": 2, "end": 5}), hit("b1", "b", 0.8)]
+    hits[1]["payload"]["text"] = "payload text"
+    searcher = HybridSearcher(StubProcessor(hits), StubDriver(records))
+    first, second = asyncio.run(searcher.search("query"))
+    
+    assert first["text"] == "234"
+    assert first["title"] == "Stored title"
+    assert first["context"] == {"parent": records["a1"]["parent"], "replies": records["a1"]["replies"]}
+    assert second["text"] == "payload text"  # Not in the graph: fall back to the payload
+
+def test_results_are_cached_until_invalidated_and_queries_survive_it():
+    processor = StubProcessor([hit("a1", "a", 0.9)])
+    searcher = HybridSearcher(processor, None)
+    
+    async def run():
+        first = await searcher.search("  query   text ")
+        assert await searcher.search("query text") is first  # Whitespace is normalized away
+        await searcher.search("query text", limit=5)
+        await searcher.search("query text", filters={"role": "user"})
+        assert processor.searches == 3
+        
+        searcher.invalidate()
+        assert len(searcher.result_cache) == 0
+        assert await searcher.search("query text") is not first
+        assert processor.searches == 4
+    
+    asyncio.run(run())
+    assert processor.embedded == ["query text"]
+
+def test_results_of_a_search_overlapping_an_import_are_not_cached():
+    processor = StubProcessor([hit("a1", "a", 0.9)])
+    searcher = HybridSearcher(processor, None)
+    original = processor.search_vectors
+    
+    async def search_during_import(*args, **kwargs):
+        searcher.invalidate()  # An import finishes while the search runs
+        return await original(*args, **kwargs)
+    
+    processor.search_vectors = search_during_import
+    asyncio.run(searcher.search("query"))
+    assert len(searcher.result_cache) == 0
+
+def test_lru_cache_evicts_the_least_recently_used_entry():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert (cache.hits, cache.misses) == (3, 1)
+    
+    disabled = LRUCache(0)
+    disabled.put("a", 1)
+    assert len(disabled) == 0
+
+def test_local_index_results_carry_text_without_a_graph(
+    conversation, write_export, processor_config, make_processor
+):
+    config = copy.deepcopy(processor_config)
+    config["local_index"] = {"enabled": True}
+    processor = make_processor(config)
+    export = write_export([
+        conversation("a", ["how do I sort a list in python", "use sorted()"]),
+        conversation("b", ["best soil for tomatoes", "loamy soil"])
+    ])
+    try:
+        asyncio.run(processor.process_import(OpenAIExportImporter(), export))
+        results = asyncio.run(processor.searcher.search("best soil for tomatoes", limit=4))
+    finally:
+        processor.close()
+    
+    # The recording driver returns no graph context
+    assert results[0]["message_id"] == "b-m0"
+    assert results[0]["text"] == "best soil for tomatoes"
+    assert all(result["text"] for result in results)
@@ -0,0 +1,189 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from chat_analyzer.core.analysis.similarity import MessageVectors, knn_blocks
+from chat_analyzer.core.models.conversation import ConversationThread, Message
+from chat_analyzer.core.storage.local_index import LocalVectorIndex
+from chat_analyzer.core.storage.recording import RecordingPoint, RecordingQdrantClient
+from chat_analyzer.core.storage.snapshot import ImportSnapshot
+
+DIM = 8
+
+def unit_vectors(count: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def brute_force(matrix: np.ndarray, conversations: np.ndarray, k: int):
+    scores = matrix @ matrix.T
+    scores[conversations[:, None] == conversations[None, :]] = -np.inf
+    return [
+        set(column for column in np.argsort(-row)[:k] if np.isfinite(row[column])) for row in scores
+    ]
+
+def vectors_of(matrix: np.ndarray, conversations: np.ndarray) -> MessageVectors:
+    count = len(matrix)
+    return MessageVectors(
+        matrix,
+        np.arange(count, dtype=np.int64),
+        np.array([f"m{index}".encode() for index in range(count)]),
+        conversations.astype(np.int32),
+        np.full(count, -1, dtype=np.int64)
+    )
+
+def test_blocked_knn_matches_brute_force_across_block_sizes():
+    matrix = unit_vectors(200)
+    conversations = np.random.default_rng(1).integers(0, 20, size=200)
+    vectors = vectors_of(matrix, conversations)
+    expected = brute_force(matrix, conversations, 5)
+    
+    # Budgets from one corpus row per block up to the whole corpus at once
+    for budget in (vectors.nbytes, vectors.nbytes + (64 << 10), 256 << 20):
+        found = {}
+        for start, neighbors, scores in knn_blocks(vectors, 5, memory_budget=budget, query_rows=32):
+            assert np.all(np.diff(scores, axis=1)[np.isfinite(scores[:, 1:])] <= 0)
+            for offset, row in enumerate(neighbors):
+                found[start + offset] = set(row[row >= 0].tolist())
+        assert [found[index] for index in range(200)] == expected
+
+def test_per_message_arrays_count_against_the_memory_budget():
+    vectors = vectors_of(unit_vectors(100), np.arange(100))
+    assert vectors.nbytes == 100 * (8 + 4 + 8) + vectors.message_ids.nbytes
+    assert isinstance(vectors.message_ids, np.ndarray)
+    assert vectors.message_id(7) == "m7"
+
+def thread(conversation_id: str, parents: dict) -> ConversationThread:
+    """Thread whose message `name` replies to parents[name]"""
+    children = {}
+    for name, parent in parents.items():
+        if parent is not None:
+            children.setdefault(parent, []).append(name)
+    messages = {
+        name: Message(
+            id=name,
+            content=f"text of {name}",
+            role="user",
+            parent_id=parent,
+            children_ids=children.get(name, ()),
+            create_time=1000.0
+        )
+        for name, parent in parents.items()
+    }
+    root = next(name for name, parent in parents.items() if parent is None)
+    return ConversationThread(id=conversation_id, title=conversation_id, messages=messages, root_id=root)
+
+def write_snapshot(path, batches):
+    """Append (thread, messages without a vector) batches and return the snapshot"""
+    snapshot = ImportSnapshot(path, DIM)
+    snapshot.begin()
+    for index, (item, hidden) in enumerate(batches):
+        units = [
+            unit for unit in item.extract_semantic_units() if unit["metadata"]["message_id"] not in hidden
+        ]
+        snapshot.append([item], units, unit_vectors(len(units), seed=index))
+    snapshot.commit()
+    return snapshot
+
+def test_snapshot_vectors_skip_messages_without_a_vector(tmp_path):
+    a = thread("a", {"a0": None, "a1": "a0", "a2": "a1", "a3": "a2", "a2b": "a1"})
+    b = thread("b", {"b0": None, "b1": "b0"})
+    b_again = thread("b", {"b0": None, "b1": "b0", "b2": "b1"})
+    snapshot = write_snapshot(tmp_path / "snapshot", [(a, {"a1"}), (b, set()), (b_again, set())])
+    
+    vectors = MessageVectors.from_snapshot(snapshot)
+    ids = [vectors.message_id(position) for position in range(len(vectors))]
+    parents = {
+        ids[position]: (ids[parent] if parent >= 0 else None)
+        for position, parent in enumerate(vectors.parents.tolist())
+    }
+    
+    # a1 has no vector: its replies compare with a0; b's later rows win
+    assert sorted(ids) == ["a0", "a2", "a2b", "a3", "b0", "b1", "b2"]
+    assert parents == {
+        "a0": None, "a2": "a0", "a2b": "a0", "a3": "a2", "b0": None, "b1": "b0", "b2": "b1"
+    }
+    assert list(vectors.rows) == sorted(vectors.rows)
+    assert vectors.rows[ids.index("b0")] == 4 + 2  # a's four units and b's first two precede it
+    codes = dict(zip(ids, vectors.conversations.tolist()))
+    assert codes["a0"] == codes["a3"] != codes["b0"] == codes["b2"]
+
+def test_local_index_vectors_match_the_snapshot(tmp_path):
+    a = thread("a", {"a0": None, "a1": "a0", "a2": "a1"})
+    b = thread("b", {"b0": None, "b1": "b0"})
+    snapshot = write_snapshot(tmp_path / "snapshot", [(a, set()), (b, set())])
+    
+    index = LocalVectorIndex(tmp_path / "index", DIM)
+    try:
+        for position, item in enumerate((a, b)):
+            units = item.extract_semantic_units()
+            index.upsert(
+                [unit["metadata"]["message_id"] for unit in units],
+                unit_vectors(len(units), seed=position),
+                [unit["metadata"] for unit in units]
+            )
+        from_index = MessageVectors.from_local_index(index, batch_size=2)
+        from_snapshot = MessageVectors.from_snapshot(snapshot)
+        
+        assert from_index.message_ids.tolist() == from_snapshot.message_ids.tolist()
+        np.testing.assert_array_equal(from_index.parents, from_snapshot.parents)
+        np.testing.assert_array_equal(from_index.conversations, from_snapshot.conversations)
+        np.testing.assert_array_equal(
+            from_index.block(0, len(from_index)), from_snapshot.block(0, len(from_snapshot))
+        )
+    finally:
+        index.close()
+
+def test_qdrant_vectors_match_the_snapshot(tmp_path):
+    a = thread("a", {"a0": None, "a1": "a0", "a2": "a1"})
+    b = thread("b", {"b0": None, "b1": "b0"})
+    snapshot = write_snapshot(tmp_path / "snapshot", [(a, set()), (b, set())])
+    
+    client = RecordingQdrantClient(keep_vectors=True)
+    for position, item in enumerate((a, b)):
+        units = item.extract_semantic_units()
+        points = [
+            RecordingPoint(unit["metadata"]["message_id"], vector, unit["metadata"])
+            for unit, vector in zip(units, unit_vectors(len(units), seed=position))
+        ]
+        asyncio.run(client.upsert("chat_embeddings", points))
+    
+    # A later chunk brings no vector of its own
+    later_chunk = dict(points[0].payload, chunk={"index": 1, "start": 5, "end": 9})
+    asyncio.run(client.upsert("chat_embeddings", [RecordingPoint("b0:1", [1.0] * DIM, later_chunk)]))
+    
+    from_qdrant = asyncio.run(MessageVectors.from_qdrant(client, "chat_embeddings", batch_size=2))
+    from_snapshot = MessageVectors.from_snapshot(snapshot)
+    assert client.scrolls == [("chat_embeddings", 2), ("chat_embeddings", 2), ("chat_embeddings", 2)]
+    assert from_qdrant.message_ids.tolist() == from_snapshot.message_ids.tolist()
+    np.testing.assert_array_equal(from_qdrant.parents, from_snapshot.parents)
+    np.testing.assert_array_equal(from_qdrant.conversations, from_snapshot.conversations)
+    np.testing.assert_array_equal(
+        from_qdrant.block(0, len(from_qdrant)), from_snapshot.block(0, len(from_snapshot))
+    )
+
+def test_the_similarity_job_reads_qdrant_with_the_default_config(make_processor):
+    processor = make_processor()
+    with pytest.raises(ValueError):
+        asyncio.run(processor.analyze_semantic_relationships())
+    
+    # Neither the snapshot nor the local index is enabled by default
+    assert processor.snapshot is None and processor.local_index is None
+    processor.qdrant = client = RecordingQdrantClient(keep_vectors=True)
+    for item in (thread("a", {"a0": None, "a1": "a0"}), thread("b", {"b0": None, "b1": "b0"})):
+        units = item.extract_semantic_units()
+        vectors = asyncio.run(processor._generate_embeddings([unit["text"] for unit in units]))
+        asyncio.run(client.upsert(processor.collection_name, [
+            RecordingPoint(unit["metadata"]["message_id"], vector, unit["metadata"])
+            for unit, vector in zip(units, vectors)
+        ]))
+    
+    stats = asyncio.run(processor.analyze_semantic_relationships())
+    processor.close()
+    assert stats["messages"] == 4 and stats["replies_scored"] == 2
+    assert client.scrolls == [(processor.collection_name, 4)]
+    similar = [
+        row for query, params in processor.neo4j.statements
+        if "SIMILAR_TO" in query for row in params["rows"]
+    ]
+    assert sorted(row["id"] for row in similar) == ["a0", "a1", "b0", "b1"]
@@ -0,0 +1,90 @@
+import asyncio
+import copy
+import json
+
+from chat_analyzer.core.storage.recording import RecordingNeo4jDriver
+from chat_analyzer.importers.common.base import OpenAIExportImporter
+
+QUESTION = "how do I reverse a linked list in place without allocating new nodes"
+ANSWER = "walk the list once and point every node at its predecessor, then return the old tail"
+
+STATEMENTS = {
+    "conversations": "MERGE (c:Conversation",
+    "messages": "MERGE (m:Message {id: row.id})",
+    "replies": "MERGE (m)-[:REPLIES_TO]",
+    "duplicates": "DUPLICATE_OF"
+}
+
+def graph_rows(driver):
+    """Every row written per statement kind, as comparable JSON strings"""
+    rows = {kind: set() for kind in STATEMENTS}
+    for query, params in driver.statements:
+        for kind, marker in STATEMENTS.items():
+            if marker in query:
+                rows[kind].update(json.dumps(row, sort_keys=True) for row in params["rows"])
+    return rows
+
+def export_with_duplicates(conversation):
+    export = [conversation(f"c{index}", [QUESTION, ANSWER, f"follow-up number {index}"]) for index in range(6)]
+    
+    # The export shows an alternative answer, not the last child
+    export[0] = conversation(
+        "c0", [QUESTION, ANSWER, "follow-up number 0"], current_node="c0-m0-b0", branches={0: ["another answer"]}
+    )
+    return export
+
+def snapshot_config(processor_config):
+    config = copy.deepcopy(processor_config)
+    config["import"].update({"snapshot": True, "max_batch_size": 10})
+    config["deduplication"] = {"enabled": True, "threshold": 0.8}
+    return config
+
+def test_reload_rewrites_the_graph_the_import_wrote(conversation, write_export, processor_config, make_processor):
+    config = snapshot_config(processor_config)
+    imported = make_processor(config)
+    export = write_export(export_with_duplicates(conversation))
+    stats = asyncio.run(imported.process_import(OpenAIExportImporter(), export))
+    imported.close()
+    assert stats["duplicate_units"] == 10
+    
+    reloaded = make_processor(config, RecordingNeo4jDriver())
+    asyncio.run(reloaded.reload_from_snapshot(concepts=False))
+    reloaded.close()
+    
+    expected, rows = graph_rows(imported.neo4j), graph_rows(reloaded.neo4j)
+    assert len(expected["duplicates"]) == 10
+    assert rows == expected
+    
+    conversations = {json.loads(row)["id"]: json.loads(row)["props"] for row in rows["conversations"]}
+    assert conversations["c0"]["current_node"] == "c0-m0-b0"
+    
+    threads = [thread for batch in reloaded.snapshot.iter_batches() for thread in batch[0]]
+    assert next(thread for thread in threads if thread.id == "c0").active_leaf_id == "c0-m0-b0"
+
+def test_reload_uses_the_latest_state_of_each_message(conversation, write_export, processor_config, make_processor):
+    config = snapshot_config(processor_config)
+    export = export_with_duplicates(conversation)
+    processor = make_processor(config)
+    asyncio.run(processor.process_import(OpenAIExportImporter(), write_export(export, "v1.zip")))
+    processor.close()
+    
+    # Editing c5's question makes it a message of its own
+    edited = export[5]["mapping"]["c5-m0"]["message"]
+    edited["content"]["parts"] = ["an unrelated question about sourdough starters"]
+    export[5]["update_time"] += 1
+    processor = make_processor(config)
+    asyncio.run(processor.process_import(OpenAIExportImporter(), write_export(export, "v2.zip")))
+    processor.close()
+    
+    reloaded = make_processor(config, RecordingNeo4jDriver())
+    asyncio.run(reloaded.reload_from_snapshot(concepts=False))
+    reloaded.close()
+    
+    rows = graph_rows(reloaded.neo4j)
+    duplicates = {json.loads(row)["message_id"] for row in rows["duplicates"]}
+    assert "c5-m0" not in duplicates and "c5-m1" in duplicates
+    
+    messages = {json.loads(row)["id"]: json.loads(row)["props"] for row in rows["messages"]}
+    assert messages["c5-m0"]["content"].startswith("an unrelated question")
+    assert messages["c5-m0"]["vector_id"] not in (None, messages["c0-m0"]["vector_id"])
+    assert messages["c4-m0"]["vector_id"] == messages["c0-m0"]["vector_id"]
@@ -0,0 +1,40 @@
+import io
+import json
+
+import pytest
+
+from chat_analyzer.importers.common.streaming import iter_json_array
+
+DOCUMENTS = [
+    '[]',
+    '[123.5]',
+    '[-2.5e10]',
+    '[1, 22, 333, 4444.25, -5e-3]',
+    ' [ true , false , null ] ',
+    '["a", "b,]c", "\\u00e9\\"x"]',
+    '[{"id": 1, "mapping": {"a": [1, 2, {"b": null}]}}, {"id": 2}, []]',
+    '[1.5 , {"k": -0.25}\n,\n"tail"]',
+]
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("chunk_size", range(1, 17))
+def test_matches_json_loads_for_every_chunk_size(document, chunk_size):
+    decoded = list(iter_json_array(io.StringIO(document), chunk_size=chunk_size))
+    assert decoded == json.loads(document)
+
+def test_large_elements_grow_the_read_size():
+    elements = [{"id": index, "text": "x" * 5000} for index in range(20)]
+    decoded = list(iter_json_array(io.StringIO(json.dumps(elements)), chunk_size=64))
+    assert decoded == elements
+
+def test_yields_elements_before_reading_the_rest():
+    stream = io.StringIO('[1, 2, ' + 'garbage' * 1000)
+    elements = iter_json_array(stream, chunk_size=8)
+    assert next(elements) == 1
+    assert stream.tell() < 100
+
+@pytest.mark.parametrize("document", ['', '   ', '{"a": 1}', '[1, 2', '[1 2]', '[1,]x', '[1.5x]'])
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_rejects_malformed_documents(document, chunk_size):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(document), chunk_size=chunk_size))